@@ -0,0 +1,87 @@
+import os
+import json
+import threading
+
+
+# ==========================================
+# 已下载素材索引：记录每一行素材的 ETag / Last-Modified / 大小 / 本地路径
+# 刷新任务据此发送条件请求，服务器返回 304 时直接保留本地文件。
+# 以 (Sheet, Hook, 链接) 为键：同一链接出现在不同 Sheet / Hook 下时各自归档，互不影响。
+# 保存在 save_root/_meta/asset_index.json (快照) + asset_index.log (追加日志)，
+# 运行中每条更新只追加一行，结束时 save() 合并成新快照并清空日志。
+# ==========================================
+
+def asset_key(task):
+    return f"{task.get('sheet')}\t{str(task.get('hook')).strip()}\t{task.get('url')}"
+
+
+class AssetIndex:
+    def __init__(self, save_root):
+        self.path = os.path.join(save_root, "_meta", "asset_index.json")
+        self.log_path = os.path.join(save_root, "_meta", "asset_index.log")
+        self.lock = threading.Lock()
+        self.entries = {}
+        self._fh = None
+        self._dirty = 0
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except Exception:
+            entries = {}  # 没有或损坏就当没有，最多多下载一次
+        self.entries.update(entries)
+        try:
+            with open(self.log_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        key, rec = json.loads(line)
+                    except ValueError:
+                        continue  # 崩溃时最后一行可能只写了一半
+                    self.entries[key] = rec
+                    self._dirty += 1
+        except OSError:
+            pass
+
+    def get(self, task):
+        with self.lock:
+            return self.entries.get(asset_key(task))
+
+    def get_valid(self, task):
+        """本地文件仍在且大小一致时才返回记录，否则条件请求没有意义"""
+        rec = self.get(task)
+        if not rec: return None
+        path = rec.get('path')
+        try:
+            if path and os.path.getsize(path) == rec.get('size'): return rec
+        except OSError:
+            pass
+        return None
+
+    def update(self, task, rec):
+        key = asset_key(task)
+        with self.lock:
+            self.entries[key] = rec
+            if self._fh is None:
+                os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+                self._fh = open(self.log_path, 'a', encoding='utf-8')
+            self._fh.write(json.dumps([key, rec], ensure_ascii=False) + "\n")
+            self._fh.flush()
+            self._dirty += 1
+
+    def save(self):
+        """写新快照并清空追加日志 (任务结束时调用一次)"""
+        with self.lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+            if not self._dirty: return
+            data = json.dumps(self.entries, ensure_ascii=False)
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+            if os.path.exists(self.log_path): os.remove(self.log_path)
+            self._dirty = 0
@@ -0,0 +1,153 @@
+import os
+import mmap
+import hashlib
+import threading
+
+from apps.placement import place_file, PlacementFallback
+
+# ==========================================
+# 完全相同文件检测 (分拣工具共用)
+# 分级比较，越往后越贵，只有前一级撞上才进入下一级：
+# 1. 文件大小 —— 大小独一份的文件一个字节都不用读
+# 2. 头尾各 4MB 的哈希
+# 3. 全文件哈希 (mmap 读取)
+# 每个文件的哈希只算一次，算完缓存在记录里。
+# 第一份是按需才算哈希的；放置方式为"移动"时源文件可能已经不在了，这时改读目标位置的那份。
+# ==========================================
+
+PARTIAL_BYTES = 4 * 1024 * 1024
+
+# 重复文件处理方式
+DUP_ACTIONS = [("off", "不检测"), ("skip", "跳过"), ("link", "硬链接到已有文件")]
+
+
+def partial_hash(path, size):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        h.update(f.read(PARTIAL_BYTES))
+        if size > PARTIAL_BYTES:
+            f.seek(max(PARTIAL_BYTES, size - PARTIAL_BYTES))
+            h.update(f.read(PARTIAL_BYTES))
+    return h.digest()
+
+
+def full_hash(path):
+    h = hashlib.blake2b(digest_size=32)
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            view = memoryview(m)
+            try:
+                for off in range(0, len(m), 16 * 1024 * 1024):
+                    h.update(view[off:off + 16 * 1024 * 1024])
+            finally:
+                view.release()
+    return h.digest()
+
+
+class _Entry:
+    __slots__ = ("path", "dest", "size", "partial", "full", "placed", "failed")
+
+    def __init__(self, path, dest, size):
+        self.path, self.dest, self.size = path, dest, size
+        self.partial = self.full = None
+        self.placed = threading.Event()  # 第一份的放置已结束 (硬链接和跳过都要等它)
+        self.failed = False  # 第一份没放成功，后面相同的文件要顶上
+
+    def _hash(self, fn, *args):
+        try:
+            return fn(self.path, *args)
+        except FileNotFoundError:
+            if self.dest is None: raise
+            self.placed.wait()  # 源文件已被移走，等放置结束后读目标位置
+            return fn(self.dest, *args)
+
+    def get_partial(self):
+        if self.partial is None: self.partial = self._hash(partial_hash, self.size)
+        return self.partial
+
+    def get_full(self):
+        if self.size <= 2 * PARTIAL_BYTES: return self.get_partial()  # 头尾已覆盖整个文件
+        if self.full is None: self.full = self._hash(full_hash)
+        return self.full
+
+
+def _same(a, b):
+    return a.size == b.size and a.get_partial() == b.get_partial() and a.get_full() == b.get_full()
+
+
+class ExactDeduper:
+    """线程安全；同一大小的文件串行比较，不同大小互不影响"""
+
+    def __init__(self, action="skip", log=None):
+        self.action = action  # "skip" / "link"
+        self.log = log
+        self.link_failed = False
+        self.lock = threading.Lock()
+        self.groups = {}  # 大小 -> (锁, [记录])
+        self.dup_files = 0
+        self.bytes_saved = 0
+
+    def find_or_add(self, path, dest):
+        """与之前登记过的某个文件完全相同则返回那个文件的记录，否则登记并返回 (None, 新记录)"""
+        entry = _Entry(path, dest, os.path.getsize(path))
+        with self.lock:
+            group_lock, entries = self.groups.setdefault(entry.size, (threading.Lock(), []))
+        with group_lock:
+            entries[:] = [e for e in entries if not e.failed]
+            for old in entries:
+                try:
+                    if _same(entry, old): return old, None
+                except OSError:
+                    if old.failed: continue  # 第一份放置失败、源文件也不在了
+                    raise
+            entries.append(entry)
+        return None, entry
+
+    def same_file(self, path, other):
+        """单独比较两个文件 (例如目标目录里上次分拣留下的同名文件)"""
+        try:
+            a = _Entry(path, None, os.path.getsize(path))
+            b = _Entry(other, None, os.path.getsize(other))
+        except OSError:
+            return False
+        if not _same(a, b): return False
+        self._count(a.size)
+        return True
+
+    def place(self, placer, src, dest, existing=None):
+        """先查重再放置 (在复制引擎线程里跑)。existing 为目标目录里已有的同名文件。
+        返回实际放置方式；重复文件被跳过时返回 "duplicate" """
+        if existing and self.same_file(src, existing): return "duplicate"
+        while True:
+            orig, entry = self.find_or_add(src, dest)
+            if orig is None:
+                try:
+                    return placer.place(src, dest)
+                except BaseException:
+                    entry.failed = True
+                    raise
+                finally:
+                    entry.placed.set()
+            orig.placed.wait()  # 第一份可能还在另一个线程里放置
+            if not orig.failed: break
+            # 第一份没放成功：它已退出分组，重新查一遍，这一份就成了新的第一份
+        self._count(orig.size)
+        if self.action == "link":
+            try:
+                place_file(orig.dest, dest, "hardlink")
+                return "hardlink"
+            except (PlacementFallback, OSError) as e:
+                with self.lock:
+                    first, self.link_failed = not self.link_failed, True
+                if first and self.log: self.log(f"⚠️ 重复文件无法硬链接：{e}，改为跳过")
+        return "duplicate"
+
+    def _count(self, size):
+        with self.lock:
+            self.dup_files += 1
+            self.bytes_saved += size
+
+    def summary(self):
+        saved = self.bytes_saved
+        text = f"{saved / 1024 ** 3:.2f} GB" if saved >= 1024 ** 3 else f"{saved / 1024 ** 2:.1f} MB"
+        return f"重复文件 {self.dup_files} 个，省下复制 {text}"
@@ -0,0 +1,208 @@
+import os
+import sys
+import re
+import json
+import zlib
+import struct
+import hashlib
+
+# ==========================================
+# 二进制增量补丁 (按内容切块，思路同 rsync / casync)
+# 新旧文件都按内容切成 2KB~64KB 的块: 块边界由字节内容决定 (正则在 C 里找)，
+# 插入或删除几个字节后边界很快重新对齐，不依赖固定偏移。
+# 旧文件的块按 md5 建索引，新文件逐块查找：命中输出 COPY(旧偏移, 长度)，否则输出字面数据。
+# 整个过程只在块级别循环 (100MB 约几万块)，哈希和找边界都在 C 里完成。
+# 补丁 = 魔数 + JSON 头 (新旧文件 sha256、新文件大小) + zlib 压缩的操作流。
+#
+# 生成: python -m apps.delta make 旧文件 新文件 补丁
+# 应用: python -m apps.delta apply 旧文件 补丁 输出文件
+# ==========================================
+
+MAGIC = b"LTDELTA1"
+MIN_CHUNK = 2 * 1024
+MAX_CHUNK = 64 * 1024
+# 随机数据里约每 2KB 出现一次；加上最小块长，平均块约 4KB
+_BOUNDARY = re.compile(rb'[\x00\xff][\x00-\x0f]')
+_OP_COPY = b'C'
+_OP_DATA = b'D'
+
+
+class DeltaError(Exception):
+    pass
+
+
+def sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _chunks(data):
+    """按内容切块，逐个产出 (起点, 终点)"""
+    n = len(data)
+    start = 0
+    while start < n:
+        m = _BOUNDARY.search(data, start + MIN_CHUNK, start + MAX_CHUNK)
+        end = m.end() if m else min(start + MAX_CHUNK, n)
+        yield start, end
+        start = end
+
+
+def _index_chunks(old):
+    """旧文件每个块: (md5, 长度) -> 偏移"""
+    view = memoryview(old)
+    index = {}
+    for start, end in _chunks(old):
+        index.setdefault((hashlib.md5(view[start:end]).digest(), end - start), start)
+    return index
+class _OpWriter:
+    """把操作流压缩写入补丁文件，相邻的 COPY 自动合并"""
+
+    def __init__(self, f):
+        self.f = f
+        self.z = zlib.compressobj(6)
+        self.pending_copy = None  # [偏移, 长度]
+        self.literal = bytearray()
+
+    def _emit(self, data):
+        self.f.write(self.z.compress(data))
+
+    def _flush_copy(self):
+        if self.pending_copy:
+            self._emit(_OP_COPY + struct.pack(">QI", *self.pending_copy))
+            self.pending_copy = None
+
+    def _flush_literal(self):
+        if self.literal:
+            self._emit(_OP_DATA + struct.pack(">I", len(self.literal)) + bytes(self.literal))
+            self.literal = bytearray()
+
+    def copy(self, offset, length):
+        self._flush_literal()
+        pc = self.pending_copy
+        if pc and pc[0] + pc[1] == offset and pc[1] + length < 0xFFFFFFFF:
+            pc[1] += length
+        else:
+            self._flush_copy()
+            self.pending_copy = [offset, length]
+
+    def data(self, buf):
+        self._flush_copy()
+        self.literal.extend(buf)
+        if len(self.literal) >= 1024 * 1024: self._flush_literal()
+
+    def close(self):
+        self._flush_copy()
+        self._flush_literal()
+        self.f.write(self.z.flush())
+
+
+def make_patch(old_path, new_path, patch_path):
+    """生成补丁，返回 (补丁大小, 新文件大小)"""
+    with open(old_path, 'rb') as f:
+        old = f.read()
+    with open(new_path, 'rb') as f:
+        new = f.read()
+    index = _index_chunks(old)
+    header = {"chunking": "content", "source_sha256": hashlib.sha256(old).hexdigest(),
+              "target_sha256": hashlib.sha256(new).hexdigest(), "target_size": len(new)}
+
+    with open(patch_path, 'wb') as f:
+        hdr = json.dumps(header).encode('utf-8')
+        f.write(MAGIC + struct.pack(">I", len(hdr)) + hdr)
+        w = _OpWriter(f)
+        view = memoryview(new)
+        for start, end in _chunks(new):
+            hit = index.get((hashlib.md5(view[start:end]).digest(), end - start))
+            if hit is None:
+                w.data(view[start:end])
+            else:
+                w.copy(hit, end - start)
+        w.close()
+    return os.path.getsize(patch_path), len(new)
+
+
+def read_header(patch_path):
+    with open(patch_path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC: raise DeltaError("不是有效的补丁文件")
+        (hdr_len,) = struct.unpack(">I", f.read(4))
+        return json.loads(f.read(hdr_len).decode('utf-8'))
+
+
+def apply_patch(source_path, patch_path, out_path, expected_sha256=None):
+    """把补丁应用到 source_path，写出 out_path；源文件或结果哈希不符时抛 DeltaError"""
+    header = read_header(patch_path)
+    if sha256_file(source_path) != header['source_sha256']:
+        raise DeltaError("当前程序与补丁的基准版本不一致")
+
+    with open(patch_path, 'rb') as pf, open(source_path, 'rb') as src, open(out_path, 'wb') as out:
+        pf.seek(len(MAGIC))
+        (hdr_len,) = struct.unpack(">I", pf.read(4))
+        pf.seek(hdr_len, os.SEEK_CUR)
+        z = zlib.decompressobj()
+        buf = bytearray()
+
+        def need(k):
+            while len(buf) < k:
+                chunk = pf.read(256 * 1024)
+                if not chunk:
+                    tail = z.flush()
+                    if not tail: raise DeltaError("补丁数据不完整")
+                    buf.extend(tail)
+                else:
+                    buf.extend(z.decompress(chunk))
+
+        while True:
+            if not buf:
+                chunk = pf.read(256 * 1024)
+                if chunk:
+                    buf.extend(z.decompress(chunk))
+                else:
+                    buf.extend(z.flush())
+                if not buf: break
+            op = bytes(buf[:1])
+            if op == _OP_COPY:
+                need(13)
+                offset, length = struct.unpack(">QI", bytes(buf[1:13]))
+                del buf[:13]
+                src.seek(offset)
+                while length > 0:
+                    data = src.read(min(length, 1024 * 1024))
+                    if not data: raise DeltaError("补丁引用超出源文件范围")
+                    out.write(data)
+                    length -= len(data)
+            elif op == _OP_DATA:
+                need(5)
+                (length,) = struct.unpack(">I", bytes(buf[1:5]))
+                need(5 + length)
+                out.write(bytes(buf[5:5 + length]))
+                del buf[:5 + length]
+            else:
+                raise DeltaError("补丁数据损坏")
+
+    actual = sha256_file(out_path)
+    for expected in (header['target_sha256'], expected_sha256):
+        if expected and actual.lower() != expected.lower():
+            os.remove(out_path)
+            raise DeltaError("补丁应用后校验失败")
+    return out_path
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) == 4 and argv[0] == "make":
+        patch_size, new_size = make_patch(argv[1], argv[2], argv[3])
+        print(f"补丁 {patch_size} 字节 / 新文件 {new_size} 字节 ({patch_size / max(new_size, 1):.1%})")
+    elif len(argv) == 4 and argv[0] == "apply":
+        apply_patch(argv[1], argv[2], argv[3])
+        print(f"已生成 {argv[3]}")
+    else:
+        print("用法: python -m apps.delta make 旧文件 新文件 补丁 | apply 旧文件 补丁 输出文件")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
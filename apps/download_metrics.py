@@ -0,0 +1,136 @@
+import os
+import json
+import time
+import random
+import threading
+
+
+# ==========================================
+# 下载各阶段耗时统计
+# 每个任务记录: ttfb(含 DNS 解析和建连) / transfer / probe / move / total (秒)
+# 按 全部 / 域名 / Sheet 三个维度汇总成直方图 + 分位数，
+# 任务结束时导出 JSON 和 Prometheus 文本格式，方便对比不同批次。
+# ==========================================
+
+PHASES = ['ttfb', 'transfer', 'probe', 'move', 'total']
+PHASE_NAMES = {'ttfb': "首字节(含解析建连)", 'transfer': "传输", 'probe': "分辨率探测",
+               'move': "归档移动", 'total': "总耗时"}
+BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300]
+
+
+class PhaseHistogram:
+    MAX_SAMPLES = 10000  # 分位数用蓄水池抽样，内存有上限
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.samples = []
+
+    def add(self, value):
+        for i, b in enumerate(BUCKETS):
+            if value <= b:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        if len(self.samples) < self.MAX_SAMPLES:
+            self.samples.append(value)
+        else:
+            j = random.randrange(self.count)
+            if j < self.MAX_SAMPLES: self.samples[j] = value
+
+    def percentile(self, p):
+        if not self.samples: return 0.0
+        data = sorted(self.samples)
+        idx = min(len(data) - 1, int(round(p / 100 * (len(data) - 1))))
+        return data[idx]
+
+    def to_dict(self):
+        return {"count": self.count, "sum": round(self.sum, 6), "max": round(self.max, 6),
+                "p50": round(self.percentile(50), 6), "p90": round(self.percentile(90), 6),
+                "p99": round(self.percentile(99), 6),
+                "buckets": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], self.counts))}
+
+
+class DownloadMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.groups = {}  # (scope, key) -> {phase: PhaseHistogram}
+        self.bytes = {}  # (scope, key) -> [字节数, 传输秒数]
+        self.started = time.time()
+
+    def record(self, timings, host, sheet, size=0):
+        """记录一个任务的各阶段耗时"""
+        with self.lock:
+            for scope_key in (("all", "all"), ("host", host or "-"), ("sheet", str(sheet))):
+                group = self.groups.setdefault(scope_key, {})
+                for phase in PHASES:
+                    if phase in timings:
+                        group.setdefault(phase, PhaseHistogram()).add(timings[phase])
+                if size:
+                    b = self.bytes.setdefault(scope_key, [0, 0.0])
+                    b[0] += size
+                    b[1] += timings.get('transfer', 0)
+
+    def summary_rows(self):
+        """给「统计」页用的表格行: (维度, 阶段, 次数, p50, p90, p99, 最大)"""
+        rows = []
+        with self.lock:
+            for (scope, key), group in sorted(self.groups.items()):
+                label = "全部" if scope == "all" else f"{'域名' if scope == 'host' else 'Sheet'}: {key}"
+                for phase in PHASES:
+                    h = group.get(phase)
+                    if not h: continue
+                    rows.append((label, PHASE_NAMES[phase], h.count, h.percentile(50), h.percentile(90),
+                                 h.percentile(99), h.max))
+        return rows
+
+    def to_dict(self):
+        with self.lock:
+            data = {"started": int(self.started), "finished": int(time.time()), "groups": []}
+            for (scope, key), group in sorted(self.groups.items()):
+                size, secs = self.bytes.get((scope, key), (0, 0))
+                data["groups"].append({
+                    "scope": scope, "key": key, "bytes": size,
+                    "mb_per_s": round(size / secs / 1024 / 1024, 3) if secs > 0 else 0,
+                    "phases": {p: h.to_dict() for p, h in group.items()}})
+        return data
+
+    def to_prometheus(self):
+        lines = ["# HELP lovetoolbox_download_phase_seconds Per-task download phase duration.",
+                 "# TYPE lovetoolbox_download_phase_seconds histogram"]
+        with self.lock:
+            for (scope, key), group in sorted(self.groups.items()):
+                key = str(key).replace('\\', '\\\\').replace('"', '\\"')
+                for phase, h in group.items():
+                    labels = f'scope="{scope}",key="{key}",phase="{phase}"'
+                    cumulative = 0
+                    for b, c in zip([str(b) for b in BUCKETS] + ["+Inf"], h.counts):
+                        cumulative += c
+                        lines.append(f'lovetoolbox_download_phase_seconds_bucket{{{labels},le="{b}"}} {cumulative}')
+                    lines.append(f'lovetoolbox_download_phase_seconds_sum{{{labels}}} {h.sum:.6f}')
+                    lines.append(f'lovetoolbox_download_phase_seconds_count{{{labels}}} {h.count}')
+            lines.append("# HELP lovetoolbox_download_bytes_total Bytes downloaded.")
+            lines.append("# TYPE lovetoolbox_download_bytes_total counter")
+            for (scope, key), (size, _) in sorted(self.bytes.items()):
+                key = str(key).replace('\\', '\\\\').replace('"', '\\"')
+                lines.append(f'lovetoolbox_download_bytes_total{{scope="{scope}",key="{key}"}} {size}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, save_root):
+        """导出到 save_root/_stats/，返回生成的文件路径"""
+        out_dir = os.path.join(save_root, "_stats")
+        os.makedirs(out_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d_%H%M%S")
+        json_path = os.path.join(out_dir, f"download_stats_{stamp}.json")
+        prom_path = os.path.join(out_dir, f"download_stats_{stamp}.prom")
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        with open(prom_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        return [json_path, prom_path]
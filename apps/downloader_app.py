@@ -9,21 +9,54 @@ import shutil
 import cv2
 import re
 import json
+import queue
+import threading
+import multiprocessing
+from urllib.parse import urlparse
 from PIL import Image
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
+
+from apps.job_journal import JobJournal, task_key
+from apps.asset_index import AssetIndex
+from apps.download_metrics import DownloadMetrics
+from apps.mirrors import MirrorSelector
+from apps.placement import place_file
+from apps.table_stream import TableSource, TableTasks, should_stream
 
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
                              QLabel, QLineEdit, QFileDialog, QComboBox,
                              QProgressBar, QTextEdit, QGroupBox, QMessageBox,
                              QListWidget, QListWidgetItem, QAbstractItemView,
                              QTreeWidget, QTreeWidgetItem, QSplitter, QCheckBox,
-                             QSpinBox, QDialog, QTableWidget, QTableWidgetItem, QHeaderView, QApplication)
+                             QSpinBox, QDialog, QTableWidget, QTableWidgetItem, QHeaderView, QApplication,
+                             QTabWidget)
 from PyQt6.QtCore import Qt, QThread, pyqtSignal, QSize, QTimer, QSettings
 from PyQt6.QtGui import QFont, QColor, QAction, QIcon, QDragEnterEvent, QDropEvent
 
 # 防止 OpenCV 多线程与 ThreadPool 冲突
 cv2.setNumThreads(0)
 
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+
+def probe_resolution(file_path, file_type):
+    """读取图片/视频分辨率，返回 "宽x高" 文件夹名 (模块级函数，可在进程池中运行)"""
+    try:
+        w, h = 0, 0
+        if file_type == 'IMAGE':
+            with Image.open(file_path) as img:
+                w, h = img.size
+        elif file_type == 'VIDEO':
+            cap = cv2.VideoCapture(file_path)
+            if cap.isOpened():
+                w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH));
+                h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+                cap.release()
+        if w > 0 and h > 0: return f"{w}x{h}"
+        return "未知尺寸"
+    except:
+        return "未知尺寸"
+
 
 # === 0. 错误报告详情弹窗 ===
 class ErrorReportDialog(QDialog):
@@ -92,18 +125,86 @@ class ErrorReportDialog(QDialog):
 
 
 # === 1. 核心下载线程 ===
+class PipelineStage:
+    """流水线的一个阶段：固定数量的线程从有界队列取活，处理结果交给 output(item, out)"""
+
+    def __init__(self, name, workers, capacity, handler, output):
+        self.name = name
+        self.workers = workers
+        self.capacity = capacity
+        self.queue = queue.Queue(maxsize=capacity)
+        self.handler = handler
+        self.output = output
+        self.lock = threading.Lock()
+        self.active = 0
+        self.processed = 0
+        self.busy_time = 0.0
+        self.max_depth = 0
+        self.threads = [threading.Thread(target=self._loop, daemon=True) for _ in range(workers)]
+
+    def start(self):
+        for t in self.threads: t.start()
+
+    def put(self, item):
+        self.queue.put(item)
+        depth = self.queue.qsize()
+        with self.lock:
+            if depth > self.max_depth: self.max_depth = depth
+
+    def close(self):
+        for _ in self.threads: self.queue.put(None)
+        for t in self.threads: t.join()
+
+    def _loop(self):
+        while True:
+            item = self.queue.get()
+            if item is None: break
+            with self.lock:
+                self.active += 1
+            t0 = time.time()
+            try:
+                out = self.handler(item)
+            finally:
+                with self.lock:
+                    self.active -= 1
+                    self.processed += 1
+                    self.busy_time += time.time() - t0
+            self.output(item, out)
+
+    def snapshot(self):
+        with self.lock:
+            return (f"{self.name} {self.processed}个 忙碌{self.busy_time:.1f}s 并发{self.workers} "
+                    f"队列峰值{self.max_depth}/{self.capacity}")
+
+
+
 class DownloadWorker(QThread):
     log_signal = pyqtSignal(str)
     progress_signal = pyqtSignal(int)
     file_progress_signal = pyqtSignal(str, int, int)
+    stats_signal = pyqtSignal(str)
     finished_signal = pyqtSignal(dict)
 
-    def __init__(self, tasks, save_root, max_workers, only_missing=False):
+    def __init__(self, tasks, save_root, max_workers, only_missing=False, journal=None, preflight=False):
         super().__init__()
-        self.tasks = tasks
+        self.tasks = tasks  # 任务列表，或流式读表的 TableTasks (边读边下，不整表进内存)
         self.save_root = save_root
         self.max_workers = max_workers
         self.only_missing = only_missing
+        self.preflight = preflight  # 先并发 HEAD 预检大小，再按大小排序下载
+        self.probe_workers = max(1, min(4, (os.cpu_count() or 2) // 2))  # 探测阶段并发
+        self.archive_workers = 2  # 归档阶段并发
+        self.stages = []
+        self.journal = journal  # JobJournal，续传用
+        self.prior_failed = {}  # 从任务日志恢复的、本次不重跑的失败行 (task_key -> 任务)
+        self.asset_index = AssetIndex(save_root)  # ETag / Last-Modified 记录
+        self.metrics = DownloadMetrics()  # 各阶段耗时统计
+        self.mirrors = MirrorSelector()  # 有已知镜像的域名，重试时轮换到其他镜像
+        self.bytes_lock = threading.Lock()
+        self.bytes_total = 0  # 预检得到的总字节数 (0 = 未知)
+        self.bytes_done = 0
+        self.start_time = time.time()
+        self.last_stats_time = 0
         self.is_running = True
 
     def stop(self):
@@ -126,21 +227,7 @@ class DownloadWorker(QThread):
         return cleaned if cleaned else "未命名"
 
     def get_resolution_folder(self, file_path, file_type):
-        try:
-            w, h = 0, 0
-            if file_type == 'IMAGE':
-                with Image.open(file_path) as img:
-                    w, h = img.size
-            elif file_type == 'VIDEO':
-                cap = cv2.VideoCapture(file_path)
-                if cap.isOpened():
-                    w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH));
-                    h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                    cap.release()
-            if w > 0 and h > 0: return f"{w}x{h}"
-            return "未知尺寸"
-        except:
-            return "未知尺寸"
+        return probe_resolution(file_path, file_type)
 
     def check_if_exists(self, sheet, hook, url_hash):
         target_base = os.path.join(self.save_root, sheet, hook)
@@ -151,34 +238,70 @@ class DownloadWorker(QThread):
         return False
 
     def download_single(self, task):
-        if not self.is_running: return False, "用户停止"
+        """顺序执行 下载 -> 探测 -> 归档 三个阶段"""
+        is_ok, msg, job = self.fetch_single(task)
+        if job is None: return is_ok, msg
+        t0 = time.perf_counter()
+        job['res_folder'] = self.get_resolution_folder(job['temp_path'], job['file_type'])
+        task['timings']['probe'] = time.perf_counter() - t0
+        return self.archive_job(job)
+
+    def fetch_single(self, task):
+        """网络阶段：下载到临时文件。返回 (is_ok, msg, job)，job 为 None 表示任务已在本阶段结束"""
+        if not self.is_running: return False, "用户停止", None
         url = task['url'];
         sheet = task['sheet'];
         hook = str(task['hook']).strip()
         raw_name = task['name']
 
-        if pd.isna(url) or not str(url).startswith('http'): return False, "无效链接"
+        if pd.isna(url) or not str(url).startswith('http'): return False, "无效链接", None
         url_hash = self.get_url_hash(url)
         clean_name = self.clean_filename(raw_name)
 
         if self.only_missing:
-            if self.check_if_exists(sheet, hook, url_hash): return True, "已存在(跳过)"
+            if self.check_if_exists(sheet, hook, url_hash): return True, "已存在(跳过)", None
+
+        if self.journal: self.journal.record(task, "running")
+
+        # 各阶段计时 (秒)，随任务字典回传给汇总线程 / 主进程
+        t_start = time.perf_counter()
+        timings = task['timings'] = {}
+        task['host'] = urlparse(url).hostname or ""
+
+        # 覆盖模式下，已下载过且本地文件完好的素材走条件请求
+        known = self.asset_index.get(task) is not None
+        cached = self.asset_index.get_valid(task) if not self.only_missing else None
 
         temp_dir = os.path.join(self.save_root, "_temp_downloading")
         if not os.path.exists(temp_dir): os.makedirs(temp_dir, exist_ok=True)
-        temp_path = os.path.join(temp_dir, f"temp_{url_hash}_{int(time.time() * 1000)}")
+        # 多进程分片时各进程共用临时目录，文件名带上 pid 防止撞车
+        temp_path = os.path.join(temp_dir, f"temp_{url_hash}_{os.getpid()}_{int(time.time() * 1000)}")
 
         success = False;
         ext = ".bin";
         file_type = "OTHER"
+        validators = {}
+        # 已知有镜像的域名按测速排序，每次重试换一个
+        sources = [u for _, u in self.mirrors.ordered(url)] if self.mirrors.has_mirrors(url) else [url]
 
-        for _ in range(3):
-            if not self.is_running: return False, "用户停止"
+        for attempt in range(3):
+            if not self.is_running: return False, "用户停止", None
+            req_url = sources[attempt % len(sources)]
             try:
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-                with requests.get(url, headers=headers, stream=True, timeout=40) as r:
+                headers = {'User-Agent': USER_AGENT}
+                if cached:
+                    if cached.get('etag'): headers['If-None-Match'] = cached['etag']
+                    if cached.get('last_modified'): headers['If-Modified-Since'] = cached['last_modified']
+                t_req = time.perf_counter()
+                with requests.get(req_url, headers=headers, stream=True, timeout=40) as r:
+                    timings['ttfb'] = time.perf_counter() - t_req
+                    if r.status_code == 304 and cached:
+                        task['final_path'] = cached['path']
+                        task['asset_status'] = "revalidated"
+                        timings['total'] = time.perf_counter() - t_start
+                        return True, "未变化(304)", None
                     r.raise_for_status()
+                    validators = {'etag': r.headers.get('ETag'), 'last_modified': r.headers.get('Last-Modified')}
                     total_length = int(r.headers.get('content-length', 0))
                     ct = r.headers.get('content-type', '')
                     ge = mimetypes.guess_extension(ct)
@@ -192,15 +315,19 @@ class DownloadWorker(QThread):
                         file_type = "VIDEO"
 
                     downloaded = 0
+                    t_xfer = time.perf_counter()
                     with open(temp_path, 'wb') as f:
                         for chunk in r.iter_content(chunk_size=65536):
                             if not self.is_running:
                                 f.close();
                                 if os.path.exists(temp_path): os.remove(temp_path)
-                                return False, "用户停止"
+                                return False, "用户停止", None
                             f.write(chunk)
                             downloaded += len(chunk)
+                            self.count_bytes(len(chunk))
                             self.file_progress_signal.emit(clean_name, downloaded, total_length)
+                    timings['transfer'] = time.perf_counter() - t_xfer
+                    task['bytes'] = downloaded
                     success = True;
                     break
             except:
@@ -208,14 +335,14 @@ class DownloadWorker(QThread):
 
         if not success:
             if os.path.exists(temp_path): os.remove(temp_path)
-            return False, "下载失败(3次重试)"
+            return False, "下载失败(3次重试)", None
 
         # 0KB / 伪装网页检测
         if os.path.exists(temp_path):
             size = os.path.getsize(temp_path)
             if size == 0:
                 os.remove(temp_path)
-                return False, "文件为空(0KB)"
+                return False, "文件为空(0KB)", None
             if size < 10 * 1024:
                 try:
                     with open(temp_path, 'rb') as f:
@@ -223,57 +350,450 @@ class DownloadWorker(QThread):
                         if b'<html' in header or b'<!doctype' in header or b'<body' in header or b'{' in header:
                             f.close();
                             os.remove(temp_path)
-                            return False, "链接失效(下载内容为网页或JSON)"
+                            return False, "链接失效(下载内容为网页或JSON)", None
                 except:
                     pass
 
+        job = {'task': task, 'temp_path': temp_path, 'file_type': file_type, 'ext': ext,
+               'url_hash': url_hash, 'clean_name': clean_name, 'validators': validators, 'known': known,
+               't_start': t_start}
+        return True, "已下载", job
+
+    def archive_job(self, job):
+        """归档阶段：建目录、移动临时文件、更新素材记录"""
+        task = job['task'];
+        url = task['url'];
+        sheet = task['sheet'];
+        hook = str(task['hook']).strip()
+        temp_path = job['temp_path'];
+        file_type = job['file_type'];
+        ext = job['ext']
+        url_hash = job['url_hash'];
+        clean_name = job['clean_name'];
+        validators = job['validators']
+        t_move = time.perf_counter()
         try:
-            res_folder = self.get_resolution_folder(temp_path, file_type)
+            res_folder = job.get('res_folder') or "未知尺寸"
             final_dir = os.path.join(self.save_root, sheet, hook, file_type, res_folder)
-            if not os.path.exists(final_dir): os.makedirs(final_dir)
+            if not os.path.exists(final_dir): os.makedirs(final_dir, exist_ok=True)
             final_name = f"{url_hash}_{clean_name}{ext}"
             final_path = os.path.join(final_dir, final_name)
             if os.path.exists(final_path): os.remove(final_path)
-            shutil.move(temp_path, final_path)
+            place_file(temp_path, final_path, "move")
+            task['final_path'] = final_path
+            # 覆盖模式下同一行的素材变了且归档位置不同 (如分辨率变化)，删掉这一行的旧文件
+            old = self.asset_index.get(task) if not self.only_missing else None
+            if old and old.get('path') and old['path'] != final_path and os.path.exists(old['path']):
+                os.remove(old['path'])
+            if validators.get('etag') or validators.get('last_modified'):
+                validators.update(size=os.path.getsize(final_path), path=final_path)
+                task['validators'] = validators
+            task['asset_status'] = "changed" if job['known'] else "new"
+            task['timings']['move'] = time.perf_counter() - t_move
+            task['timings']['total'] = time.perf_counter() - job['t_start']
             self.file_progress_signal.emit(clean_name, 100, 100)
             return True, "成功"
         except Exception as e:
             if os.path.exists(temp_path): os.remove(temp_path)
             return False, f"归档错误:{e}"
 
+    # --- 预检 & 统计 ---
+    def fmt_bytes(self, n):
+        if n >= 1024 ** 3: return f"{n / 1024 ** 3:.2f} GB"
+        if n >= 1024 ** 2: return f"{n / 1024 ** 2:.1f} MB"
+        return f"{n / 1024:.0f} KB"
+
+    def probe_head(self, task):
+        """HEAD 预检大小和类型；服务器不支持 HEAD 时退回 Range: bytes=0-0"""
+        url = task['url']
+        if pd.isna(url) or not str(url).startswith('http'): return 0, ""
+        if self.only_missing and self.check_if_exists(task['sheet'], str(task['hook']).strip(), self.get_url_hash(url)):
+            return 0, ""  # 会被跳过，不计入总量
+        size, ct = 0, ""
+        try:
+            r = requests.head(url, headers={'User-Agent': USER_AGENT}, timeout=15, allow_redirects=True)
+            if r.ok:
+                size = int(r.headers.get('content-length', 0) or 0)
+                ct = r.headers.get('content-type', '')
+            if not size:
+                headers = {'User-Agent': USER_AGENT, 'Range': 'bytes=0-0'}
+                with requests.get(url, headers=headers, stream=True, timeout=15) as r2:
+                    total = r2.headers.get('content-range', '').split('/')[-1]  # "bytes 0-0/12345"
+                    if total.isdigit(): size = int(total)
+                    ct = r2.headers.get('content-type', ct)
+        except Exception:
+            pass
+        return size, ct
+
+    def run_preflight(self):
+        """并发预检所有任务；空间不足返回错误信息，否则按大小从大到小排好任务"""
+        if not isinstance(self.tasks, list): return self.run_preflight_stream()
+        self.log_signal.emit(f"🔎 正在预检 {len(self.tasks)} 个链接的大小...")
+        checked = 0
+        with ThreadPoolExecutor(max_workers=max(16, self.max_workers * 4)) as executor:
+            future_to_task = {executor.submit(self.probe_head, t): t for t in self.tasks}
+            for future in as_completed(future_to_task):
+                if not self.is_running: return "用户停止"
+                task = future_to_task[future]
+                task['size'], ct = future.result()
+                if ct: task['content_type'] = ct
+                checked += 1
+                if checked % 50 == 0: self.stats_signal.emit(f"🔎 预检中: {checked}/{len(self.tasks)}")
+
+        self.bytes_total = sum(t.get('size', 0) for t in self.tasks)
+        unknown = sum(1 for t in self.tasks if not t.get('size'))
+        aborted = self.check_space(unknown)
+        if aborted: return aborted
+
+        # 大文件先下 (LPT 调度)，避免几个大视频排在最后拖长整体耗时
+        self.tasks.sort(key=lambda t: t.get('size', 0), reverse=True)
+        return None
+
+    def run_preflight_stream(self):
+        """流式任务：边读表边预检，只累计总量 (按大小排序要把全部任务留在内存里，流式模式不排)"""
+        self.log_signal.emit(f"🔎 正在预检 {len(self.tasks)} 个链接的大小 (流式读取，不按大小排序)...")
+        workers = max(16, self.max_workers * 4)
+        checked = unknown = 0
+        self.bytes_total = 0
+
+        def collect(futures):
+            nonlocal checked, unknown
+            for future in futures:
+                size = future.result()[0]
+                self.bytes_total += size
+                if not size: unknown += 1
+                checked += 1
+                if checked % 50 == 0: self.stats_signal.emit(f"🔎 预检中: {checked}/{len(self.tasks)}")
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = set()
+            for t in self.tasks:
+                if not self.is_running: return "用户停止"
+                pending.add(executor.submit(self.probe_head, t))
+                if len(pending) >= workers * 4:  # 在途数量有上限，内存不随行数增长
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+            collect(as_completed(pending))
+        if not self.is_running: return "用户停止"
+        return self.check_space(unknown)
+
+    def check_space(self, unknown):
+        free = shutil.disk_usage(self.save_root).free
+        self.log_signal.emit(f"📦 预计下载 {self.fmt_bytes(self.bytes_total)} (未知大小 {unknown} 个)，"
+                             f"磁盘剩余 {self.fmt_bytes(free)}")
+        if self.bytes_total > free:
+            return f"磁盘空间不足：需要 {self.fmt_bytes(self.bytes_total)}，剩余 {self.fmt_bytes(free)}"
+        return None
+
+    def count_bytes(self, n):
+        with self.bytes_lock:
+            self.bytes_done += n
+            now = time.time()
+            if now - self.last_stats_time < 0.5: return
+            self.last_stats_time = now
+        self.emit_stats()
+
+    def emit_stats(self):
+        elapsed = max(time.time() - self.start_time, 0.001)
+        speed = self.bytes_done / elapsed
+        text = f"📊 已下载 {self.fmt_bytes(self.bytes_done)} | {self.fmt_bytes(speed)}/s"
+        if self.bytes_total > 0:
+            remaining = max(self.bytes_total - self.bytes_done, 0)
+            eta = int(remaining / speed) if speed > 0 else 0
+            text += f" | 剩余 {self.fmt_bytes(remaining)} / 共 {self.fmt_bytes(self.bytes_total)} | 预计 {eta // 60}分{eta % 60:02d}秒"
+        if self.stages:
+            text += " | 队列 " + " ".join(f"{st.name}{st.queue.qsize()}" for st in self.stages)
+        self.stats_signal.emit(text)
+
+    def process_tasks(self, tasks, on_result):
+        """三段流水线跑一批任务：下载(I/O 线程) -> 探测(视频走进程池) -> 归档移动，
+        阶段之间用有界队列连接。每完成一个任务就在当前线程回调 on_result(task, is_ok, msg)"""
+        results = queue.Queue()
+        probe_pool = None
+        pool_lock = threading.Lock()
+
+        def run_fetch(task):
+            try:
+                return self.fetch_single(task)
+            except Exception as e:
+                return False, f"系统异常: {e}", None
+
+        def after_fetch(task, out):
+            is_ok, msg, job = out
+            if job is None:
+                results.put((task, is_ok, msg))
+            else:
+                probe_stage.put(job)  # 队列满时阻塞，形成背压
+
+        def run_probe(job):
+            nonlocal probe_pool
+            t0 = time.perf_counter()
+            if job['file_type'] == 'VIDEO':
+                # OpenCV 解码放进程池，不占下载线程，也不受 GIL 影响
+                with pool_lock:
+                    if probe_pool is None: probe_pool = ProcessPoolExecutor(max_workers=self.probe_workers)
+                try:
+                    job['res_folder'] = probe_pool.submit(probe_resolution, job['temp_path'], 'VIDEO').result()
+                except Exception:
+                    job['res_folder'] = "未知尺寸"
+            else:
+                job['res_folder'] = probe_resolution(job['temp_path'], job['file_type'])
+            job['task']['timings']['probe'] = time.perf_counter() - t0
+            return job
+
+        def run_archive(job):
+            try:
+                return self.archive_job(job)
+            except Exception as e:
+                return False, f"归档错误:{e}"
+
+        fetch_stage = PipelineStage("下载", self.max_workers, self.max_workers * 2, run_fetch, after_fetch)
+        probe_stage = PipelineStage("探测", self.probe_workers, self.max_workers * 2, run_probe,
+                                    lambda job, out: archive_stage.put(out))
+        archive_stage = PipelineStage("归档", self.archive_workers, self.max_workers * 2, run_archive,
+                                      lambda job, out: results.put((job['task'],) + tuple(out)))
+        self.stages = [fetch_stage, probe_stage, archive_stage]
+
+        def feeder():
+            try:
+                for t in tasks:
+                    fetch_stage.put(t)
+                # 按顺序关闭：上游排空后下游才收尾
+                for stage in self.stages: stage.close()
+            finally:
+                if probe_pool is not None: probe_pool.shutdown()
+                results.put(None)
+
+        for stage in self.stages: stage.start()
+        threading.Thread(target=feeder, daemon=True).start()
+
+        while True:
+            item = results.get()
+            if item is None: break
+            task, is_ok, msg = item
+            if msg == "用户停止": continue
+            on_result(task, is_ok, msg)
+
+    def stage_summary(self):
+        return " | ".join(st.snapshot() for st in getattr(self, 'stages', []))
+
+    def on_task_done(self, task, is_ok, msg):
+        """汇总单个任务的结果：日志、失败清单、耗时统计、总进度"""
+        if is_ok and task.get('timings'):
+            self.metrics.record(task['timings'], task.get('host'), task.get('sheet'), task.get('bytes', 0))
+        if is_ok:
+            status = task.get('asset_status')
+            if "已存在" in msg:
+                self.skipped_count += 1
+                if self.journal: self.journal.record(task, "skipped")
+            else:
+                if status == "revalidated":
+                    self.revalidated_count += 1
+                elif status == "changed":
+                    self.changed_count += 1
+                    self.log_signal.emit(f"✅ [已变化] {task['name']}")
+                else:
+                    self.new_count += 1
+                    self.log_signal.emit(f"✅ [新增] {task['name']}")
+                if task.get('validators'): self.asset_index.update(task, task['validators'])
+                if self.journal: self.journal.record(task, "done", path=task.get('final_path'))
+        else:
+            self.log_signal.emit(f"❌ {task['name']}: {msg}")
+            task['error'] = msg
+            self.failed_list.append(task)
+            if self.journal: self.journal.record(task, "failed", error=msg)
+        self.completed += 1
+        self.progress_signal.emit(int(self.completed / self.total * 100))
+
+    def reset_counters(self):
+        self.total = len(self.tasks)
+        self.completed = 0
+        self.failed_list = []
+        self.skipped_count = 0
+        self.revalidated_count = 0
+        self.changed_count = 0
+        self.new_count = 0
+        if self.journal: self.journal.begin()
+
+    def emit_finished(self, aborted=None):
+        if self.journal:
+            # 用户中途停止或预检中止时不写 end，下次打开同一任务可以续传
+            if self.is_running and not aborted:
+                self.journal.end()
+            else:
+                self.journal.close()
+        try:
+            self.asset_index.save()
+        except Exception as e:
+            self.log_signal.emit(f"⚠️ 素材索引保存失败: {e}")
+        if self.stages: self.log_signal.emit(f"🧵 流水线: {self.stage_summary()}")
+        if self.skipped_count > 0: self.log_signal.emit(f"⏭️ 智能跳过了 {self.skipped_count} 个已存在的文件")
+        if self.revalidated_count or self.changed_count:
+            self.log_signal.emit(f"🔁 校验未变化 {self.revalidated_count} 个 | ♻️ 已变化 {self.changed_count} 个 | "
+                                 f"🆕 新增 {self.new_count} 个")
+        self.emit_stats()
+        report = {"failed": list(self.prior_failed.values()) + self.failed_list, "skipped": self.skipped_count,
+                  "revalidated": self.revalidated_count, "changed": self.changed_count, "new": self.new_count,
+                  "metrics_rows": self.metrics.summary_rows()}
+        if report['metrics_rows']:
+            try:
+                paths = self.metrics.export(self.save_root)
+                self.log_signal.emit(f"📈 耗时统计已导出: {paths[0]}")
+            except Exception as e:
+                self.log_signal.emit(f"⚠️ 耗时统计导出失败: {e}")
+        if aborted: report['aborted'] = aborted
+        self.finished_signal.emit(report)
+
+    def start_phase(self):
+        """下载前的公共准备：计数清零、可选预检；返回中止原因或 None"""
+        self.reset_counters()
+        aborted = self.run_preflight() if self.preflight else None
+        self.start_time = time.time()
+        return aborted
+
     def run(self):
-        total = len(self.tasks)
-        completed = 0;
-        failed_list = [];
-        skipped_count = 0
+        aborted = None
         try:
-            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                future_to_task = {executor.submit(self.download_single, t): t for t in self.tasks}
-                for future in as_completed(future_to_task):
-                    if not self.is_running: break
-                    task = future_to_task[future]
-                    try:
-                        is_ok, msg = future.result()
-                        if is_ok:
-                            if "已存在" in msg:
-                                skipped_count += 1
-                            else:
-                                self.log_signal.emit(f"✅ {task['name']}")
-                        else:
-                            self.log_signal.emit(f"❌ {task['name']}: {msg}")
-                            task['error'] = msg
-                            failed_list.append(task)
-                    except Exception as e:
-                        self.log_signal.emit(f"❌ 系统异常: {str(e)}")
-                        task['error'] = str(e)
-                        failed_list.append(task)
-                    completed += 1
-                    self.progress_signal.emit(int(completed / total * 100))
+            aborted = self.start_phase()
+            if aborted:
+                self.log_signal.emit(f"❌ {aborted}")
+            else:
+                self.process_tasks(self.tasks, self.on_task_done)
         except Exception as e:
             self.log_signal.emit(f"⚠️ 线程池异常: {e}")
         finally:
-            if skipped_count > 0: self.log_signal.emit(f"⏭️ 智能跳过了 {skipped_count} 个已存在的文件")
-            self.finished_signal.emit({"failed": failed_list, "skipped": skipped_count})
+            self.emit_finished(aborted)
+
+
+# === 1.1 多进程分片下载 ===
+def _shard_main(shard_id, tasks, save_root, max_workers, only_missing, event_queue, stop_event):
+    """子进程入口：用自己的线程池下载分到的任务，结果通过 event_queue 回传给主进程"""
+    worker = DownloadWorker(tasks, save_root, max_workers, only_missing=only_missing)
+
+    # 单文件进度每个 chunk 都会触发，跨进程传输前先节流
+    last_sent = {}
+
+    def forward_file_progress(name, downloaded, total):
+        now = time.time()
+        if (downloaded == 100 and total == 100) or now - last_sent.get(name, 0) >= 0.2:
+            last_sent[name] = now
+            event_queue.put(("file", (name, downloaded, total)))
+
+    # 子进程主线程在跑 process_tasks，没有 Qt 事件循环，排队连接永远送不到；直接在发信号的下载线程里调用
+    worker.file_progress_signal.connect(forward_file_progress, Qt.ConnectionType.DirectConnection)
+    threading.Thread(target=lambda: (stop_event.wait(), worker.stop()), daemon=True).start()
+
+    # 已下载字节数定期汇报给主进程，用于总速度/剩余时间
+    sent_bytes = [0]
+
+    def flush_bytes():
+        done = worker.bytes_done
+        if done > sent_bytes[0]:
+            event_queue.put(("bytes", done - sent_bytes[0]))
+            sent_bytes[0] = done
+
+    def bytes_reporter():
+        while not stop_event.wait(0.5): flush_bytes()
+
+    threading.Thread(target=bytes_reporter, daemon=True).start()
+
+    try:
+        worker.process_tasks(tasks, lambda t, ok, msg: event_queue.put(("result", (t, ok, msg))))
+    except Exception as e:
+        event_queue.put(("log", f"⚠️ 分片 {shard_id} 异常: {e}"))
+    finally:
+        flush_bytes()
+        event_queue.put(("done", shard_id))
+
+
+class ShardedDownloadWorker(DownloadWorker):
+    """按 URL 哈希把任务切成 N 片，每片交给一个独立进程 (各自带线程池) 下载"""
+
+    def __init__(self, tasks, save_root, max_workers, num_procs, only_missing=False, journal=None, preflight=False):
+        super().__init__(tasks, save_root, max_workers, only_missing=only_missing, journal=journal,
+                         preflight=preflight)
+        self.num_procs = max(1, num_procs)
+        self.stop_event = None
+
+    def stop(self):
+        super().stop()
+        if self.stop_event is not None: self.stop_event.set()
+
+    def split_shards(self):
+        # 同一个 URL 永远落在同一个分片，最终文件名 (url_hash 前缀) 不会跨进程冲突
+        shards = [[] for _ in range(self.num_procs)]
+        for t in self.tasks:
+            h = self.get_url_hash(t['url'])
+            idx = int(h, 16) % self.num_procs if h != "no_hash" else 0
+            shards[idx].append(t)
+        return shards
+
+    def run(self):
+        ctx = multiprocessing.get_context("spawn")
+        event_queue = ctx.Queue()
+        self.stop_event = ctx.Event()
+        procs = []
+        aborted = None
+        try:
+            aborted = self.start_phase()
+            if aborted:
+                self.log_signal.emit(f"❌ {aborted}")
+                return
+            for i, shard in enumerate(self.split_shards()):
+                if not shard: continue
+                p = ctx.Process(target=_shard_main,
+                                args=(i, shard, self.save_root, self.max_workers, self.only_missing,
+                                      event_queue, self.stop_event))
+                p.start()
+                procs.append(p)
+            self.log_signal.emit(f"🧩 已启动 {len(procs)} 个下载进程 (每个 {self.max_workers} 线程)")
+
+            pending = len(procs)
+            while pending > 0:
+                try:
+                    kind, payload = event_queue.get(timeout=0.5)
+                except queue.Empty:
+                    if not any(p.is_alive() for p in procs):
+                        self.log_signal.emit("⚠️ 下载进程意外退出")
+                        break
+                    continue
+                if kind == "result":
+                    self.on_task_done(*payload)
+                elif kind == "file":
+                    self.file_progress_signal.emit(*payload)
+                elif kind == "bytes":
+                    self.count_bytes(payload)
+                elif kind == "log":
+                    self.log_signal.emit(payload)
+                elif kind == "done":
+                    pending -= 1
+        except Exception as e:
+            self.log_signal.emit(f"⚠️ 多进程调度异常: {e}")
+        finally:
+            self.stop_event.set()
+            for p in procs:
+                p.join(timeout=5)
+                if p.is_alive(): p.terminate()
+            self.emit_finished(aborted)
+
+
+# === 1.2 流式表格的 Hook 统计 ===
+class HookCountWorker(QThread):
+    """流式表格第一次统计某个 Hook 列要读一遍整个文件，放到后台，结果缓存在 TableSource 里"""
+    result_signal = pyqtSignal(str)  # 统计完成的列名
+    error_signal = pyqtSignal(str)
+
+    def __init__(self, source, col):
+        super().__init__()
+        self.source = source
+        self.col = col
+
+    def run(self):
+        try:
+            self.source.count_hooks(self.col)
+            self.result_signal.emit(self.col)
+        except Exception as e:
+            self.error_signal.emit(str(e))
 
 
 # === 主窗口 ===
@@ -285,7 +805,9 @@ class DownloaderApp(QWidget):
         self.setAcceptDrops(True)
 
         self.df_dict = {}
+        self.stream = None  # 大表格流式读取时的 TableSource (此时 df_dict 为空)
         self.worker = None
+        self.hook_counter = None  # 正在后台统计 Hook 的线程
         self.is_loading_hooks = False
         self.active_downloads = {}
 
@@ -427,9 +949,18 @@ class DownloaderApp(QWidget):
         self.spin_thread.setRange(1, 16);
         self.spin_thread.setValue(4);
         ht.addWidget(self.spin_thread)
+        ht.addWidget(QLabel("进程数:"));
+        self.spin_procs = QSpinBox();
+        self.spin_procs.setRange(1, max(1, os.cpu_count() or 1));
+        self.spin_procs.setValue(1);
+        self.spin_procs.setToolTip("大于 1 时按链接哈希分片，多进程并行下载");
+        ht.addWidget(self.spin_procs)
         ht.addSpacing(20);
         self.chk_overwrite = QCheckBox("强制覆盖已存在文件");
         ht.addWidget(self.chk_overwrite);
+        self.chk_preflight = QCheckBox("预检大小");
+        self.chk_preflight.setToolTip("下载前并发 HEAD 预检：估算总量、检查磁盘空间、大文件优先");
+        ht.addWidget(self.chk_preflight);
         ht.addStretch();
         self.lbl_stats = QLabel("📊 实时统计: 0 个任务");
         self.lbl_stats.setStyleSheet("font-weight: bold; color: #2e7d32; font-size: 13px;");
@@ -443,7 +974,7 @@ class DownloaderApp(QWidget):
         self.btn_retry = QPushButton("🔄 检查重试");
         self.btn_retry.setFixedHeight(40);
         self.btn_retry.setStyleSheet("background-color: #ff9800; color: white; font-weight: bold;");
-        self.btn_retry.clicked.connect(lambda: self.run_download(only_missing=True))
+        self.btn_retry.clicked.connect(lambda: self.run_download(only_missing=True, retry_failed=True))
         self.btn_stop = QPushButton("🛑 停止");
         self.btn_stop.setFixedHeight(40);
         self.btn_stop.setStyleSheet("background-color: #f44336; color: white; font-weight: bold;");
@@ -471,13 +1002,18 @@ class DownloaderApp(QWidget):
         self.table_active.setColumnWidth(1, 150)
         self.table_active.setMaximumHeight(150);
         main.addWidget(self.table_active)
-        lbl_log = QLabel("📜 运行日志");
-        lbl_log.setStyleSheet("font-weight: bold; margin-top: 5px;");
-        main.addWidget(lbl_log)
+        self.tabs = QTabWidget()
         self.log_area = QTextEdit();
         self.log_area.setMinimumHeight(120);
         self.log_area.setReadOnly(True);
-        main.addWidget(self.log_area)
+        self.tabs.addTab(self.log_area, "📜 运行日志")
+        self.table_stats = QTableWidget();
+        self.table_stats.setColumnCount(7);
+        self.table_stats.setHorizontalHeaderLabels(["维度", "阶段", "次数", "P50", "P90", "P99", "最大"])
+        self.table_stats.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table_stats.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.tabs.addTab(self.table_stats, "📈 统计")
+        main.addWidget(self.tabs)
         self.setLayout(main)
 
     def toggle_ui_state(self, enabled):
@@ -487,7 +1023,9 @@ class DownloaderApp(QWidget):
         self.g4.setEnabled(enabled)
         self.btn_path.setEnabled(enabled);
         self.spin_thread.setEnabled(enabled);
+        self.spin_procs.setEnabled(enabled);
         self.chk_overwrite.setEnabled(enabled)
+        self.chk_preflight.setEnabled(enabled)
         self.btn_start.setEnabled(enabled);
         self.btn_retry.setEnabled(enabled);
         self.btn_stop.setEnabled(not enabled)
@@ -530,12 +1068,23 @@ class DownloaderApp(QWidget):
             self.table_active.item(row, 2).setText(self.format_size(downloaded))
             self.table_active.item(row, 3).setText(self.format_size(total))
 
+    def fill_stats_table(self, rows):
+        self.table_stats.setRowCount(len(rows))
+        for i, (label, phase, count, p50, p90, p99, mx) in enumerate(rows):
+            values = [label, phase, str(count)] + [f"{v * 1000:.0f} ms" if v < 1 else f"{v:.2f} s"
+                                                  for v in (p50, p90, p99, mx)]
+            for j, v in enumerate(values): self.table_stats.setItem(i, j, QTableWidgetItem(v))
+
     def load_settings(self):
         self.spin_thread.setValue(self.settings.value("threads", 4, type=int))
+        self.spin_procs.setValue(self.settings.value("processes", 1, type=int))
+        self.chk_preflight.setChecked(self.settings.value("preflight", False, type=bool))
         self.chk_overwrite.setChecked(False)  # 默认不覆盖
 
     def save_settings(self):
         self.settings.setValue("threads", self.spin_thread.value())
+        self.settings.setValue("processes", self.spin_procs.value())
+        self.settings.setValue("preflight", self.chk_preflight.isChecked())
 
     def dragEnterEvent(self, event: QDragEnterEvent):
         if event.mimeData().hasUrls():
@@ -552,23 +1101,35 @@ class DownloaderApp(QWidget):
         fname, _ = QFileDialog.getOpenFileName(self, "选择表格", "", "Excel/CSV (*.xlsx *.xls *.csv)")
         if fname: self.process_file(fname)
 
-    def process_file(self, fname):
+    def has_table(self):
+        return bool(self.df_dict) or self.stream is not None
+
+    def process_file(self, fname, stream=None):
+        """stream=None 时按文件大小自动决定是否流式读取"""
         self.lbl_file.setText(os.path.basename(fname));
         self.df_dict = {}
+        self.stream = None
         try:
-            if fname.endswith('.csv'):
+            if stream is None: stream = should_stream(fname)
+            if stream:
+                self.log_area.append("📄 表格较大，使用流式读取 (不整表载入内存)...")
+                self.stream = TableSource(fname)
+                columns = self.stream.columns
+            elif fname.endswith('.csv'):
                 self.df_dict['CSV'] = pd.read_csv(fname)
             else:
                 xls = pd.ExcelFile(fname)
                 for s in xls.sheet_names: self.df_dict[s] = pd.read_excel(fname, sheet_name=s)
+            if not stream: columns = {s: [str(c) for c in df.columns] for s, df in self.df_dict.items()}
             self.list_sheets.clear()
-            for s in self.df_dict:
+            for s in columns:
                 item = QListWidgetItem(s);
                 item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable);
                 item.setCheckState(Qt.CheckState.Checked);
                 self.list_sheets.addItem(item)
-            df0 = list(self.df_dict.values())[0];
-            cols = [str(c) for c in df0.columns]
+            cols = list(columns.values())[0]
+            # 先填好再统一刷新 (流式模式下第一次统计某列要读一遍表，在后台进行)
+            self.combo_hook.blockSignals(True)
             self.combo_hook.clear();
             self.combo_hook.addItems(cols);
             self.combo_url.clear();
@@ -580,10 +1141,29 @@ class DownloaderApp(QWidget):
                 if 'hook' in cl: self.combo_hook.setCurrentIndex(i)
                 if 'link' in cl or 'url' in cl: self.combo_url.setCurrentIndex(i)
                 if 'name' in cl: self.combo_name.setCurrentIndex(i)
+            self.combo_hook.blockSignals(False)
             self.refresh_hooks_and_stats()
         except Exception as e:
+            self.combo_hook.blockSignals(False)
             QMessageBox.critical(self, "错误", f"读取失败: {e}")
 
+    def count_hooks_async(self, col):
+        """后台统计完再回来刷新列表；统计期间列表清空，不能开始下载"""
+        self.list_source.clear()
+        self.list_target.clear()
+        self.lbl_stats.setText(f"⏳ 正在统计 Hook 列「{col}」(大表格需要读一遍文件)...")
+        if self.hook_counter is not None and self.hook_counter.isRunning():
+            if self.hook_counter.source is self.stream and self.hook_counter.col == col: return
+        self.hook_counter = HookCountWorker(self.stream, col)
+        self.hook_counter.result_signal.connect(self.on_hooks_counted)
+        self.hook_counter.error_signal.connect(lambda e: QMessageBox.critical(self, "错误", f"统计 Hook 失败: {e}"))
+        self.hook_counter.start()
+
+    def on_hooks_counted(self, col):
+        # 统计期间换了文件或 Hook 列时，旧结果已缓存，不再刷新界面
+        if self.sender().source is not self.stream or col != self.combo_hook.currentText(): return
+        self.refresh_hooks_and_stats()
+
     def sort_list_widget(self, list_widget):
         list_widget.blockSignals(True)
         items = []
@@ -627,17 +1207,23 @@ class DownloaderApp(QWidget):
         self.on_source_item_changed(None)
 
     def refresh_hooks_and_stats(self):
-        if not self.df_dict: return
-        self.is_loading_hooks = True
+        if not self.has_table(): return
         col = self.combo_hook.currentText()
         if not col: return
+        if self.stream is not None and col not in self.stream.hook_counts:
+            self.count_hooks_async(col)
+            return
+        self.is_loading_hooks = True
         all_hooks = set()
+        counts = self.stream.hook_counts[col] if self.stream is not None else {}
         for i in range(self.list_sheets.count()):
             it = self.list_sheets.item(i)
             if it.checkState() == Qt.CheckState.Checked:
                 s = it.text()
                 # 直接读取原始数据，不进行自动填充
-                if s in self.df_dict and col in self.df_dict[s].columns:
+                if self.stream is not None:
+                    all_hooks.update(counts.get(s, {}))
+                elif s in self.df_dict and col in self.df_dict[s].columns:
                     all_hooks.update(self.df_dict[s][col].dropna().astype(str).unique())
         self.list_source.blockSignals(True);
         self.list_source.clear();
@@ -661,7 +1247,7 @@ class DownloaderApp(QWidget):
         self.on_source_item_changed(None)
 
     def update_task_stats(self):
-        if self.is_loading_hooks or not self.df_dict: return
+        if self.is_loading_hooks or not self.has_table(): return
         sel_sheets = [self.list_sheets.item(i).text() for i in range(self.list_sheets.count()) if
                       self.list_sheets.item(i).checkState() == Qt.CheckState.Checked]
         sel_hooks = set();
@@ -673,9 +1259,13 @@ class DownloaderApp(QWidget):
         self.lbl_selected_count.setText(f"✅ 已选: {len(sel_hooks)}")
         h_col = self.combo_hook.currentText();
         total = 0
-        for s in sel_sheets:
-            df = self.df_dict[s]
-            if h_col in df.columns: total += df[h_col].astype(str).isin(sel_hooks).sum()
+        if self.stream is not None:
+            counts = self.stream.hook_counts.get(h_col, {})  # 还没统计完时先按 0 显示
+            total = sum(n for s in sel_sheets for h, n in counts.get(s, {}).items() if h in sel_hooks)
+        else:
+            for s in sel_sheets:
+                df = self.df_dict[s]
+                if h_col in df.columns: total += df[h_col].astype(str).isin(sel_hooks).sum()
         self.lbl_stats.setText(f"📊 实时统计: 选中 {len(sel_sheets)} 个表, {len(sel_hooks)} 个Hook, 共 {total} 个文件")
 
     def filter_sheets(self, text):
@@ -695,8 +1285,8 @@ class DownloaderApp(QWidget):
         is_overwrite = self.chk_overwrite.isChecked()
         self.run_download(only_missing=not is_overwrite)
 
-    def run_download(self, only_missing):
-        if not self.df_dict: return
+    def run_download(self, only_missing, retry_failed=False):
+        if not self.has_table(): return
         root = self.input_path.text()
         if not root: QMessageBox.warning(self, "提示", "请手动选择保存目录"); return
         c_hook = self.combo_hook.currentText();
@@ -705,10 +1295,15 @@ class DownloaderApp(QWidget):
         sel_hooks = set(self.list_source.item(i).text() for i in range(self.list_source.count()) if
                         self.list_source.item(i).checkState() == Qt.CheckState.Checked)
         tasks = []
-        for i in range(self.list_sheets.count()):
-            it = self.list_sheets.item(i)
-            if it.checkState() == Qt.CheckState.Checked:
-                s = it.text();
+        sel_sheets = [self.list_sheets.item(i).text() for i in range(self.list_sheets.count()) if
+                      self.list_sheets.item(i).checkState() == Qt.CheckState.Checked]
+        if self.stream is not None:
+            if c_hook not in self.stream.hook_counts:
+                QMessageBox.information(self, "提示", "正在统计 Hook 列，请稍候"); return
+            # 流式：任务在下载线程里边读边生成，这里只算任务数 (Hook 计数已在后台统计好)
+            tasks = TableTasks(self.stream, sel_sheets, c_hook, c_url, c_name, sel_hooks)
+        else:
+            for s in sel_sheets:
                 df = self.df_dict[s]
                 for idx, row in df.iterrows():
                     h = str(row[c_hook]).strip()
@@ -722,17 +1317,56 @@ class DownloaderApp(QWidget):
         if self.worker is not None and self.worker.isRunning(): QMessageBox.warning(self, "提示",
                                                                                     "任务停止中..."); return
 
+        # 任务日志：同一任务清单中断过则直接续传，不再逐行扫描磁盘
+        is_stream = isinstance(tasks, TableTasks)
+        journal = JobJournal(root, tasks, key=tasks.fingerprint() if is_stream else None)
+        if journal.finished and not retry_failed: journal.reset()  # 上次已完整跑完，重新开始
+        prior_failed = {}
+        resume_note = ""
+        if journal.states:
+            done_keys = journal.done_keys()
+            failed_map = journal.failed()
+            if not retry_failed: prior_failed = journal.failed_tasks()  # 失败详情在日志里，不用再读表格
+
+            def is_pending(t):
+                k = task_key(t)
+                return k not in done_keys and k not in prior_failed
+
+            if is_stream:
+                # 读表时再过滤；剩余任务数可以直接从日志算出
+                tasks.task_filter = is_pending
+                tasks.total = max(0, len(tasks) - len(done_keys) - (0 if retry_failed else len(failed_map)))
+            else:
+                tasks = [t for t in tasks if is_pending(t)]
+            resume_note = f"📒 从任务日志恢复: 已完成 {len(done_keys)} 个, 上次失败 {len(failed_map)} 个, 待处理 {len(tasks)} 个"
+            only_missing = False
+            if not tasks:
+                QMessageBox.information(self, "提示", f"任务日志显示全部已处理完毕。\n失败: {len(failed_map)}")
+                if prior_failed: ErrorReportDialog(list(prior_failed.values()), self).exec()
+                return
+
         self.toggle_ui_state(False)
         self.log_area.clear();
+        if resume_note: self.log_area.append(resume_note)
         self.log_area.append(f"🚀 开始任务: {len(tasks)}个")
         self.pbar.setValue(0)
         self.table_active.setRowCount(0);
         self.active_downloads = {}
 
-        self.worker = DownloadWorker(tasks, root, self.spin_thread.value(), only_missing=only_missing)
+        if self.spin_procs.value() > 1 and is_stream:
+            self.log_area.append("ℹ️ 流式读取的大表格使用单进程下载 (多进程要先把任务全部分好片)")
+        if self.spin_procs.value() > 1 and not is_stream:
+            self.worker = ShardedDownloadWorker(tasks, root, self.spin_thread.value(), self.spin_procs.value(),
+                                                only_missing=only_missing, journal=journal,
+                                                preflight=self.chk_preflight.isChecked())
+        else:
+            self.worker = DownloadWorker(tasks, root, self.spin_thread.value(), only_missing=only_missing,
+                                         journal=journal, preflight=self.chk_preflight.isChecked())
+        self.worker.prior_failed = prior_failed
         self.worker.log_signal.connect(self.log_area.append)
         self.worker.progress_signal.connect(self.pbar.setValue)
         self.worker.file_progress_signal.connect(self.update_active_progress)
+        self.worker.stats_signal.connect(self.lbl_stats.setText)
         self.worker.finished_signal.connect(self.on_finished)
         self.worker.start()
 
@@ -744,10 +1378,17 @@ class DownloaderApp(QWidget):
         self.pbar.setValue(100)
         self.table_active.setRowCount(0);
         self.active_downloads = {}
+        self.fill_stats_table(report.get('metrics_rows', []))
+
+        if report.get('aborted'):
+            QMessageBox.warning(self, "任务中止", report['aborted'])
+            return
 
         failed = report['failed'];
         skipped = report.get('skipped', 0)
         msg = f"处理完成！\n跳过: {skipped}\n失败: {len(failed)}"
+        if report.get('revalidated') or report.get('changed'):
+            msg += f"\n未变化(304): {report.get('revalidated', 0)}\n已变化: {report.get('changed', 0)}\n新增: {report.get('new', 0)}"
         QMessageBox.information(self, "下载完成", msg)
 
         if failed:
@@ -0,0 +1,81 @@
+import os
+import queue
+import threading
+
+# ==========================================
+# 流式目录扫描 (分拣工具共用)
+# iter_files 基于 os.scandir 边走边产出文件路径，不用等整棵树扫完；
+# FileFeeder 在后台线程里跑生成器，把结果放进有界队列，
+# 消费方拿到第一个文件就能开始探测 / 复制，扫描结束后再得到总数。
+# ==========================================
+
+
+def iter_files(root, exts, recursive=True, on_error=None, skip=None):
+    """按目录深度优先产出扩展名 (小写，带点) 在 exts 里的文件。
+    与原来的 os.walk 一样包含隐藏文件 / 隐藏目录，也不进入符号链接目录。
+    skip: 不进入的目录 (目标目录在源目录里面时传入，免得把刚分拣出去的文件又扫进来)"""
+    skip = os.path.abspath(skip) if skip else None
+    stack = [root]
+    while stack:
+        folder = stack.pop()
+        try:
+            it = os.scandir(folder)
+        except OSError as e:
+            if on_error: on_error(folder, e)
+            continue
+        subdirs = []
+        with it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive and os.path.abspath(entry.path) != skip: subdirs.append(entry.path)
+                    elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in exts:
+                        yield entry.path
+                except OSError:
+                    continue
+        stack.extend(reversed(sorted(subdirs)))  # 保持与 os.walk 相近的先后顺序
+
+
+class FileFeeder(threading.Thread):
+    def __init__(self, iterator, maxsize=2000):
+        super().__init__(daemon=True)
+        self.iterator = iterator
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.count = 0
+        self.error = None
+        self.finished = threading.Event()
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            for path in self.iterator:
+                # 队列满时等消费方，期间也能响应停止
+                while not self.stopped.is_set():
+                    try:
+                        self.queue.put(path, timeout=0.2)
+                        break
+                    except queue.Full:
+                        continue
+                if self.stopped.is_set(): break
+                self.count += 1
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished.set()
+
+    def stop(self):
+        self.stopped.set()
+
+    def take(self, max_items, timeout=0):
+        """最多取 max_items 个；timeout>0 时在队列空时等一会儿"""
+        items = []
+        while len(items) < max_items:
+            try:
+                items.append(self.queue.get(timeout=timeout) if timeout and not items else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def exhausted(self):
+        """扫描结束且队列已取空"""
+        return self.finished.is_set() and self.queue.empty()
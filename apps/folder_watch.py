@@ -0,0 +1,365 @@
+import os
+import sys
+import json
+import time
+import errno
+import select
+import struct
+import signal
+import argparse
+import importlib
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from apps.file_scanner import iter_files
+
+# ==========================================
+# 监控文件夹模式 (视频 / 图片分拣共用)
+# 1. Linux 上用 inotify (ctypes 直接调用)，其它系统或网络盘用定时轮询
+#    (inotify 收不到 SMB / NFS 上别的机器写入的事件，源目录在网络盘上时自动改用轮询)
+# 2. 新文件要等大小和修改时间稳定 settle 秒后才处理，避免拿到还在写的半截文件
+# 3. 只分拣新到的文件；处理过的记在 目标/_meta/watch_<类型>.json，重启后不重复处理
+# 界面里点"监控模式"，或无界面运行:
+#   python -m apps.folder_watch video 源目录 目标目录 --placement hardlink
+#   python -m apps.folder_watch image 源目录 目标目录 --recursive --poll
+# ==========================================
+
+SORTERS = {
+    "video": ("apps.video_sorter_app", "SorterWorker", "VIDEO_EXTS"),
+    "image": ("apps.image_sorter_app", "SorterWorker", "SUPPORTED_EXTS"),
+}
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+_EVENT = struct.Struct("iIII")
+
+NETWORK_FS = {"nfs", "nfs4", "cifs", "smb3", "smbfs", "9p", "afs", "ceph", "glusterfs", "lustre", "davfs",
+              "fuse.sshfs", "fuse.rclone", "fuse.glusterfs"}
+
+
+def network_fs_type(path):
+    """path 所在挂载点是网络文件系统时返回其类型 (读 /proc/mounts)，否则返回 None"""
+    try:
+        with open("/proc/mounts", 'r', encoding='utf-8') as f:
+            mounts = [line.split()[1:3] for line in f if len(line.split()) >= 3]
+    except OSError:
+        return None
+    path = os.path.realpath(path)
+    best, fstype = "", None
+    for mount_point, kind in mounts:
+        mount_point = mount_point.replace("\\040", " ")  # /proc/mounts 里空格写作 \040
+        if (path == mount_point or path.startswith(mount_point.rstrip("/") + "/")) and len(mount_point) > len(best):
+            best, fstype = mount_point, kind
+    return fstype if fstype in NETWORK_FS else None
+
+
+class InotifyWatcher:
+    """递归监控目录；events() 返回有变动的文件路径，事件队列溢出时返回 None 表示需要全量重扫"""
+
+    def __init__(self, root, recursive=True, skip=None):
+        import ctypes
+        import ctypes.util
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0: raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        self.recursive = recursive
+        self.skip = skip
+        self.dirs = {}  # wd -> 目录
+        self.add_tree(root)
+
+    @staticmethod
+    def available():
+        return sys.platform.startswith("linux")
+
+    def add_dir(self, path):
+        import ctypes
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC: raise OSError(err, "inotify 监控数量已达上限 (fs.inotify.max_user_watches)")
+            return
+        self.dirs[wd] = path
+
+    def add_tree(self, root):
+        """监控 root 及其子目录，返回其中已有的文件 (新建目录时里面可能已经有文件了)"""
+        found = []
+        stack = [root]
+        while stack:
+            folder = stack.pop()
+            if self.skip and os.path.abspath(folder) == self.skip: continue
+            self.add_dir(folder)
+            try:
+                with os.scandir(folder) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            if self.recursive: stack.append(entry.path)
+                        else:
+                            found.append(entry.path)
+            except OSError:
+                continue
+        return found
+
+    def events(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready: return []
+        try:
+            data = os.read(self.fd, 256 * 1024)
+        except BlockingIOError:
+            return []
+        paths = []
+        pos = 0
+        while pos + _EVENT.size <= len(data):
+            wd, mask, _cookie, length = _EVENT.unpack_from(data, pos)
+            name = data[pos + _EVENT.size:pos + _EVENT.size + length].rstrip(b"\0")
+            pos += _EVENT.size + length
+            if mask & IN_Q_OVERFLOW: return None
+            folder = self.dirs.get(wd)
+            if folder is None or not name: continue
+            path = os.path.join(folder, os.fsdecode(name))
+            if mask & IN_ISDIR:
+                if self.recursive and mask & (IN_CREATE | IN_MOVED_TO): paths.extend(self.add_tree(path))
+            else:
+                paths.append(path)
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """定时扫描比较 (大小, 修改时间)；网络盘 / 非 Linux 系统用"""
+
+    def __init__(self, root, exts, recursive=True, interval=5.0, skip=None):
+        self.root, self.exts, self.recursive, self.interval = root, exts, recursive, interval
+        self.skip = skip
+        self.snapshot = self.scan()
+        self.next_scan = time.monotonic() + interval
+
+    def scan(self):
+        snap = {}
+        for path in iter_files(self.root, self.exts, recursive=self.recursive, skip=self.skip):
+            try:
+                st = os.stat(path)
+                snap[path] = (st.st_size, st.st_mtime_ns)
+            except OSError:
+                pass
+        return snap
+
+    def events(self, timeout):
+        wait = self.next_scan - time.monotonic()
+        if wait > 0:
+            time.sleep(min(wait, timeout))
+            if time.monotonic() < self.next_scan: return []
+        snap = self.scan()
+        changed = [p for p, v in snap.items() if self.snapshot.get(p) != v]
+        self.snapshot = snap
+        self.next_scan = time.monotonic() + self.interval
+        return changed
+
+    def close(self):
+        pass
+
+
+class StableFilter:
+    """文件大小和修改时间连续 settle 秒不变才算写完"""
+
+    def __init__(self, settle=3.0):
+        self.settle = settle
+        self.pending = {}  # 路径 -> ((大小, mtime), 上次变化时刻)
+
+    def touch(self, path):
+        self.pending.setdefault(path, (None, time.monotonic()))
+
+    def ready(self):
+        now = time.monotonic()
+        done = []
+        for path, (sig, since) in list(self.pending.items()):
+            try:
+                st = os.stat(path)
+            except OSError:
+                del self.pending[path]  # 临时文件被改名/删除了
+                continue
+            cur = (st.st_size, st.st_mtime_ns)
+            if cur != sig:
+                self.pending[path] = (cur, now)
+            elif now - since >= self.settle:
+                del self.pending[path]
+                done.append(path)
+        return done
+
+
+class WatchState:
+    """已处理文件记录: 路径 -> [大小, mtime]；同名文件被重新导出 (大小/时间变了) 会再处理一次"""
+
+    def __init__(self, path, source):
+        self.path = path
+        self.source = os.path.abspath(source)
+        self.files = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("source") == self.source: self.files = data.get("files", {})
+        except (OSError, ValueError):
+            pass
+
+    @property
+    def is_new(self):
+        return not self.files and not os.path.exists(self.path)
+
+    def seen(self, path):
+        rec = self.files.get(path)
+        if not rec: return False
+        try:
+            st = os.stat(path)
+        except OSError:
+            return True
+        return rec == [st.st_size, st.st_mtime_ns]
+
+    def mark(self, paths):
+        for p in paths:
+            try:
+                st = os.stat(p)
+                self.files[p] = [st.st_size, st.st_mtime_ns]
+            except OSError:
+                self.files.pop(p, None)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"source": self.source, "files": self.files}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+class WatchWorker(QThread):
+    log_signal = pyqtSignal(str)
+    batch_signal = pyqtSignal(int)  # 每处理完一批发出，参数为本批文件数
+
+    def __init__(self, kind, source_dir, target_dir, sorter_kwargs=None, recursive=True,
+                 settle=3.0, poll=False, interval=5.0, skip_existing=False):
+        super().__init__()
+        self.kind = kind
+        self.source_dir = source_dir
+        self.target_dir = target_dir
+        self.sorter_kwargs = dict(sorter_kwargs or {})
+        self.recursive = recursive
+        self.settle = settle
+        self.poll = poll
+        self.interval = interval
+        self.skip_existing = skip_existing
+        self.is_running = True
+        self.current = None
+
+    def stop(self):
+        self.is_running = False
+        if self.current: self.current.stop()
+
+    def run(self):
+        module_name, class_name, exts_name = SORTERS[self.kind]
+        module = importlib.import_module(module_name)
+        sorter_cls, exts = getattr(module, class_name), getattr(module, exts_name)
+        target_abs = os.path.abspath(self.target_dir)
+        state = WatchState(os.path.join(self.target_dir, "_meta", f"watch_{self.kind}.json"), self.source_dir)
+        stable = StableFilter(self.settle)
+
+        def wanted(path):
+            # 与手动分拣的扫描一致，隐藏文件也照常处理；写到一半的文件靠 settle 等稳定
+            return (os.path.splitext(path)[1].lower() in exts
+                    and not os.path.abspath(path).startswith(target_abs + os.sep))
+
+        watcher = None
+        if not self.poll and InotifyWatcher.available():
+            fstype = network_fs_type(self.source_dir)
+            if fstype:
+                self.log_signal.emit(f"ℹ️ 源文件夹在网络盘上 ({fstype})，inotify 收不到其它机器的改动，改用定时扫描")
+            else:
+                try:
+                    watcher = InotifyWatcher(self.source_dir, self.recursive, skip=target_abs)
+                    self.log_signal.emit(f"👀 正在监控 (inotify): {self.source_dir}")
+                except OSError as e:
+                    self.log_signal.emit(f"⚠️ inotify 不可用 ({e})，改用定时扫描")
+        if watcher is None:
+            watcher = PollingWatcher(self.source_dir, exts, self.recursive, self.interval, skip=target_abs)
+            self.log_signal.emit(f"👀 正在监控 (每 {self.interval:g} 秒扫描): {self.source_dir}")
+
+        # 启动时补上停机期间新到的文件；第一次运行可选择把已有文件都当作处理过
+        existing = [p for p in iter_files(self.source_dir, exts, recursive=self.recursive, skip=target_abs)
+                    if wanted(p)]
+        if state.is_new and self.skip_existing:
+            state.mark(existing)
+            state.save()
+            self.log_signal.emit(f"已忽略 {len(existing)} 个已有文件，只处理之后新到的")
+        else:
+            for p in existing:
+                if not state.seen(p): stable.touch(p)
+
+        try:
+            while self.is_running:
+                changed = watcher.events(1.0)
+                if changed is None:
+                    self.log_signal.emit("⚠️ 事件太多来不及处理，重新扫描一遍")
+                    changed = iter_files(self.source_dir, exts, recursive=self.recursive, skip=target_abs)
+                for p in changed:
+                    if wanted(p) and not state.seen(p): stable.touch(p)
+                batch = [p for p in stable.ready() if not state.seen(p)]
+                if batch and self.is_running: self.process(sorter_cls, batch, state)
+        finally:
+            watcher.close()
+            self.log_signal.emit("🛑 已停止监控")
+
+    def process(self, sorter_cls, batch, state):
+        self.log_signal.emit(f"📥 新到 {len(batch)} 个文件，开始分拣...")
+        self.current = sorter_cls(self.source_dir, self.target_dir, files=batch, **self.sorter_kwargs)
+        # 直接转发信号 (跨线程时自动排队到界面线程)
+        for name in ("log_signal", "log_update"):
+            if hasattr(self.current, name): getattr(self.current, name).connect(self.log_signal)
+        if hasattr(self.current, "error_signal"): self.current.error_signal.connect(self.log_signal)
+        self.current.run()  # 在本线程里同步跑完这一批
+        finished = self.current.is_running
+        self.current = None
+        if finished:
+            # 失败的文件也记下，免得每次都重试；文件再被修改时会重新处理
+            state.mark(batch)
+            state.save()
+            self.batch_signal.emit(len(batch))
+
+
+def main(argv=None):
+    from PyQt6.QtCore import QCoreApplication, QTimer
+    parser = argparse.ArgumentParser(description="监控文件夹，新文件到达后自动分拣")
+    parser.add_argument("kind", choices=sorted(SORTERS))
+    parser.add_argument("source")
+    parser.add_argument("target")
+    parser.add_argument("--placement", default="copy", help="copy / reflink / hardlink / symlink / move")
+    parser.add_argument("--duplicates", default="off", help="完全相同的文件: off / skip / link")
+    parser.add_argument("--recursive", action="store_true", help="图片模式下包含子文件夹 (视频始终包含)")
+    parser.add_argument("--settle", type=float, default=3.0, help="文件多少秒不变才算写完")
+    parser.add_argument("--poll", action="store_true", help="强制使用定时扫描 (网络盘上 inotify 收不到远端的改动)")
+    parser.add_argument("--interval", type=float, default=5.0, help="定时扫描间隔 (秒)")
+    parser.add_argument("--skip-existing", action="store_true", help="第一次运行时忽略已有文件")
+    args = parser.parse_args(argv)
+
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+    recursive = args.kind == "video" or args.recursive
+    kwargs = {"placement": args.placement, "dup_action": args.duplicates}
+    if args.kind == "image": kwargs["recursive"] = recursive
+    worker = WatchWorker(args.kind, args.source, args.target, kwargs, recursive=recursive, settle=args.settle,
+                         poll=args.poll, interval=args.interval, skip_existing=args.skip_existing)
+    worker.log_signal.connect(lambda msg: print(msg, flush=True))
+    worker.finished.connect(app.quit)
+    signal.signal(signal.SIGINT, lambda *_: worker.stop())
+    # Qt 事件循环里 Python 收不到 Ctrl+C，定时让解释器醒一下
+    tick = QTimer()
+    tick.timeout.connect(lambda: None)
+    tick.start(200)
+    worker.start()
+    return app.exec()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
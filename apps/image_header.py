@@ -0,0 +1,160 @@
+import struct
+
+# ==========================================
+# 只读文件头获取图片宽高 (不解码、不依赖 PIL)
+# 支持 JPEG / PNG / WebP / GIF / BMP / TIFF / HEIC(HEIF/AVIF)
+# 识别不了返回 None，由调用方退回 PIL。
+# 注意: 与 PIL 的 img.size 一致，不考虑 EXIF 旋转。
+# ==========================================
+
+HEAD_BYTES = 64 * 1024
+
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+_HEIF_BRANDS = {b'heic', b'heix', b'hevc', b'hevx', b'heim', b'heis', b'mif1', b'msf1', b'avif', b'avis'}
+
+
+def read_image_size(path):
+    """返回 (宽, 高)，无法从文件头判断时返回 None"""
+    with open(path, 'rb') as f:
+        head = f.read(HEAD_BYTES)
+        try:
+            if head[:8] == b'\x89PNG\r\n\x1a\n':
+                return _png(head)
+            if head[:2] == b'\xff\xd8':
+                return _jpeg(f, head)
+            if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+                return _webp(head)
+            if head[:6] in (b'GIF87a', b'GIF89a'):
+                return struct.unpack('<HH', head[6:10])
+            if head[:2] == b'BM':
+                return _bmp(head)
+            if head[:4] in (b'II*\x00', b'MM\x00*'):
+                return _tiff(f, head)
+            if head[4:8] == b'ftyp' and head[8:12] in _HEIF_BRANDS:
+                return _heif(f, head)
+        except (struct.error, IndexError, ValueError):
+            return None
+    return None
+
+
+def _positive(size):
+    return size if size and size[0] > 0 and size[1] > 0 else None
+
+
+def _png(head):
+    if head[12:16] != b'IHDR': return None
+    return _positive(struct.unpack('>II', head[16:24]))
+
+
+def _jpeg(f, head):
+    """逐个段跳过，直到遇到 SOF 帧头；大多数文件在头 64KB 内就能找到"""
+    data = head
+    pos = 2
+    while True:
+        if pos + 9 > len(data):
+            # EXIF 缩略图很大时 SOF 会靠后，按需多读
+            f.seek(len(data))
+            more = f.read(max(HEAD_BYTES, pos + 9 - len(data)))
+            if not more: return None
+            data += more
+            continue
+        if data[pos] != 0xFF: return None
+        marker = data[pos + 1]
+        if marker == 0xFF:  # 填充字节
+            pos += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+        if marker == 0xD9 or marker == 0xDA: return None  # 到图像数据了还没有帧头
+        (seg_len,) = struct.unpack('>H', data[pos + 2:pos + 4])
+        if marker in _JPEG_SOF:
+            h, w = struct.unpack('>HH', data[pos + 5:pos + 9])
+            return _positive((w, h))
+        pos += 2 + seg_len
+
+
+def _webp(head):
+    chunk = head[12:16]
+    if chunk == b'VP8 ':
+        if head[23:26] != b'\x9d\x01\x2a': return None
+        w, h = struct.unpack('<HH', head[26:30])
+        return _positive((w & 0x3FFF, h & 0x3FFF))
+    if chunk == b'VP8L':
+        if head[20] != 0x2F: return None
+        bits = int.from_bytes(head[21:25], 'little')
+        return ((bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1)
+    if chunk == b'VP8X':
+        w = int.from_bytes(head[24:27], 'little') + 1
+        h = int.from_bytes(head[27:30], 'little') + 1
+        return (w, h)
+    return None
+
+
+def _bmp(head):
+    (dib_size,) = struct.unpack('<I', head[14:18])
+    if dib_size == 12:  # OS/2 BITMAPCOREHEADER
+        return _positive(struct.unpack('<HH', head[18:22]))
+    w, h = struct.unpack('<ii', head[18:26])
+    return _positive((w, abs(h)))  # 高度为负表示自上而下存储
+
+
+def _tiff(f, head):
+    endian = '<' if head[:2] == b'II' else '>'
+    (ifd,) = struct.unpack(endian + 'I', head[4:8])
+    if ifd + 2 > len(head):
+        f.seek(ifd)
+        block = f.read(2 + 12 * 64)
+    else:
+        block = head[ifd:]
+    (count,) = struct.unpack(endian + 'H', block[:2])
+    size = {}
+    for i in range(count):
+        entry = block[2 + i * 12:14 + i * 12]
+        if len(entry) < 12:
+            f.seek(ifd + 2 + i * 12)
+            entry = f.read(12)
+        tag, typ, _n = struct.unpack(endian + 'HHI', entry[:8])
+        if tag in (256, 257):
+            value = struct.unpack(endian + 'H', entry[8:10])[0] if typ == 3 else struct.unpack(endian + 'I', entry[8:12])[0]
+            size[tag] = value
+            if len(size) == 2: break
+    if len(size) < 2: return None
+    return _positive((size[256], size[257]))
+
+
+def _boxes(data, start, end, clip=True):
+    """遍历 ISO BMFF 盒子，产出 (类型, 内容起点, 盒子终点)"""
+    pos = start
+    while pos + 8 <= end:
+        size, typ = struct.unpack('>I4s', data[pos:pos + 8])
+        header = 8
+        if size == 1:
+            size = struct.unpack('>Q', data[pos + 8:pos + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header: return
+        yield typ, pos + header, min(pos + size, end) if clip else pos + size
+        pos += size
+
+
+def _heif(f, head):
+    """meta -> iprp -> ipco -> ispe；有多个 ispe (缩略图、网格块) 时取面积最大的"""
+    data = head
+    best = None
+    for typ, body, end in _boxes(data, 0, len(data), clip=False):  # meta 可能超出已读的文件头
+        if typ != b'meta': continue
+        if end > len(data):
+            f.seek(len(data))
+            data += f.read(end - len(data))
+        for typ2, body2, end2 in _boxes(data, body + 4, end):  # meta 是 FullBox，跳过 version/flags
+            if typ2 != b'iprp': continue
+            for typ3, body3, end3 in _boxes(data, body2, end2):
+                if typ3 != b'ipco': continue
+                for typ4, body4, end4 in _boxes(data, body3, end3):
+                    if typ4 == b'ispe':
+                        w, h = struct.unpack('>II', data[body4 + 4:body4 + 12])
+                        if not best or w * h > best[0] * best[1]: best = (w, h)
+        break
+    return _positive(best)
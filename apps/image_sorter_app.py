@@ -1,12 +1,46 @@
 import sys
 import os
-import shutil
+import csv
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
                              QLabel, QLineEdit, QProgressBar, QFileDialog,
-                             QMessageBox, QGroupBox, QTextEdit)
+                             QMessageBox, QGroupBox, QTextEdit, QCheckBox, QSpinBox, QComboBox)
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
 
+from apps.probe_cache import ProbeCache
+from apps.copy_engine import CopyEngine
+from apps.file_scanner import iter_files, FileFeeder
+from apps.placement import Placer, MODE_NAMES, create_mode_combo, confirm_mode
+from apps.image_header import read_image_size
+from apps.perceptual_hash import dhash, HashIndex, DEFAULT_THRESHOLD
+from apps.dedupe import ExactDeduper, DUP_ACTIONS
+from apps.folder_watch import WatchWorker
+
+SUPPORTED_EXTS = {'.jpg', '.jpeg', '.png', '.bmp', '.webp', '.gif', '.tiff', '.tif', '.heic', '.heif'}
+
+
+# 相似图片处理方式
+DEDUPE_MODES = [("off", "不检测"), ("folder", "归入 _duplicates 文件夹"), ("report", "跳过并生成报告")]
+
+
+def probe_image(path, with_hash=False):
+    """先只读文件头取宽高，认不出来再交给 PIL (HEIC 需要装 pillow-heif 才能走 PIL)。
+    返回 (宽高, 感知哈希)；不需要或算不出哈希时为 None"""
+    size = read_image_size(path)
+    if size is None:
+        with Image.open(path) as img:
+            size = img.size
+    phash = None
+    if with_hash:
+        try:
+            phash = dhash(path)
+        except Exception:
+            pass  # 解码失败就不参与相似检测，照常分拣
+    return size, phash
+
 
 # === 🏗️ 后台工作线程 (负责搬运图片) ===
 class SorterWorker(QThread):
@@ -16,76 +50,208 @@ class SorterWorker(QThread):
     finished_signal = pyqtSignal(int)  # 返回成功处理的总数
     error_signal = pyqtSignal(str)
 
-    def __init__(self, source_dir, target_dir):
+    def __init__(self, source_dir, target_dir, placement="copy", recursive=False, workers=8,
+                 dedupe="off", threshold=DEFAULT_THRESHOLD, dup_action="off", files=None):
         super().__init__()
         self.source_dir = source_dir
+        self.files = files  # 指定文件列表时不扫描目录 (监控模式按批传入新文件)
         self.target_dir = target_dir
         self.is_running = True  # 控制停止的标志位
+        self.placement = placement
+        self.dedupe = dedupe
+        self.threshold = threshold
+        self.dup_action = dup_action  # 完全相同的文件: off / skip / link
+        self.recursive = recursive
+        self.workers = workers
+        self.copy_workers = 8
+        self.lock = threading.Lock()
+        self.processed_count = 0
+        self.skipped_count = 0
+        self.done_count = 0
+        self.total_count = 0
 
     def stop(self):
         self.is_running = False
 
-    def run(self):
+    def on_placed(self, fut, filename, res_folder_name):
+        """复制引擎线程里回调"""
+        if fut.cancelled(): return
         try:
-            # 1. 扫描所有图片文件
-            supported_exts = {'.jpg', '.jpeg', '.png', '.bmp', '.webp', '.gif', '.tiff'}
-            all_files = [f for f in os.listdir(self.source_dir) if os.path.isfile(os.path.join(self.source_dir, f))]
-
-            image_files = []
-            for f in all_files:
-                ext = os.path.splitext(f)[1].lower()
-                if ext in supported_exts:
-                    image_files.append(f)
-
-            total_count = len(image_files)
-            if total_count == 0:
-                self.error_signal.emit("源文件夹里没找到图片哦！")
+            used = fut.result()
+            if used == "duplicate":
+                self.log_update.emit(f"♻️ [重复跳过] {filename}")
+                self.mark_done(False, skipped=True)
                 return
+            self.log_update.emit(f"✅ [{MODE_NAMES[used]}成功] {filename} -> {res_folder_name}/")
+            self.mark_done(True)
+        except Exception as e:
+            self.log_update.emit(f"❌ [处理失败] {filename}: {str(e)}")
+            self.mark_done(False)
+
+    def mark_done(self, ok, skipped=False):
+        with self.lock:
+            self.done_count += 1
+            if ok: self.processed_count += 1
+            if skipped: self.skipped_count += 1
+            done, total = self.done_count, self.total_count
+        # 发送进度 (total 为 0 表示还在扫描)
+        self.progress_update.emit(done, total)
+
+    def set_total(self, total):
+        """扫描结束，进度条切换为确定进度"""
+        with self.lock:
+            self.total_count = total
+            done = self.done_count
+        self.log_update.emit(f"✅ 扫描完成，共发现 {total} 张图片")
+        self.progress_update.emit(done, total)
 
-            processed_count = 0
-
-            self.log_update.emit(f"🚀 开始扫描，共发现 {total_count} 张图片...")
-
-            # 2. 开始遍历处理
-            for filename in image_files:
-                if not self.is_running:
-                    self.log_update.emit("⚠️ 用户手动停止任务")
-                    break
-
-                src_path = os.path.join(self.source_dir, filename)
-
-                try:
-                    # 读取分辨率 (使用 PIL，不加载原图，速度快)
-                    with Image.open(src_path) as img:
-                        width, height = img.size
+    def run(self):
+        try:
+            # 1. 后台边扫描边处理，总数要等扫描结束才知道 (期间 total=0，进度条转圈)
+            if not os.path.isdir(self.source_dir):
+                self.error_signal.emit(f"无法读取源文件夹: {self.source_dir}")
+                return
+            if self.files is not None:
+                feeder = FileFeeder(iter(self.files))
+            else:
+                feeder = FileFeeder(iter_files(self.source_dir, SUPPORTED_EXTS, recursive=self.recursive,
+                                               skip=self.target_dir))
+            feeder.start()
+
+            cache = ProbeCache("image")
+            engine = CopyEngine(workers=self.copy_workers, log=self.log_update.emit)
+            self.placer = Placer(self.placement, self.log_update.emit, copier=engine.copy)
+            probe_pool = ThreadPoolExecutor(max_workers=self.workers)
+            events = queue.Queue()
+            stats = {}  # 路径 -> (大小, mtime, inode)，探测成功后写入缓存用
+            reserved = set()  # 已分配出去的目标路径，防止重名覆盖
+            in_flight = 0
+            max_in_flight = self.workers * 8
+            with_hash = self.dedupe != "off"
+            deduper = ExactDeduper(self.dup_action, self.log_update.emit) if self.dup_action != "off" else None
+            hash_index = HashIndex(self.threshold)
+            dup_rows = []
+
+            scope = "(含子文件夹)" if self.recursive else ""
+            self.log_update.emit(f"🚀 开始扫描{scope}，边扫描边分拣 (探测并发 {self.workers})...")
+            self.progress_update.emit(0, 0)
+
+            # 2. 文件头探测在线程池里跑，按完成顺序处理
+            try:
+                while True:
+                    if not self.is_running:
+                        self.log_update.emit("⚠️ 用户手动停止任务")
+                        break
+                    if not self.total_count and feeder.finished.is_set() and feeder.count:
+                        self.set_total(feeder.count)
+                    if in_flight == 0 and feeder.exhausted(): break
+
+                    for src_path in feeder.take(max_in_flight - in_flight, timeout=0 if in_flight else 0.1):
+                        in_flight += 1
+                        # 先查探测缓存，文件没变就不用再打开
+                        try:
+                            stats[src_path] = cache.stat(src_path)
+                            hit = cache.get(src_path, stats[src_path])
+                            phash = cache.get_hash(src_path, stats[src_path]) if hit and with_hash else None
+                        except OSError:
+                            hit = phash = None
+                        if hit and (phash is not None or not with_hash):
+                            events.put((src_path, (hit, phash), None))
+                            continue
+                        fut = probe_pool.submit(probe_image, src_path, with_hash)
+                        fut.add_done_callback(lambda f, p=src_path: events.put((p, None, f)))
+
+                    try:
+                        src_path, result, fut = events.get(timeout=0.05 if in_flight else 0.01)
+                    except queue.Empty:
+                        continue
+                    in_flight -= 1
+                    filename = os.path.basename(src_path)
+
+                    try:
+                        if result is None:
+                            result = fut.result()
+                            if src_path in stats:
+                                st = stats.pop(src_path)
+                                cache.put(src_path, st, *result[0])
+                                if result[1] is not None: cache.put_hash(src_path, result[1])
+                        (width, height), phash = result
                         # 格式化文件夹名称，例如 "1920x1080"
                         res_folder_name = f"{width}x{height}"
 
-                    # 创建目标子文件夹
-                    dest_folder = os.path.join(self.target_dir, res_folder_name)
-                    if not os.path.exists(dest_folder):
-                        os.makedirs(dest_folder)
-
-                    # 复制文件
-                    dest_path = os.path.join(dest_folder, filename)
-
-                    # 防止同名文件覆盖，如果存在则跳过或重命名，这里简单处理：直接覆盖(CP常用逻辑)
-                    shutil.copy2(src_path, dest_path)
-
-                    self.log_update.emit(f"✅ [复制成功] {filename} -> {res_folder_name}/")
-                    processed_count += 1
-
-                    # 发送进度
-                    self.progress_update.emit(processed_count, total_count)
-
-                except Exception as e:
-                    self.log_update.emit(f"❌ [处理失败] {filename}: {str(e)}")
-
-            self.finished_signal.emit(processed_count)
+                        # 相似图片：已经有一张很像的了
+                        match = hash_index.find(phash) if phash is not None else None
+                        if match:
+                            distance, (orig_src, orig_dest) = match
+                            if self.dedupe == "report":
+                                dup_rows.append([src_path, orig_src, orig_dest, distance, "跳过"])
+                                self.log_update.emit(f"♻️ [相似跳过] {filename} ≈ {os.path.basename(orig_src)}")
+                                self.mark_done(False, skipped=True)
+                                continue
+                            # 同一组放进 _duplicates/<保留那张的文件名>/ 里
+                            res_folder_name = os.path.join("_duplicates", os.path.splitext(os.path.basename(orig_dest))[0])
+
+                        # 创建目标子文件夹，分配不重名的目标路径
+                        dest_path, existing = self.reserve_dest(res_folder_name, filename, reserved)
+                        if match:
+                            dup_rows.append([src_path, orig_src, orig_dest, distance, dest_path])
+                        elif phash is not None:
+                            hash_index.add(phash, (src_path, dest_path))
+
+                        # 复制交给复制引擎并发执行，本线程继续处理下一张
+                        if deduper:
+                            cf = engine.submit(deduper.place, self.placer, src_path, dest_path, existing)
+                        else:
+                            cf = engine.submit(self.placer.place, src_path, dest_path)
+                        cf.add_done_callback(
+                            lambda f, n=os.path.basename(dest_path), r=res_folder_name: self.on_placed(f, n, r))
+
+                    except Exception as e:
+                        self.log_update.emit(f"❌ [处理失败] {filename}: {str(e)}")
+                        self.mark_done(False)
+            finally:
+                feeder.stop()
+                probe_pool.shutdown(wait=False, cancel_futures=True)
+                engine.close(cancel=not self.is_running)
+                cache.close()
+
+            if self.is_running and feeder.count == 0:
+                self.error_signal.emit("源文件夹里没找到图片哦！")
+                return
+            if dup_rows:
+                report_path = self.write_duplicate_report(dup_rows)
+                self.log_update.emit(f"♻️ 发现 {len(dup_rows)} 张相似图片，报告: {report_path}")
+            self.log_update.emit(f"📊 {cache.summary()}，{self.placer.summary()}")
+            if deduper: self.log_update.emit(f"♻️ {deduper.summary()}")
+            self.finished_signal.emit(self.processed_count)
 
         except Exception as e:
             self.error_signal.emit(f"发生系统错误: {str(e)}")
 
+    def write_duplicate_report(self, rows):
+        path = os.path.join(self.target_dir, "_duplicates_report.csv")
+        with open(path, 'w', newline='', encoding='utf-8-sig') as f:  # utf-8-sig 方便 Excel 直接打开
+            writer = csv.writer(f)
+            writer.writerow(["相似图片", "保留的原图", "原图分拣位置", "汉明距离", "处理"])
+            writer.writerows(rows)
+        return path
+
+    def reserve_dest(self, res_folder_name, filename, reserved):
+        """同名文件不再覆盖：依次尝试 名字_1、名字_2 ... (只在 run 线程调用)。
+        返回 (目标路径, 目标目录里已有的同名文件或 None)"""
+        dest_folder = os.path.join(self.target_dir, res_folder_name)
+        if not os.path.exists(dest_folder):
+            os.makedirs(dest_folder)
+        dest_path = os.path.join(dest_folder, filename)
+        existing = dest_path if os.path.lexists(dest_path) else None
+        name_part, ext_part = os.path.splitext(filename)
+        n = 0
+        while dest_path in reserved or os.path.lexists(dest_path):
+            n += 1
+            dest_path = os.path.join(dest_folder, f"{name_part}_{n}{ext_part}")
+        reserved.add(dest_path)
+        return dest_path, existing
+
 
 # === 🖥️ 主界面 ===
 class ImageSorterApp(QWidget):
@@ -94,6 +260,7 @@ class ImageSorterApp(QWidget):
         self.setWindowTitle("图片分辨率智能分拣器")
         self.resize(800, 600)
         self.worker = None  # 线程句柄
+        self.watcher = None  # 监控模式线程
 
         self.init_ui()
 
@@ -109,7 +276,7 @@ class ImageSorterApp(QWidget):
         layout.addWidget(title)
 
         desc = QLabel(
-            "功能：读取源文件夹图片尺寸 -> 自动建立【宽x高】文件夹 -> 复制图片进去。\n安全承诺：只复制，不修改原文件。")
+            "功能：读取源文件夹图片尺寸 -> 自动建立【宽x高】文件夹 -> 复制图片进去。\n安全承诺：只复制，不修改原文件；同名文件自动改名，不会覆盖。")
         desc.setStyleSheet("color: #666; margin-bottom: 10px;")
         desc.setAlignment(Qt.AlignmentFlag.AlignCenter)
         layout.addWidget(desc)
@@ -141,6 +308,32 @@ class ImageSorterApp(QWidget):
         grp_dst.setLayout(layout_dst)
         layout.addWidget(grp_dst)
 
+        # --- 放置方式 ---
+        mode_layout = QHBoxLayout()
+        mode_layout.addWidget(QLabel("放置方式:"))
+        self.combo_mode = create_mode_combo()
+        mode_layout.addWidget(self.combo_mode)
+        self.chk_recursive = QCheckBox("包含子文件夹")
+        mode_layout.addWidget(self.chk_recursive)
+        mode_layout.addWidget(QLabel("探测并发数:"))
+        self.spin_workers = QSpinBox()
+        self.spin_workers.setRange(1, 64)
+        self.spin_workers.setValue(8)
+        mode_layout.addWidget(self.spin_workers)
+        mode_layout.addWidget(QLabel("相似图片:"))
+        self.combo_dedupe = QComboBox()
+        for key, name in DEDUPE_MODES:
+            self.combo_dedupe.addItem(name, key)
+        self.combo_dedupe.setToolTip("同一素材不同压缩率/尺寸的导出版本，只保留第一张，其余归组或跳过")
+        mode_layout.addWidget(self.combo_dedupe)
+        mode_layout.addWidget(QLabel("完全相同:"))
+        self.combo_dup = QComboBox()
+        for key, name in DUP_ACTIONS:
+            self.combo_dup.addItem(name, key)
+        mode_layout.addWidget(self.combo_dup)
+        mode_layout.addStretch()
+        layout.addLayout(mode_layout)
+
         # 3. 进度条与日志
         layout.addWidget(QLabel("⏳ 处理进度:"))
         self.progress_bar = QProgressBar()
@@ -170,8 +363,18 @@ class ImageSorterApp(QWidget):
             "background-color: #d93025; color: white; font-weight: bold; font-size: 16px; border-radius: 5px;")
         self.btn_stop.clicked.connect(self.stop_sorting)
 
+        self.btn_watch = QPushButton("👀 监控模式")
+        self.btn_watch.setFixedHeight(50)
+        self.btn_watch.setToolTip("持续监控源文件夹，新图片写完后自动分拣；处理过的文件记录在目标文件夹 _meta 里")
+        self.btn_watch.clicked.connect(self.toggle_watch)
+        self.chk_poll = QCheckBox("定时扫描")
+        self.chk_poll.setToolTip("监控模式不用 inotify，改为每隔几秒扫描一次。\n"
+                                 "网络盘 (SMB / NFS) 上别的机器写入的文件收不到通知，需要勾选 (常见网络盘会自动识别)")
+
         btn_layout.addWidget(self.btn_start)
         btn_layout.addWidget(self.btn_stop)
+        btn_layout.addWidget(self.btn_watch)
+        btn_layout.addWidget(self.chk_poll)
 
         layout.addLayout(btn_layout)
 
@@ -188,27 +391,43 @@ class ImageSorterApp(QWidget):
         if folder:
             line_edit.setText(folder)
 
-    def start_sorting(self):
+    def check_paths(self):
         src = self.input_src.text().strip()
         dst = self.input_dst.text().strip()
 
         if not src or not dst:
             QMessageBox.warning(self, "提示", "请先选择【源文件夹】和【目标文件夹】！")
-            return
+            return None
 
         if src == dst:
             QMessageBox.warning(self, "警告",
                                 "源文件夹和目标文件夹不能是同一个！\n为了安全，请选择一个不同的文件夹存放结果。")
+            return None
+
+        if not confirm_mode(self, self.combo_mode.currentData()):
+            return None
+        return src, dst
+
+    def sorter_options(self):
+        return dict(placement=self.combo_mode.currentData(), recursive=self.chk_recursive.isChecked(),
+                    workers=self.spin_workers.value(), dedupe=self.combo_dedupe.currentData(),
+                    dup_action=self.combo_dup.currentData())
+
+    def start_sorting(self):
+        paths = self.check_paths()
+        if not paths:
             return
+        src, dst = paths
 
         # UI 状态切换
         self.btn_start.setEnabled(False)
         self.btn_stop.setEnabled(True)
+        self.btn_watch.setEnabled(False)  # 分拣和监控同时跑会抢同一批文件
         self.log_area.clear()
         self.progress_bar.setValue(0)
 
         # 启动线程
-        self.worker = SorterWorker(src, dst)
+        self.worker = SorterWorker(src, dst, **self.sorter_options())
         self.worker.progress_update.connect(self.update_progress)
         self.worker.log_update.connect(self.update_log)
         self.worker.finished_signal.connect(self.task_finished)
@@ -222,10 +441,39 @@ class ImageSorterApp(QWidget):
             self.btn_stop.setText("正在停止...")
 
     def update_progress(self, current, total):
+        if total == 0:
+            # 还在扫描，总数未知
+            self.progress_bar.setRange(0, 0)
+            self.progress_bar.setFormat(f"正在扫描并处理: {current}")
+            return
+        self.progress_bar.setMinimum(0)
         self.progress_bar.setMaximum(total)
         self.progress_bar.setValue(current)
         self.progress_bar.setFormat(f"正在处理: {current}/{total} ({(current / total) * 100:.1f}%)")
 
+    def toggle_watch(self):
+        if self.watcher and self.watcher.isRunning():
+            self.watcher.stop()
+            self.btn_watch.setEnabled(False)
+            self.btn_watch.setText("正在停止...")
+            return
+        paths = self.check_paths()
+        if not paths:
+            return
+        self.log_area.clear()
+        self.watcher = WatchWorker("image", paths[0], paths[1], self.sorter_options(),
+                                   recursive=self.chk_recursive.isChecked(), poll=self.chk_poll.isChecked())
+        self.watcher.log_signal.connect(self.update_log)
+        self.watcher.finished.connect(self.on_watch_finished)
+        self.btn_start.setEnabled(False)
+        self.btn_watch.setText("⏹ 停止监控")
+        self.watcher.start()
+
+    def on_watch_finished(self):
+        self.btn_start.setEnabled(True)
+        self.btn_watch.setEnabled(True)
+        self.btn_watch.setText("👀 监控模式")
+
     def update_log(self, text):
         self.log_area.append(text)
 
@@ -238,8 +486,10 @@ class ImageSorterApp(QWidget):
         QMessageBox.critical(self, "错误", err_msg)
 
     def reset_ui(self):
+        self.progress_bar.setRange(0, max(self.progress_bar.maximum(), 1))
         self.btn_start.setEnabled(True)
         self.btn_stop.setEnabled(False)
+        self.btn_watch.setEnabled(True)
         self.btn_stop.setText("🛑 停止")
         self.progress_bar.setFormat("准备就绪")
 
@@ -0,0 +1,173 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+
+# ==========================================
+# 下载任务日志 (JSON Lines，只追加)
+# 每行一条记录：
+#   header  任务指纹、任务总数
+#   begin   某次运行开始
+#   task    单个任务的状态变化 (running / done / skipped / failed)，failed 记录附带任务详情
+#   end     本次任务全部跑完
+# 崩溃或断电后，重放日志即可知道哪些行已完成，无需再扫磁盘。
+# ==========================================
+
+def task_key(task):
+    """任务的唯一标识：Sheet + 行号 + 链接"""
+    return f"{task.get('sheet')}|{task.get('row_num')}|{task.get('url')}"
+
+
+def fingerprint_tasks(tasks, save_root):
+    """任务清单指纹：同一表格、同样的筛选、同一保存目录 -> 同一个指纹"""
+    h = hashlib.sha1()
+    h.update(os.path.abspath(save_root).encode('utf-8'))
+    for t in tasks:
+        h.update(task_key(t).encode('utf-8'))
+        h.update(b'\n')
+    return h.hexdigest()[:16]
+
+
+def fingerprint_key(key, save_root):
+    """流式任务不能先把全部任务读出来，改由调用方给出清单的标识 (文件元数据 + 筛选条件)"""
+    h = hashlib.sha1()
+    h.update(os.path.abspath(save_root).encode('utf-8'))
+    h.update(b'\n')
+    h.update(key.encode('utf-8'))
+    return h.hexdigest()[:16]
+
+
+class JobJournal:
+    COMPACT_MIN = 1000  # 日志行数超过 max(此值, 2 × 任务状态数) 时压缩，摊下来每条记录 O(1)
+    FSYNC_INTERVAL = 1.0  # 最多每秒落盘一次
+
+    def __init__(self, save_root, tasks, key=None):
+        self.fingerprint = fingerprint_tasks(tasks, save_root) if key is None else fingerprint_key(key, save_root)
+        self.dir = os.path.join(save_root, "_job_journal")
+        self.path = os.path.join(self.dir, f"{self.fingerprint}.jsonl")
+        self.total = len(tasks)
+        self.states = {}  # key -> 最新一条 task 记录
+        self.finished = False
+        self.lock = threading.Lock()
+        self._fh = None
+        self._records = 0  # 日志文件里的行数
+        self._last_sync = 0
+        self.load()
+
+    # --- 读取 ---
+    def load(self):
+        if not os.path.exists(self.path): return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                self._records += 1
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue  # 崩溃时最后一行可能只写了一半
+                kind = rec.get('t')
+                if kind == 'task':
+                    self.states[rec['key']] = rec
+                elif kind == 'begin':
+                    self.finished = False
+                elif kind == 'end':
+                    self.finished = True
+
+    def done_keys(self):
+        return {k for k, r in self.states.items() if r.get('state') in ('done', 'skipped')}
+
+    def failed(self):
+        return {k: r.get('error', '未知') for k, r in self.states.items() if r.get('state') == 'failed'}
+
+    def failed_tasks(self):
+        """上次失败的任务 (key -> 任务)，直接从日志还原，不用再读表格"""
+        result = {}
+        for k, r in self.states.items():
+            if r.get('state') != 'failed': continue
+            task = dict(r.get('task') or {})
+            if not task:  # 旧日志没有任务详情，只能从 key 里拆出 Sheet / 行号 / 链接
+                sheet, row_num, url = (k.split('|', 2) + ['', ''])[:3]
+                task = {"sheet": sheet, "row_num": row_num, "url": url}
+            task['error'] = r.get('error', '未知')
+            result[k] = task
+        return result
+
+    # --- 写入 ---
+    def reset(self):
+        """丢弃旧日志，从头开始"""
+        self.close()
+        if os.path.exists(self.path): os.remove(self.path)
+        self.states = {}
+        self.finished = False
+        self._records = 0
+
+    def begin(self):
+        os.makedirs(self.dir, exist_ok=True)
+        is_new = not os.path.exists(self.path)
+        self._fh = open(self.path, 'a', encoding='utf-8')
+        if is_new:
+            self._write({"t": "header", "fingerprint": self.fingerprint, "total": self.total,
+                         "created": int(time.time())})
+        self._write({"t": "begin", "time": int(time.time())})
+        self._sync(force=True)
+
+    def record(self, task, state, path=None, error=None):
+        rec = {"t": "task", "key": task_key(task), "state": state}
+        if path: rec['path'] = path
+        if error: rec['error'] = error
+        if state == "failed": rec['task'] = {f: task.get(f) for f in ("sheet", "row_num", "hook", "name", "url")}
+        with self.lock:
+            if self._fh is None: return
+            self.states[rec['key']] = rec
+            self._write(rec)
+            if self._records > max(self.COMPACT_MIN, 2 * len(self.states)):
+                self._compact()
+            else:
+                self._sync()
+
+    def end(self):
+        with self.lock:
+            if self._fh is None: return
+            self._write({"t": "end", "time": int(time.time())})
+            self.finished = True
+        self.close()
+
+    def close(self):
+        with self.lock:
+            if self._fh is None: return
+            if self._records > len(self.states) + 3:
+                self._compact()
+            self._sync(force=True)
+            self._fh.close()
+            self._fh = None
+
+    # --- 内部 ---
+    def _write(self, rec):
+        self._fh.write(json.dumps(rec, ensure_ascii=False, default=str) + "\n")
+        self._records += 1
+
+    def _sync(self, force=False):
+        self._fh.flush()
+        now = time.time()
+        if force or now - self._last_sync >= self.FSYNC_INTERVAL:
+            os.fsync(self._fh.fileno())
+            self._last_sync = now
+
+    def _compact(self):
+        """每个任务只保留最新状态，写临时文件后原子替换"""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({"t": "header", "fingerprint": self.fingerprint, "total": self.total,
+                                "compacted": int(time.time())}, ensure_ascii=False) + "\n")
+            f.write(json.dumps({"t": "begin", "time": int(time.time())}) + "\n")
+            for rec in self.states.values():
+                f.write(json.dumps(rec, ensure_ascii=False, default=str) + "\n")
+            if self.finished: f.write(json.dumps({"t": "end", "time": int(time.time())}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._fh.close()
+        os.replace(tmp_path, self.path)
+        self._fh = open(self.path, 'a', encoding='utf-8')
+        self._records = len(self.states) + 2 + self.finished
+        self._last_sync = time.time()
@@ -0,0 +1,139 @@
+import os
+import json
+import time
+import threading
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from PyQt6.QtCore import QSettings
+
+# ==========================================
+# 镜像选择与故障切换
+# 1. 按域名配置镜像模板 ("{url}" 代表原始链接，单独的 "{url}" 就是直连源站)
+# 2. 用小范围 Range 请求并发"赛跑"，最快的排最前
+# 3. 下载中途某个镜像断了，保留已收到的字节，换下一个镜像续传
+# 4. 各镜像延迟按 (域名, 模板) 写入 QSettings，跨会话记住；不同域名的同一模板各测各的
+# 自定义镜像: QSettings("LoveToolbox", "Mirrors") 的 mirrors 键，
+# 或环境变量 LOVETOOLBOX_MIRRORS，格式均为 JSON: {"域名": ["模板", ...]}
+# ==========================================
+
+_GITHUB_MIRRORS = ["https://mirror.ghproxy.com/{url}", "https://ghproxy.net/{url}", "{url}"]
+DEFAULT_MIRRORS = {
+    "github.com": _GITHUB_MIRRORS,
+    "objects.githubusercontent.com": _GITHUB_MIRRORS,
+    "raw.githubusercontent.com": _GITHUB_MIRRORS,
+}
+
+PROBE_BYTES = 64 * 1024
+LATENCY_TTL = 3600  # 测速结果有效期 (秒)，过期重新赛跑
+FAIL_PENALTY = 30.0  # 失败记作 30 秒延迟
+
+
+class MirrorSelector:
+    def __init__(self, timeout=5):
+        self.timeout = timeout
+        self.lock = threading.RLock()  # 测速、记录、保存都在锁内，赛跑时会重入 record
+        self.settings = QSettings("LoveToolbox", "Mirrors")
+        self.mirrors = dict(DEFAULT_MIRRORS)
+        for raw in (self.settings.value("mirrors", "", type=str), os.environ.get("LOVETOOLBOX_MIRRORS", "")):
+            if raw:
+                try:
+                    self.mirrors.update(json.loads(raw))
+                except ValueError:
+                    pass
+        try:
+            self.latency = json.loads(self.settings.value("latency", "{}", type=str))
+        except ValueError:
+            self.latency = {}
+        self.latency = {k: v for k, v in self.latency.items() if "\t" in k}  # 旧版只按模板记录，作废重测
+
+    @staticmethod
+    def latency_key(url, template):
+        return f"{urlparse(str(url)).hostname or ''}\t{template}"
+
+    # --- 候选 ---
+    def has_mirrors(self, url):
+        return len(self.mirrors.get(urlparse(str(url)).hostname or "", [])) > 1
+
+    def candidates(self, url):
+        """[(模板, 实际链接)]，源站直连始终在内"""
+        templates = list(self.mirrors.get(urlparse(url).hostname or "", []))
+        if "{url}" not in templates: templates.append("{url}")
+        return [(t, t.replace("{url}", url)) for t in templates]
+
+    def ordered(self, url):
+        """按速度排好的候选；记忆中的测速都还新鲜就直接用，否则现场赛跑"""
+        cands = self.candidates(url)
+        if len(cands) == 1: return cands
+        keys = {t: self.latency_key(url, t) for t, _ in cands}
+        with self.lock:  # 多个下载线程同时遇到过期测速时只赛跑一次
+            now = time.time()
+            fresh = all(k in self.latency and now - self.latency[k][1] < LATENCY_TTL for k in keys.values())
+            if not fresh: self.race(url, cands)
+            return sorted(cands, key=lambda c: self.latency.get(keys[c[0]], (FAIL_PENALTY, 0))[0])
+
+    # --- 测速 ---
+    def probe(self, candidate_url):
+        import requests
+        t0 = time.perf_counter()
+        headers = {'User-Agent': 'Mozilla/5.0', 'Range': f"bytes=0-{PROBE_BYTES - 1}"}
+        with requests.get(candidate_url, headers=headers, stream=True, timeout=self.timeout) as r:
+            r.raise_for_status()
+            got = 0
+            for chunk in r.iter_content(chunk_size=16384):
+                got += len(chunk)
+                if got >= PROBE_BYTES: break
+        return time.perf_counter() - t0
+
+    def race(self, url, cands):
+        with ThreadPoolExecutor(max_workers=len(cands)) as executor:
+            future_to_tpl = {executor.submit(self.probe, u): t for t, u in cands}
+            for future in as_completed(future_to_tpl):
+                tpl = future_to_tpl[future]
+                try:
+                    self.record(url, tpl, future.result(), save=False)
+                except Exception:
+                    self.record(url, tpl, FAIL_PENALTY, save=False)
+        self.save()
+
+    def record(self, url, template, seconds, save=True):
+        key = self.latency_key(url, template)
+        with self.lock:  # 下载线程各自上报失败，与 ordered() 的遍历互斥
+            old = self.latency.get(key)
+            # 指数平滑，偶尔一次抖动不至于把好镜像打入冷宫
+            value = seconds if not old else old[0] * 0.5 + seconds * 0.5
+            self.latency[key] = (value, time.time())
+            if save: self.save()
+
+    def save(self):
+        with self.lock:
+            self.settings.setValue("latency", json.dumps(self.latency))
+
+    # --- 下载 (带故障切换) ---
+    def download(self, url, part_path, progress=None, should_stop=None, chunk_size=1024 * 1024):
+        """下载到 part_path (已有内容则续传)。某个镜像出错就换下一个，已收到的字节保留。
+        返回 True 完成 / False 被中断；全部镜像失败抛异常。"""
+        import requests
+        errors = []
+        for tpl, cand in self.ordered(url):
+            done = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+            headers = {'User-Agent': 'Mozilla/5.0'}
+            if done: headers['Range'] = f"bytes={done}-"
+            try:
+                with requests.get(cand, stream=True, headers=headers, timeout=60) as r:
+                    if r.status_code == 416 and done: return True  # 已经是完整文件
+                    r.raise_for_status()
+                    if r.status_code != 206: done = 0  # 不支持续传，从头下载
+                    total = done + int(r.headers.get('content-length', 0))
+                    with open(part_path, 'ab' if done else 'wb') as f:
+                        for chunk in r.iter_content(chunk_size=chunk_size):
+                            if should_stop and should_stop(): return False
+                            if chunk:
+                                f.write(chunk)
+                                done += len(chunk)
+                                if progress: progress(done, total)
+                return True
+            except Exception as e:
+                self.record(url, tpl, FAIL_PENALTY)
+                errors.append(f"{urlparse(cand).hostname}: {e}")
+        raise Exception("所有镜像均下载失败: " + "; ".join(errors))
@@ -0,0 +1,77 @@
+from PIL import Image
+
+# ==========================================
+# 相似图片检测 (感知哈希 dHash + 多段索引)
+# dHash: 缩成 9x8 灰度图，比较相邻像素明暗得到 64 位指纹；
+#        同一素材不同压缩率 / 尺寸导出，指纹的汉明距离通常 <= 6。
+# HashIndex 用多段索引查找近邻 (64 位指纹半径 6 时 BK 树几乎要遍历全部节点)，
+# 几十万张图片也不用两两比较。
+# ==========================================
+
+HASH_SIZE = 8
+DEFAULT_THRESHOLD = 6
+
+
+def dhash(path, hash_size=HASH_SIZE):
+    """计算 64 位 dHash；JPEG 用 draft 只解码缩小版，速度快很多"""
+    with Image.open(path) as img:
+        img.draft('L', (hash_size * 8, hash_size * 8))
+        small = img.convert('L').resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR)
+        pixels = list(small.getdata())
+    value = 0
+    for row in range(hash_size):
+        base = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[base + col] > pixels[base + col + 1])
+    return value
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+class HashIndex:
+    """多段索引 (鸽巢原理)：64 位切成 4 段各 16 位。若两个指纹汉明距离 <= radius，
+    至少有一段的距离 <= radius // 4 (radius=6 时即 <= 1)。
+    查询时每段只查"完全相同 + 翻转少量位"的几十个键，核对的候选很少"""
+
+    SEGMENTS = 4
+
+    def __init__(self, radius=DEFAULT_THRESHOLD, bits=HASH_SIZE * HASH_SIZE):
+        self.radius = radius
+        width = bits // self.SEGMENTS
+        self.mask = (1 << width) - 1
+        self.shifts = [i * width for i in range(self.SEGMENTS)]
+        # 段内允许翻转的位组合 (含不翻转)
+        flips = [0]
+        for _ in range(radius // self.SEGMENTS):
+            flips = sorted({f | (1 << b) for f in flips for b in range(width)} | set(flips))
+        self.flips = flips
+        self.tables = [{} for _ in range(self.SEGMENTS)]
+        self.values = []
+        self.items = []
+
+    def __len__(self):
+        return len(self.values)
+
+    def add(self, value, item):
+        idx = len(self.values)
+        self.values.append(value)
+        self.items.append(item)
+        for table, shift in zip(self.tables, self.shifts):
+            table.setdefault((value >> shift) & self.mask, []).append(idx)
+
+    def find(self, value):
+        """返回距离最近且不超过 radius 的 (距离, 附带数据)，没有则 None"""
+        best_d, best_idx = self.radius + 1, None
+        values = self.values
+        for table, shift in zip(self.tables, self.shifts):
+            key = (value >> shift) & self.mask
+            for flip in self.flips:
+                # 同一候选可能在多段里重复出现，重复核对比去重更省
+                for idx in table.get(key ^ flip, ()):
+                    d = bin(value ^ values[idx]).count('1')
+                    if d < best_d:
+                        best_d, best_idx = d, idx
+                        if d == 0: return 0, self.items[idx]
+        return None if best_idx is None else (best_d, self.items[best_idx])
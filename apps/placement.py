@@ -0,0 +1,158 @@
+import os
+import sys
+import errno
+import shutil
+import threading
+
+from PyQt6.QtCore import QSettings
+from PyQt6.QtWidgets import QComboBox, QMessageBox
+
+# ==========================================
+# 文件放置方式 (所有工具共用)
+# copy     普通复制 (默认，最安全)
+# reflink  写时复制克隆：Linux FICLONE / macOS clonefile，不支持时尝试 copy_file_range
+# hardlink 硬链接：同一磁盘上秒完成，不占额外空间
+# symlink  符号链接：指向源文件的绝对路径
+# move     移动：同一磁盘上只是改名，跨盘时先复制再删除
+# 做不到时自动退回普通复制，并把原因记到日志 (同一原因只提示一次)
+# ==========================================
+
+MODES = [
+    ("copy", "复制"),
+    ("reflink", "克隆 (reflink)"),
+    ("hardlink", "硬链接"),
+    ("symlink", "符号链接"),
+    ("move", "移动"),
+]
+MODE_NAMES = dict(MODES)
+
+FICLONE = 0x40049409  # linux/fs.h: _IOW(0x94, 9, int)
+
+
+class PlacementFallback(Exception):
+    """当前方式不可用，需要退回普通复制"""
+
+
+def _reflink(src, dst):
+    if sys.platform.startswith("linux"):
+        import fcntl
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            try:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            except OSError as e:
+                if not hasattr(os, "copy_file_range"):
+                    raise PlacementFallback(f"文件系统不支持克隆 ({e.strerror})")
+                # btrfs/xfs/NFS4.2 等会在内核里共享数据块或做服务端复制
+                try:
+                    remaining = os.fstat(fsrc.fileno()).st_size
+                    while remaining > 0:
+                        n = os.copy_file_range(fsrc.fileno(), fdst.fileno(), min(remaining, 1 << 30))
+                        if n == 0: break
+                        remaining -= n
+                except OSError as e2:
+                    raise PlacementFallback(f"文件系统不支持克隆 ({e2.strerror})")
+        shutil.copystat(src, dst)
+    elif sys.platform == "darwin":
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        if not hasattr(libc, "clonefile"):
+            raise PlacementFallback("系统不支持 clonefile")
+        if libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) != 0:
+            raise PlacementFallback(f"文件系统不支持克隆 ({os.strerror(ctypes.get_errno())})")
+    else:
+        raise PlacementFallback("当前系统不支持克隆")
+
+
+def _link_error(e, what):
+    if e.errno == errno.EXDEV: return PlacementFallback(f"源和目标不在同一个磁盘，无法{what}")
+    if e.errno in (errno.EPERM, errno.EACCES): return PlacementFallback(f"没有创建{what}的权限")
+    if e.errno in (errno.EOPNOTSUPP, errno.ENOTSUP, errno.ENOSYS): return PlacementFallback(f"文件系统不支持{what}")
+    if e.errno == errno.EMLINK: return PlacementFallback("源文件硬链接数已达上限")
+    if getattr(e, "winerror", None) == 1314: return PlacementFallback(f"Windows 需要开发者模式或管理员权限才能创建{what}")
+    return None
+
+
+def place_file(src, dst, mode="copy", copier=shutil.copy2):
+    """按 mode 把 src 放到 dst。不可用时抛 PlacementFallback，其它错误照常抛出"""
+    if mode == "copy":
+        copier(src, dst)
+    elif mode == "move":
+        try:
+            os.replace(src, dst)
+        except OSError as e:
+            if e.errno != errno.EXDEV: raise
+            shutil.move(src, dst)  # 跨盘：复制后删除源文件
+    elif mode == "reflink":
+        try:
+            _reflink(src, dst)
+        except PlacementFallback:
+            if os.path.exists(dst): os.remove(dst)
+            raise
+    elif mode in ("hardlink", "symlink"):
+        what = "硬链接" if mode == "hardlink" else "符号链接"
+        if os.path.lexists(dst): os.remove(dst)
+        try:
+            if mode == "hardlink":
+                os.link(src, dst)
+            else:
+                os.symlink(os.path.abspath(src), dst)
+        except OSError as e:
+            fb = _link_error(e, what)
+            if fb: raise fb
+            raise
+    else:
+        raise ValueError(f"未知的放置方式: {mode}")
+
+
+class Placer:
+    """线程安全的放置器：记录实际使用的方式，退回复制时每种原因只打一次日志。
+    copier 为实际复制函数，传入 CopyEngine.copy 即走复制引擎"""
+
+    def __init__(self, mode="copy", log=None, copier=shutil.copy2):
+        self.mode = mode if mode in MODE_NAMES else "copy"
+        self.log = log
+        self.copier = copier
+        self.lock = threading.Lock()
+        self.reasons = set()
+        self.counts = {}
+
+    def place(self, src, dst):
+        used = self.mode
+        try:
+            place_file(src, dst, self.mode, self.copier)
+        except PlacementFallback as e:
+            used = "copy"
+            with self.lock:
+                first = str(e) not in self.reasons
+                self.reasons.add(str(e))
+            if first and self.log: self.log(f"⚠️ {MODE_NAMES[self.mode]}不可用：{e}，改用普通复制")
+            self.copier(src, dst)
+        with self.lock:
+            self.counts[used] = self.counts.get(used, 0) + 1
+        return used
+
+    def summary(self):
+        parts = [f"{MODE_NAMES[m]} {n}" for m, n in self.counts.items()]
+        return "放置方式: " + (", ".join(parts) if parts else "无")
+
+
+# === 界面辅助 ===
+def create_mode_combo():
+    """放置方式下拉框，选择记在 QSettings 里，各工具共享"""
+    settings = QSettings("LoveToolbox", "Placement")
+    combo = QComboBox()
+    for key, name in MODES:
+        combo.addItem(name, key)
+    combo.setToolTip("同一磁盘上用 克隆/硬链接/移动 可以秒完成且不额外占用空间；做不到时自动改为复制")
+    idx = combo.findData(settings.value("mode", "copy", type=str))
+    combo.setCurrentIndex(max(idx, 0))
+    combo.currentIndexChanged.connect(lambda _: settings.setValue("mode", combo.currentData()))
+    return combo
+
+
+def confirm_mode(parent, mode):
+    """移动模式会改动源文件夹，开始前确认一次"""
+    if mode != "move": return True
+    reply = QMessageBox.question(parent, "确认", "当前放置方式为【移动】，源文件夹里的文件会被移走。\n确定继续吗？",
+                                 QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+    return reply == QMessageBox.StandardButton.Yes
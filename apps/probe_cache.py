@@ -0,0 +1,128 @@
+import os
+import time
+import sqlite3
+
+from PyQt6.QtCore import QStandardPaths
+
+# ==========================================
+# 分辨率探测缓存 (两个分拣工具共用)
+# 以 (类型, 绝对路径) 为键，记录 大小 / mtime / inode 和探测到的宽高 (图片另存感知哈希)。
+# 三者任一变化即视为文件已改动，重新探测。
+# 保存在系统缓存目录的 LoveToolbox/probe_cache.sqlite，
+# 可用环境变量 LOVETOOLBOX_PROBE_CACHE 指定其它位置。
+# 条目超过 MAX_ENTRIES 时按最近使用时间淘汰。
+# 注意: sqlite 连接只能在创建它的线程里用，请在 QThread.run 里创建。
+# ==========================================
+
+MAX_ENTRIES = 200000
+COMMIT_EVERY = 500
+
+
+def default_cache_path():
+    path = os.environ.get("LOVETOOLBOX_PROBE_CACHE")
+    if path: return path
+    base = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.GenericCacheLocation)
+    return os.path.join(base or os.path.expanduser("~"), "LoveToolbox", "probe_cache.sqlite")
+
+
+class ProbeCache:
+    def __init__(self, kind, path=None, max_entries=MAX_ENTRIES):
+        self.kind = kind  # "video" / "image"
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._pending = 0
+        self.conn = None
+        try:
+            path = path or default_cache_path()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.conn = sqlite3.connect(path, timeout=5)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS probes (
+                kind TEXT, path TEXT, size INTEGER, mtime_ns INTEGER, inode INTEGER,
+                width INTEGER, height INTEGER, used REAL, PRIMARY KEY (kind, path))""")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS probes_used ON probes (used)")
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(probes)")}
+            if "phash" not in columns:  # 旧版缓存文件升级
+                self.conn.execute("ALTER TABLE probes ADD COLUMN phash INTEGER")
+        except Exception:
+            self.conn = None  # 缓存坏了/只读也不影响分拣，只是每次都重新探测
+
+    @staticmethod
+    def stat(file_path):
+        st = os.stat(file_path)
+        # Windows 上部分网络盘 st_ino 恒为 0，等于不参与比较
+        return st.st_size, st.st_mtime_ns, st.st_ino
+
+    def get(self, file_path, st):
+        """命中返回 (宽, 高)，否则 None"""
+        row = None
+        if self.conn is not None:
+            try:
+                row = self.conn.execute(
+                    "SELECT size, mtime_ns, inode, width, height FROM probes WHERE kind=? AND path=?",
+                    (self.kind, os.path.abspath(file_path))).fetchone()
+            except sqlite3.Error:
+                row = None
+        if row and tuple(row[:3]) == tuple(st):
+            self.hits += 1
+            self._write("UPDATE probes SET used=? WHERE kind=? AND path=?",
+                        (time.time(), self.kind, os.path.abspath(file_path)))
+            return row[3], row[4]
+        self.misses += 1
+        return None
+
+    def put(self, file_path, st, width, height):
+        self._write("INSERT OR REPLACE INTO probes VALUES (?, ?, ?, ?, ?, ?, ?, ?, NULL)",
+                    (self.kind, os.path.abspath(file_path), st[0], st[1], st[2], width, height, time.time()))
+
+    # --- 感知哈希 (相似图片检测用，存为有符号 64 位整数) ---
+    def get_hash(self, file_path, st):
+        if self.conn is None: return None
+        try:
+            row = self.conn.execute(
+                "SELECT size, mtime_ns, inode, phash FROM probes WHERE kind=? AND path=?",
+                (self.kind, os.path.abspath(file_path))).fetchone()
+        except sqlite3.Error:
+            return None
+        if not row or tuple(row[:3]) != tuple(st) or row[3] is None: return None
+        return row[3] + (1 << 63)
+
+    def put_hash(self, file_path, value):
+        """需在 put 之后调用 (行已存在)"""
+        self._write("UPDATE probes SET phash=? WHERE kind=? AND path=?",
+                    (value - (1 << 63), self.kind, os.path.abspath(file_path)))
+
+    def _write(self, sql, params):
+        if self.conn is None: return
+        try:
+            self.conn.execute(sql, params)
+            self._pending += 1
+            if self._pending >= COMMIT_EVERY:
+                self.conn.commit()
+                self._pending = 0
+        except sqlite3.Error:
+            pass
+
+    def evict(self):
+        """超出上限时删掉最久没用过的条目"""
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM probes").fetchone()
+        if count > self.max_entries:
+            self.conn.execute("DELETE FROM probes WHERE rowid IN "
+                              "(SELECT rowid FROM probes ORDER BY used LIMIT ?)", (count - self.max_entries,))
+
+    def close(self):
+        if self.conn is None: return
+        try:
+            self.evict()
+            self.conn.commit()
+            self.conn.close()
+        except sqlite3.Error:
+            pass
+        self.conn = None
+
+    def summary(self):
+        total = self.hits + self.misses
+        if not total: return "探测缓存: 未使用"
+        return f"探测缓存命中 {self.hits}/{total} ({self.hits / total:.1%})"
@@ -0,0 +1,154 @@
+import os
+import json
+import time
+import uuid
+
+# ==========================================
+# 原地重命名 + 撤销日志 (批量重命名工具用)
+# 不复制任何数据，只在源目录里 os.rename，几十万个文件也是秒级。
+# 两阶段改名: 先全部改成临时名，再改成最终名，
+# 避免 "10.jpg -> 11.jpg" 这类新旧名字互相撞车。
+# 每一步之前先把完整计划写进 源目录/.lovetoolbox_rename_journal.json，
+# 中途出错 / 取消 / 断电后都能凭它把整批改回原名。
+# ==========================================
+
+JOURNAL_NAME = ".lovetoolbox_rename_journal.json"
+
+
+class RenameConflict(Exception):
+    pass
+
+
+def journal_path(root):
+    return os.path.join(root, JOURNAL_NAME)
+
+
+def load_journal(root):
+    try:
+        with open(journal_path(root), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save(root, journal):
+    path = journal_path(root)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(journal, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _rename(src, dst):
+    # POSIX 的 os.rename 会直接覆盖已有文件，这里先检查
+    if os.path.lexists(dst): raise FileExistsError(f"目标已存在: {dst}")
+    os.rename(src, dst)
+
+
+def plan_renames(folders):
+    """folders: [(目录, [(原文件名, 新文件名)])] -> [[原路径, 临时路径, 新路径]]
+    新名字被计划之外的文件 / 子目录占用时抛 RenameConflict"""
+    token = uuid.uuid4().hex[:8]
+    entries = []
+    for folder, pairs in folders:
+        planned = {old.casefold() for old, _ in pairs}  # 大小写不敏感的文件系统上 A.jpg 与 a.jpg 是同一个
+        for i, (old, new) in enumerate(pairs):
+            if old == new: continue
+            final = os.path.join(folder, new)
+            if os.path.lexists(final) and new.casefold() not in planned:
+                raise RenameConflict(f"{final} 已存在且不在本次重命名范围内")
+            entries.append([os.path.join(folder, old), os.path.join(folder, f".lt_rename_{token}_{i}"), final])
+    return entries
+
+
+def unfinished(root):
+    """上次的重命名没有正常结束 (需要先撤销) 时返回 True"""
+    journal = load_journal(root)
+    return bool(journal) and journal.get("stage") not in ("done", "undone")
+
+
+def apply_renames(root, entries, is_running=lambda: True, progress=None):
+    """执行两阶段改名。完成返回 True；被取消返回 False (已自动改回原名)。
+    出错时自动回滚后重新抛出异常"""
+    if unfinished(root): raise RenameConflict("上次的重命名没有完成，请先撤销")
+    journal = {"version": 1, "created": time.strftime("%Y-%m-%d %H:%M:%S"), "stage": "planned", "entries": entries}
+    _save(root, journal)
+    total = len(entries) * 2
+    try:
+        for i, (orig, temp, _final) in enumerate(entries):
+            if not is_running():
+                undo_renames(root)
+                return False
+            _rename(orig, temp)
+            if progress: progress(i + 1, total)
+        journal["stage"] = "temp"
+        _save(root, journal)
+        # 第二阶段很快且必须做完，不再响应取消
+        for i, (_orig, temp, final) in enumerate(entries):
+            _rename(temp, final)
+            if progress: progress(len(entries) + i + 1, total)
+    except OSError:
+        undo_renames(root)
+        raise
+    journal["stage"] = "done"
+    _save(root, journal)
+    return True
+
+
+def undo_renames(root, progress=None):
+    """按日志把整批文件改回原名，返回 (改回的个数, [无法还原的说明])。
+    原名已被新文件占用时改成 "原名_undo" 保存，不会覆盖。
+    中途出错可以修复后再次调用：第一阶段做完会记为 undo_temp，已改回的文件从日志里去掉"""
+    journal = load_journal(root)
+    if not journal or journal.get("stage") == "undone": return 0, []
+    stage = journal["stage"]
+    entries = journal["entries"]
+    problems = []
+    total = len(entries) * 2
+
+    # 第一阶段: 全部挪到临时名。文件在哪取决于日志阶段；临时名存在说明已经挪过
+    if stage != "undo_temp":
+        for i, (orig, temp, final) in enumerate(entries):
+            if progress: progress(i + 1, total)
+            if os.path.lexists(temp) or stage == "planned": continue  # planned 阶段没有临时名的文件还在原位
+            if not os.path.lexists(final):
+                problems.append(f"找不到 {final} (可能已被删除)")
+                continue
+            os.rename(final, temp)
+        journal["stage"] = "undo_temp"
+        _save(root, journal)
+
+    # 第二阶段: 临时名 -> 原名。没有临时名的条目已经改回 (或第一阶段就找不到)，不再碰
+    restored = 0
+    remaining = []
+    try:
+        for i, entry in enumerate(entries):
+            orig, temp, _final = entry
+            if progress: progress(len(entries) + i + 1, total)
+            if not os.path.lexists(temp): continue
+            dest = orig
+            if os.path.lexists(dest):
+                stem, ext = os.path.splitext(orig)
+                n = 1
+                dest = f"{stem}_undo{ext}"
+                while os.path.lexists(dest):
+                    n += 1
+                    dest = f"{stem}_undo{n}{ext}"
+                problems.append(f"{orig} 已被占用，已还原为 {os.path.basename(dest)}")
+            try:
+                os.rename(temp, dest)
+            except OSError:
+                remaining.append(entry)
+                raise
+            restored += 1
+    except OSError:
+        remaining.extend(entries[i + 1:])
+        journal["entries"] = remaining
+        _save(root, journal)
+        raise
+
+    journal["stage"] = "undone"
+    _save(root, journal)
+    return restored, problems
@@ -1,19 +1,102 @@
 import sys
 import os
-import shutil
+import csv
+import time
+import functools
+import bisect
+import threading
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton, 
                              QLabel, QLineEdit, QFileDialog, QProgressBar, 
                              QTextEdit, QGroupBox, QMessageBox, QTableWidget, 
-                             QTableWidgetItem, QHeaderView)
+                             QTableWidgetItem, QHeaderView, QCheckBox)
 from PyQt6.QtGui import QColor, QFont
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
 
+from apps.copy_engine import CopyEngine
+from apps.placement import Placer, create_mode_combo, confirm_mode
+from apps.rename_journal import (plan_renames, apply_renames, undo_renames, journal_path, load_journal,
+                                 RenameConflict)
+
+
+def new_file_name(prefix, index, file_name):
+    """命名算法 (组号1.. + 序号0-9): 前缀(可能是空) + 组号 + 序号 + 后缀"""
+    _, ext = os.path.splitext(file_name)
+    group_id = (index // 10) + 1
+    item_id = (index % 10)
+    return f"{prefix}{group_id}{item_id}{ext}"
+
+
+def scan_tree(root, is_running=lambda: True, on_folder=None):
+    """只遍历一次源目录，得到处理计划: [(目录路径, 相对路径, 目录名, 排好序的文件名)]，只含有文件的目录。
+    与 os.walk 一致: 跳过隐藏文件，不进入符号链接目录。每发现一个有文件的目录回调 on_folder(目录名, 文件数)"""
+    plan = []
+    stack = [root]
+    while stack and is_running():
+        folder = stack.pop()
+        files, subdirs = [], []
+        try:
+            with os.scandir(folder) as it:
+                for entry in it:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        if not entry.is_symlink(): subdirs.append(entry.path)
+                    elif not entry.name.startswith('.'):
+                        files.append(entry.name)
+        except OSError:
+            continue
+        stack.extend(sorted(subdirs, reverse=True))
+        if files:
+            files.sort()
+            name = os.path.basename(folder)
+            plan.append((folder, os.path.relpath(folder, root), name, files))
+            if on_folder: on_folder(name, len(files))
+    return plan
+
+
+def format_size(size):
+    if size >= 1024 ** 3: return f"{size / 1024 ** 3:.2f} GB"
+    return f"{size / 1024 ** 2:.1f} MB"
+
+
+class ScanWorker(QThread):
+    """后台扫描源目录；发现的文件夹分批发给界面，扫完把计划交给 RenamerWorker 直接执行"""
+    folders_signal = pyqtSignal(dict)  # {目录名: 新发现的文件数}，约每 0.2 秒一批
+    finished_signal = pyqtSignal(object)  # 处理计划；被取消时为 None
+
+    def __init__(self, source_dir):
+        super().__init__()
+        self.source_dir = source_dir
+        self.is_running = True
+        self.pending = {}
+        self.last_emit = 0.0
+
+    def run(self):
+        plan = scan_tree(self.source_dir, lambda: self.is_running, self.on_folder)
+        if self.is_running: self.flush()  # 被取消时剩下的不再发给界面
+        self.finished_signal.emit(plan if self.is_running else None)
+
+    def on_folder(self, name, count):
+        self.pending[name] = self.pending.get(name, 0) + count
+        if time.monotonic() - self.last_emit >= 0.2: self.flush()
+
+    def flush(self):
+        if self.pending: self.folders_signal.emit(self.pending)
+        self.pending = {}
+        self.last_emit = time.monotonic()
+
+    def stop(self):
+        self.is_running = False
+
+
 class RenamerWorker(QThread):
     log_signal = pyqtSignal(str)
     progress_signal = pyqtSignal(int)
     finished_signal = pyqtSignal(str)
 
-    def __init__(self, source_dir, target_dir, prefix_map):
+    def __init__(self, source_dir, target_dir, prefix_map, placement="copy", plan=None, in_place=False):
         super().__init__()
         self.source_dir = source_dir
         self.target_dir = target_dir
@@ -21,40 +104,72 @@ class RenamerWorker(QThread):
         # map结构: {'1080-1920': 'PrefixA', '1280-720': ''} 
         # 注意：空字符串 '' 现在是有效值，代表无前缀
         self.is_running = True
+        self.placement = placement
+        self.plan = plan  # ScanWorker 的扫描结果；没有时自己扫一遍
+        self.in_place = in_place  # 原地重命名: 只改名勾选的文件，不复制，target_dir 不用
+        self.copy_workers = 8
+        self.lock = threading.Lock()
+        self.processed_count = 0
+        self.total_files = 0
+        self.done_bytes = 0
+        self.total_bytes = 0
+        self.failures = []  # [(源文件, 目标文件, 错误)]
+        self.last_progress = -1
 
     def run(self):
         self.log_signal.emit(f"📂 源根目录: {self.source_dir}")
-        self.log_signal.emit(f"📂 目标目录: {self.target_dir}")
+        if not self.in_place:
+            self.log_signal.emit(f"📂 目标目录: {self.target_dir}")
         self.log_signal.emit("-" * 40)
 
-        # 1. 统计工作量
-        total_files = 0
-        for root, dirs, files in os.walk(self.source_dir):
-            folder_name = os.path.basename(root)
-            # 只要这个文件夹在 map 的 key 里（说明用户勾选了），就算任务
-            if folder_name in self.prefix_map:
-                 valid = [f for f in files if not f.startswith('.')]
-                 total_files += len(valid)
+        # 1. 统计工作量 (直接用扫描计划，不再遍历目录)
+        plan = self.plan if self.plan is not None else scan_tree(self.source_dir, lambda: self.is_running)
+        # 只要这个文件夹在 map 的 key 里（说明用户勾选了），就算任务
+        total_files = sum(len(files) for _, _, name, files in plan if name in self.prefix_map)
         
         if total_files == 0:
             self.finished_signal.emit("没有文件需要重命名。请检查是否勾选了要处理的文件夹。")
             return
 
-        processed_count = 0
-        
-        # 2. 开始正式遍历
-        for root, dirs, files in os.walk(self.source_dir):
+        if self.in_place:
+            self.rename_in_place(plan)
+            return
+
+        # 2. 先算出完整的 (源, 目标, 大小) 计划；新名字只取决于排序后的序号，
+        #    各文件互不依赖，交给复制引擎并发执行，命名结果与顺序执行完全一致
+        jobs = self.build_copy_jobs(plan)
+        self.total_files = len(jobs)
+        self.total_bytes = sum(size for _, _, size in jobs)
+        self.log_signal.emit(f"共 {len(jobs)} 个文件 ({format_size(self.total_bytes)})，{self.copy_workers} 线程并发复制...")
+
+        engine = CopyEngine(workers=self.copy_workers, log=self.log_signal.emit)
+        self.placer = Placer(self.placement, self.log_signal.emit, copier=engine.copy)
+        for src_file_path, dest_file_path, size in jobs:
+            if not self.is_running:
+                break
+            fut = engine.submit(self.placer.place, src_file_path, dest_file_path)
+            fut.add_done_callback(functools.partial(self.on_placed, src_file_path, dest_file_path, size))
+
+        engine.close(cancel=not self.is_running)
+        self.log_signal.emit(f"📊 {self.placer.summary()}")
+        msg = f"✅ 全部完成！共处理 {self.processed_count} 个文件。" if self.is_running else \
+            f"🛑 已停止，已处理 {self.processed_count} 个文件。"
+        if self.failures:
+            try:
+                path = self.write_failure_report()
+                msg += f"\n❌ {len(self.failures)} 个文件失败，清单见: {path}"
+            except OSError as e:
+                msg += f"\n❌ {len(self.failures)} 个文件失败 (失败清单写入出错: {e})"
+        self.finished_signal.emit(msg)
+
+    def build_copy_jobs(self, plan):
+        """按扫描计划生成复制清单并建好目标目录 (run 线程里调用)"""
+        jobs = []
+        for root, rel_path, folder_name, valid_files in plan:
             if not self.is_running:
                 break
-            
-            folder_name = os.path.basename(root)
-            
-            valid_files = [f for f in files if not f.startswith('.')]
-            if not valid_files:
-                continue 
             
             # 构建目标路径
-            rel_path = os.path.relpath(root, self.source_dir)
             target_current_dir = os.path.join(self.target_dir, rel_path)
             
             if not os.path.exists(target_current_dir):
@@ -64,56 +179,117 @@ class RenamerWorker(QThread):
             # 检查该文件夹是否在任务列表中 (即用户是否勾选)
             if folder_name not in self.prefix_map:
                 # 没勾选 -> 原样复制文件
-                # self.log_signal.emit(f"⚠️ [{folder_name}] 未勾选，保持原名复制...")
-                for f in valid_files:
-                    try:
-                        shutil.copy2(os.path.join(root, f), os.path.join(target_current_dir, f))
-                    except: pass
-                continue
-
-            # 获取前缀 (可能是空字符串 "")
-            user_prefix = self.prefix_map[folder_name]
-            if user_prefix is None:
-                user_prefix = ""
-
-            # --- 执行重命名逻辑 ---
-            valid_files.sort()
-            
-            # 显示日志：如果前缀为空，提示“纯数字命名”
-            display_prefix = user_prefix if user_prefix else "[无前缀]"
-            self.log_signal.emit(f"处理: {rel_path} -> 使用前缀 {display_prefix}")
-
-            for index, file_name in enumerate(valid_files):
-                if not self.is_running:
-                    break
-
+                names = [(f, f) for f in valid_files]
+            else:
+                # 获取前缀 (可能是空字符串 "")
+                user_prefix = self.prefix_map[folder_name]
+                if user_prefix is None:
+                    user_prefix = ""
+
+                # --- 执行重命名逻辑 (文件名扫描时已排好序) ---
+                # 显示日志：如果前缀为空，提示“纯数字命名”
+                display_prefix = user_prefix if user_prefix else "[无前缀]"
+                self.log_signal.emit(f"处理: {rel_path} -> 使用前缀 {display_prefix}")
+                names = [(f, new_file_name(user_prefix, i, f)) for i, f in enumerate(valid_files)]
+
+            for file_name, dest_name in names:
                 src_file_path = os.path.join(root, file_name)
-                _, ext = os.path.splitext(file_name)
-                
-                # --- 命名算法 (组号1.. + 序号0-9) ---
-                group_id = (index // 10) + 1
-                item_id = (index % 10)
-                
-                # 拼接: 前缀(可能是空) + 组号 + 序号 + 后缀
-                new_file_name = f"{user_prefix}{group_id}{item_id}{ext}"
-                
-                dest_file_path = os.path.join(target_current_dir, new_file_name)
-                
                 try:
-                    shutil.copy2(src_file_path, dest_file_path)
-                except Exception as e:
-                    self.log_signal.emit(f"  ❌ 错误: {str(e)}")
-
-                processed_count += 1
-                progress = int((processed_count / total_files) * 100)
-                self.progress_signal.emit(progress)
+                    size = os.path.getsize(src_file_path)
+                except OSError:
+                    size = 0  # 真正复制时会报错并记入失败清单
+                jobs.append((src_file_path, os.path.join(target_current_dir, dest_name), size))
+        return jobs
+
+    def write_failure_report(self):
+        path = os.path.join(self.target_dir, "_rename_failures.csv")
+        with open(path, 'w', newline='', encoding='utf-8-sig') as f:  # utf-8-sig 方便 Excel 直接打开
+            writer = csv.writer(f)
+            writer.writerow(["源文件", "目标文件", "错误"])
+            writer.writerows(self.failures)
+        return path
+
+    def rename_in_place(self, plan):
+        folders = []
+        for root, _rel, folder_name, files in plan:
+            if folder_name not in self.prefix_map: continue
+            prefix = self.prefix_map[folder_name] or ""
+            folders.append((root, [(f, new_file_name(prefix, i, f)) for i, f in enumerate(files)]))
+
+        try:
+            entries = plan_renames(folders)
+            self.log_signal.emit(f"✏️ 原地重命名 {len(entries)} 个文件，撤销日志: {journal_path(self.source_dir)}")
+            done = apply_renames(self.source_dir, entries, lambda: self.is_running, self.on_renamed)
+        except RenameConflict as e:
+            self.finished_signal.emit(f"❌ 未做任何改动: {e}")
+            return
+        except OSError as e:
+            self.finished_signal.emit(f"❌ 重命名出错: {e}\n已尝试全部改回原名，可点【撤销上次重命名】再检查一次。")
+            return
 
-        self.finished_signal.emit(f"✅ 全部完成！共处理 {processed_count} 个文件。")
+        if not done:
+            self.finished_signal.emit("🛑 已取消，所有文件已改回原名。")
+        else:
+            self.finished_signal.emit(f"✅ 原地重命名完成！共 {len(entries)} 个文件。\n如需还原请点【撤销上次重命名】。")
+
+    def on_renamed(self, done, total):
+        progress = int(done * 100 / total)
+        if progress != self.last_progress:  # 几十万个文件时不必每个都发信号
+            self.last_progress = progress
+            self.progress_signal.emit(progress)
+
+    def on_placed(self, src, dest, size, fut):
+        """复制引擎线程里回调；进度按字节累计，大文件和小文件混在一起时也不会忽快忽慢"""
+        if fut.cancelled(): return
+        error = None
+        try:
+            fut.result()
+        except Exception as e:
+            error = str(e)
+            self.log_signal.emit(f"  ❌ 错误: {os.path.basename(src)}: {error}")
+        with self.lock:
+            if error is None:
+                self.processed_count += 1
+            else:
+                self.failures.append((src, dest, error))
+            self.done_bytes += size
+            done_files = self.processed_count + len(self.failures)
+            if self.total_bytes:
+                progress = int(self.done_bytes * 100 / self.total_bytes)
+            else:
+                progress = int(done_files * 100 / self.total_files)  # 全是空文件
+            changed = progress != self.last_progress
+            self.last_progress = progress
+        if changed: self.progress_signal.emit(progress)
 
     def stop(self):
         self.is_running = False
 
 
+class UndoWorker(QThread):
+    """按撤销日志把上次原地重命名的文件改回原名"""
+    log_signal = pyqtSignal(str)
+    progress_signal = pyqtSignal(int)
+    finished_signal = pyqtSignal(str)
+
+    def __init__(self, source_dir):
+        super().__init__()
+        self.source_dir = source_dir
+
+    def run(self):
+        try:
+            restored, problems = undo_renames(self.source_dir,
+                                              lambda done, total: self.progress_signal.emit(int(done * 100 / total)))
+        except OSError as e:
+            self.finished_signal.emit(f"❌ 撤销出错: {e}\n可修复问题后再点一次撤销，已还原的文件不会重复处理。")
+            return
+        for msg in problems[:100]:
+            self.log_signal.emit(f"  ⚠️ {msg}")
+        if len(problems) > 100:
+            self.log_signal.emit(f"  ... 另有 {len(problems) - 100} 条")
+        self.finished_signal.emit(f"↩️ 撤销完成！{restored} 个文件已改回原名。")
+
+
 class RenamerApp(QWidget):
     def __init__(self):
         super().__init__()
@@ -123,6 +299,10 @@ class RenamerApp(QWidget):
         self.source_path = ""
         self.target_path = ""
         self.worker = None
+        self.scan_worker = None
+        self.plan = None  # 最近一次完整扫描的结果
+        self.folder_names = []  # 表格里的文件夹名 (有序)
+        self.folder_counts = {}
 
         self.init_ui()
 
@@ -138,7 +318,8 @@ class RenamerApp(QWidget):
             "更新说明：\n"
             "1. 扫描后，请在表格左侧【勾选】你需要处理的文件夹。\n"
             "2. 右侧【前缀】可以留空。如果留空，文件将命名为 '10.jpg', '11.jpg' 等纯数字格式。\n"
-            "3. 未勾选的文件夹将原样复制，不进行重命名。"
+            "3. 未勾选的文件夹将原样复制，不进行重命名。\n"
+            "4. 勾选【原地重命名】则不复制，直接在源文件夹里改名 (未勾选的文件夹不动)，可一键撤销。"
         )
         info.setStyleSheet("color: #333; background-color: #fff2cc; padding: 10px; border-radius: 5px; border: 1px solid #d6b656;")
         layout.addWidget(info)
@@ -183,14 +364,23 @@ class RenamerApp(QWidget):
         layout.addWidget(QLabel("第二步：配置规则 (勾选要处理的项，前缀可留空)"))
         
         self.table = QTableWidget()
-        self.table.setColumnCount(2)
-        self.table.setHorizontalHeaderLabels(["文件夹名称 (勾选以处理)", "前缀 (留空则为纯数字)"])
+        self.table.setColumnCount(3)
+        self.table.setHorizontalHeaderLabels(["文件夹名称 (勾选以处理)", "前缀 (留空则为纯数字)", "文件数"])
         self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
         self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
+        self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeMode.ResizeToContents)
         layout.addWidget(self.table)
 
         # 4. 执行区域
         btn_layout = QHBoxLayout()
+        btn_layout.addWidget(QLabel("放置方式:"))
+        self.combo_mode = create_mode_combo()
+        self.combo_mode.setFixedHeight(50)
+        btn_layout.addWidget(self.combo_mode)
+        self.chk_inplace = QCheckBox("✏️ 原地重命名")
+        self.chk_inplace.setToolTip("不复制，直接在源文件夹里改名；改名前会写撤销日志，可随时改回原名")
+        self.chk_inplace.toggled.connect(self.on_inplace_toggled)
+        btn_layout.addWidget(self.chk_inplace)
         self.btn_start = QPushButton("🚀 开始复制并重命名")
         self.btn_start.setFixedHeight(50)
         self.btn_start.setStyleSheet("background-color: #0078d7; color: white; font-weight: bold; font-size: 15px;")
@@ -201,8 +391,13 @@ class RenamerApp(QWidget):
         self.btn_stop.setEnabled(False)
         self.btn_stop.clicked.connect(self.stop_process)
         
+        self.btn_undo = QPushButton("↩️ 撤销上次重命名")
+        self.btn_undo.setFixedHeight(50)
+        self.btn_undo.clicked.connect(self.undo_rename)
+
         btn_layout.addWidget(self.btn_start)
         btn_layout.addWidget(self.btn_stop)
+        btn_layout.addWidget(self.btn_undo)
         layout.addLayout(btn_layout)
 
         # 5. 进度与日志
@@ -220,7 +415,10 @@ class RenamerApp(QWidget):
     def select_source(self):
         d = QFileDialog.getExistingDirectory(self, "选择源文件夹")
         if d:
+            if self.scan_worker and self.scan_worker.isRunning():
+                self.scan_worker.stop()
             self.source_path = d
+            self.plan = None  # 换了源目录，旧的扫描结果作废
             self.lbl_src.setText(d)
             self.lbl_src.setStyleSheet("color: #188038;")
             self.btn_scan.setEnabled(True)
@@ -236,49 +434,95 @@ class RenamerApp(QWidget):
     def scan_folders(self):
         if not self.source_path:
             return
+
+        # 扫描中再点一次 = 取消
+        if self.scan_worker and self.scan_worker.isRunning() and self.scan_worker.source_dir == self.source_path:
+            self.scan_worker.stop()
+            self.btn_scan.setEnabled(False)
+            return
         
-        self.log_text.append("⏳ 正在深度扫描目录结构...")
-        unique_folders = set()
-        
-        for root, dirs, files in os.walk(self.source_path):
-            valid_files = [f for f in files if not f.startswith('.')]
-            if valid_files:
-                folder_name = os.path.basename(root)
-                unique_folders.add(folder_name)
-        
-        if not unique_folders:
+        self.log_text.append("⏳ 正在后台扫描目录结构，发现的文件夹会陆续加入表格...")
+        self.table.setRowCount(0)
+        self.folder_names = []
+        self.folder_counts = {}
+        self.plan = None
+        self.btn_start.setEnabled(False)
+        self.btn_scan.setText("⏹ 停止扫描")
+
+        self.scan_worker = ScanWorker(self.source_path)
+        self.scan_worker.folders_signal.connect(self.add_folders)
+        self.scan_worker.finished_signal.connect(self.on_scan_finished)
+        self.scan_worker.start()
+
+    def add_folders(self, batch):
+        """把新发现的文件夹按名称顺序插入表格，已有的只更新文件数"""
+        if self.sender() is not self.scan_worker:
+            return  # 换源目录后旧扫描排队中的结果
+        for name, count in batch.items():
+            row = bisect.bisect_left(self.folder_names, name)
+            if name in self.folder_counts:
+                self.folder_counts[name] += count
+            else:
+                self.folder_counts[name] = count
+                self.folder_names.insert(row, name)
+                self.table.insertRow(row)
+
+                # 第一列: 文件夹名 + 复选框
+                item_name = QTableWidgetItem(name)
+                item_name.setFlags(Qt.ItemFlag.ItemIsUserCheckable | Qt.ItemFlag.ItemIsEnabled)
+                item_name.setCheckState(Qt.CheckState.Checked) # 默认勾选
+                self.table.setItem(row, 0, item_name)
+
+                # 第二列: 前缀 (默认空)
+                item_prefix = QTableWidgetItem("")
+                item_prefix.setBackground(QColor("#fff2cc"))
+                self.table.setItem(row, 1, item_prefix)
+
+            # 第三列: 文件数 (只读)
+            item_count = QTableWidgetItem(str(self.folder_counts[name]))
+            item_count.setFlags(Qt.ItemFlag.ItemIsEnabled)
+            self.table.setItem(row, 2, item_count)
+
+    def on_scan_finished(self, plan):
+        if self.sender() is not self.scan_worker:
+            return  # 换源目录后被取消、已有新扫描接替的旧扫描
+        self.btn_scan.setText("🔍 2. 扫描文件夹结构")
+        self.btn_scan.setEnabled(True)
+        self.btn_start.setEnabled(not (self.worker and self.worker.isRunning()))
+
+        if plan is None:
+            self.log_text.append("🛑 扫描已取消，表格内容不完整，请重新扫描。")
+            return
+
+        if not plan:
             QMessageBox.information(self, "提示", "未找到包含文件的子文件夹。")
             return
 
-        # 填充表格
-        sorted_folders = sorted(list(unique_folders))
-        self.table.setRowCount(len(sorted_folders))
-        
-        for i, name in enumerate(sorted_folders):
-            # 第一列: 文件夹名 + 复选框
-            item_name = QTableWidgetItem(name)
-            item_name.setFlags(Qt.ItemFlag.ItemIsUserCheckable | Qt.ItemFlag.ItemIsEnabled)
-            item_name.setCheckState(Qt.CheckState.Checked) # 默认勾选
-            self.table.setItem(i, 0, item_name)
-            
-            # 第二列: 前缀 (默认空)
-            item_prefix = QTableWidgetItem("")
-            item_prefix.setBackground(QColor("#fff2cc"))
-            self.table.setItem(i, 1, item_prefix)
-            
-        self.log_text.append(f"✅ 扫描完成！发现 {len(unique_folders)} 种底层文件夹。")
+        self.plan = plan
+        total = sum(len(files) for *_, files in plan)
+        self.log_text.append(f"✅ 扫描完成！发现 {len(self.folder_names)} 种底层文件夹，共 {total} 个文件。")
         self.log_text.append("请勾选需要处理的文件夹，并在右侧填写前缀（可留空）。")
 
+    def on_inplace_toggled(self, checked):
+        self.combo_mode.setEnabled(not checked)
+        self.btn_dst.setEnabled(not checked)
+        self.btn_start.setText("✏️ 开始原地重命名" if checked else "🚀 开始复制并重命名")
+
     def start_process(self):
-        if not self.source_path or not self.target_path:
+        in_place = self.chk_inplace.isChecked()
+        if not self.source_path or (not in_place and not self.target_path):
             QMessageBox.warning(self, "提示", "请先选择源路径和目标路径！")
             return
         
+        if self.scan_worker and self.scan_worker.isRunning():
+            QMessageBox.warning(self, "提示", "正在扫描文件夹结构，请等扫描完成！")
+            return
+
         if self.table.rowCount() == 0:
             QMessageBox.warning(self, "提示", "请先点击【扫描文件夹结构】！")
             return
         
-        if self.source_path == self.target_path:
+        if not in_place and self.source_path == self.target_path:
             QMessageBox.warning(self, "提示", "源路径和目标路径不能相同！")
             return
 
@@ -301,20 +545,56 @@ class RenamerApp(QWidget):
             QMessageBox.warning(self, "提示", "请至少勾选一个需要处理的文件夹！")
             return
 
+        if in_place:
+            reply = QMessageBox.question(self, "确认原地重命名",
+                                         f"将直接改名源文件夹中勾选的 {checked_count} 种文件夹里的文件，不做复制。\n"
+                                         "改名记录保存在源文件夹里，可随时点【撤销上次重命名】还原。\n\n确定继续吗？")
+            if reply != QMessageBox.StandardButton.Yes:
+                return
+        elif not confirm_mode(self, self.combo_mode.currentData()):
+            return
+
         # 启动处理
         self.btn_start.setEnabled(False)
         self.btn_stop.setEnabled(True)
         self.log_text.clear()
         self.progress_bar.setValue(0)
         
-        self.worker = RenamerWorker(self.source_path, self.target_path, prefix_map)
+        self.worker = RenamerWorker(self.source_path, self.target_path, prefix_map, self.combo_mode.currentData(),
+                                    plan=self.plan, in_place=in_place)
+        if in_place:
+            self.plan = None  # 文件名变了，下次由 worker 重新扫描
+        self.start_worker()
+
+    def undo_rename(self):
+        if not self.source_path:
+            QMessageBox.warning(self, "提示", "请先选择源文件夹！")
+            return
+        journal = load_journal(self.source_path)
+        if not journal or journal.get("stage") == "undone":
+            QMessageBox.information(self, "提示", "该源文件夹没有可撤销的原地重命名记录。")
+            return
+        reply = QMessageBox.question(self, "确认撤销",
+                                     f"将把 {journal.get('created', '')} 改名的 {len(journal['entries'])} 个文件改回原名，确定吗？")
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+
+        self.btn_start.setEnabled(False)
+        self.log_text.clear()
+        self.progress_bar.setValue(0)
+        self.plan = None
+        self.worker = UndoWorker(self.source_path)
+        self.start_worker()
+
+    def start_worker(self):
+        self.btn_undo.setEnabled(False)
         self.worker.log_signal.connect(self.log)
         self.worker.progress_signal.connect(self.progress_bar.setValue)
         self.worker.finished_signal.connect(self.on_finished)
         self.worker.start()
 
     def stop_process(self):
-        if self.worker:
+        if isinstance(self.worker, RenamerWorker):
             self.worker.stop()
             self.log("⏳ 正在停止...")
 
@@ -326,6 +606,7 @@ class RenamerApp(QWidget):
     def on_finished(self, msg):
         self.btn_start.setEnabled(True)
         self.btn_stop.setEnabled(False)
+        self.btn_undo.setEnabled(True)
         QMessageBox.information(self, "完成", msg)
 
 if __name__ == "__main__":
@@ -0,0 +1,232 @@
+import os
+import hashlib
+from collections import Counter
+
+import pandas as pd
+
+# ==========================================
+# 大表格流式读取 (下载器用)
+# pd.read_excel 会把所有 Sheet 整个读进内存，几百万行时内存能到好几 GB。
+# 超过 STREAM_MIN_BYTES 的表格改为流式：
+#   Excel (.xlsx) 用 openpyxl read_only 逐行读，CSV 用 read_csv 分块读；
+#   加载时只保存列名和 Hook 计数，下载任务在下载线程里边读边生成，内存不随行数增长。
+# 行号与 pandas 读法一致 (表头为第 1 行，数据从第 2 行起)，失败清单里的行号照旧可用；
+# 单元格转文本也按 pandas 的整列类型推断来 (例如有空值的数字列是 "123.0")，
+# 两种读法得到的 Hook 目录名、文件名一致，已有归档照样能匹配上。
+# ==========================================
+
+STREAM_MIN_BYTES = 20 * 1024 * 1024
+CSV_CHUNK_ROWS = 50000
+STREAM_EXTS = ('.xlsx', '.xlsm', '.csv')  # 老的 .xls 只能整表读
+
+
+def should_stream(path):
+    return path.lower().endswith(STREAM_EXTS) and os.path.getsize(path) >= STREAM_MIN_BYTES
+
+
+def cell_text(value):
+    """非数字列里的单元格转文本；与 pandas 读 Excel 一致，整数值的浮点数显示为整数。空单元格返回 None"""
+    if value is None: return None
+    if isinstance(value, float):
+        if value != value: return None  # NaN
+        if value.is_integer(): return str(int(value))
+    return str(value)
+
+
+def _as_number(value):
+    """能当数字的返回 (数值, 是否整数)，否则 None。Excel 里整数值的浮点数和 pandas 一样算整数"""
+    if isinstance(value, bool): return None
+    if isinstance(value, int): return value, True
+    if isinstance(value, float): return value, value.is_integer()
+    if isinstance(value, str):
+        try:
+            return int(value), True
+        except ValueError:
+            pass
+        try:
+            return float(value), False  # CSV 里的 "2.0" 在 pandas 里也让整列变成浮点
+        except ValueError:
+            return None
+    return None
+
+
+class ColumnKind:
+    """按 pandas 的整列类型推断记录一列: 全是数字 (含数字文本) 时为数值列，
+    有空值或非整数时是 float64 (123 显示为 "123.0")，否则是 int64；其它情况逐个单元格转文本"""
+    __slots__ = ("missing", "numeric", "integral")
+
+    def __init__(self):
+        self.missing = False
+        self.numeric = True
+        self.integral = True
+
+    def add(self, value):
+        if value is None or (isinstance(value, float) and value != value):
+            self.missing = True
+            return
+        if not self.numeric: return
+        num = _as_number(value)
+        if num is None:
+            self.numeric = False
+        elif not num[1]:
+            self.integral = False
+
+    def render(self, value):
+        if value is None or (isinstance(value, float) and value != value): return None
+        if self.numeric:
+            num = _as_number(value)
+            if num is not None:
+                return str(int(num[0])) if self.integral and not self.missing else str(float(num[0]))
+        return cell_text(value)
+
+
+def _header_names(row):
+    """与 pandas 一致：空表头为 "Unnamed: 列序号"，重名列依次加 .1 .2"""
+    cells = list(row or ())
+    while cells and cells[-1] is None: cells.pop()
+    names, seen = [], {}
+    for i, v in enumerate(cells):
+        name = cell_text(v) if v is not None else f"Unnamed: {i}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+class TableSource:
+    """流式表格：只保存各 Sheet 的列名和 Hook 计数，数据行每次用到时重新从文件读"""
+
+    def __init__(self, path):
+        self.path = path
+        self.is_csv = path.lower().endswith('.csv')
+        self.columns = self.read_columns()  # Sheet -> [列名]
+        self.kinds = {}  # Sheet -> [ColumnKind]，第一次统计 Hook 时顺带得出
+        self.hook_counts = {}  # Hook 列 -> {Sheet: Counter(Hook 值 -> 行数)}
+
+    @property
+    def sheets(self):
+        return list(self.columns)
+
+    def _open_workbook(self):
+        from openpyxl import load_workbook
+        return load_workbook(self.path, read_only=True, data_only=True)
+
+    def read_columns(self):
+        if self.is_csv:
+            return {'CSV': [str(c) for c in pd.read_csv(self.path, nrows=0).columns]}
+        wb = self._open_workbook()
+        try:
+            return {ws.title: _header_names(next(ws.iter_rows(values_only=True), None)) for ws in wb.worksheets}
+        finally:
+            wb.close()
+
+    def _raw_rows(self, sheet, wanted):
+        """逐行产出 (行号, [wanted 各列的原始值])；CSV 为字符串，空值为 None/NaN"""
+        names = self.columns.get(sheet, [])
+        if self.is_csv:
+            for chunk in pd.read_csv(self.path, dtype=str, usecols=wanted, chunksize=CSV_CHUNK_ROWS):
+                chunk = chunk[wanted]
+                for idx, values in zip(chunk.index, chunk.itertuples(index=False, name=None)):
+                    yield idx + 2, values
+            return
+        index = [names.index(c) for c in wanted]
+        wb = self._open_workbook()
+        try:
+            rows = wb[sheet].iter_rows(values_only=True)
+            next(rows, None)  # 表头
+            for i, row in enumerate(rows):
+                yield i + 2, [row[j] if j < len(row) else None for j in index]
+        finally:
+            wb.close()
+
+    def _analyze(self, sheet, hook_col):
+        """读一遍整张表：得出各列类型，同时数出 Hook 列的原始值"""
+        names = self.columns[sheet]
+        kinds = [ColumnKind() for _ in names]
+        hook_idx = names.index(hook_col)
+        raw = Counter()
+        blank_rows = False
+        for _, values in self._raw_rows(sheet, names):
+            if all(v is None for v in values):
+                blank_rows = True  # pandas 会去掉表尾的空行，只有后面还有数据时才算空值
+                continue
+            if blank_rows:
+                for kind in kinds: kind.missing = True
+                blank_rows = False
+            for kind, v in zip(kinds, values): kind.add(v)
+            raw[values[hook_idx]] += 1
+        self.kinds[sheet] = kinds
+        return raw
+
+    def iter_rows(self, sheet, wanted):
+        """逐行产出 (行号, {列名: 文本或 None})，只取 wanted 里存在的列"""
+        names = self.columns.get(sheet, [])
+        wanted = [c for c in dict.fromkeys(wanted) if c in names]
+        kinds = [self.kinds[sheet][names.index(c)] for c in wanted]
+        for row_num, values in self._raw_rows(sheet, wanted):
+            yield row_num, {c: kind.render(v) for c, kind, v in zip(wanted, kinds, values)}
+
+    def count_hooks(self, hook_col):
+        """统计各 Sheet 里每个 Hook 的行数 (结果按列缓存)，界面上的 Hook 列表和统计都用它"""
+        if hook_col not in self.hook_counts:
+            counts = {}
+            for sheet, names in self.columns.items():
+                if hook_col not in names: continue
+                if sheet not in self.kinds:
+                    raw = self._analyze(sheet, hook_col)
+                else:
+                    raw = Counter(values[0] for _, values in self._raw_rows(sheet, [hook_col]))
+                kind = self.kinds[sheet][names.index(hook_col)]
+                counter = Counter()
+                for value, n in raw.items():
+                    text = kind.render(value)
+                    if text is not None: counter[text] += n
+                counts[sheet] = counter
+            self.hook_counts[hook_col] = counts
+        return self.hook_counts[hook_col]
+
+    def ensure_kinds(self, sheet):
+        if sheet not in self.kinds: self._analyze(sheet, self.columns[sheet][0])
+
+
+class TableTasks:
+    """可重复迭代的下载任务流 (预检读一遍、下载再读一遍)，len() 为任务数。
+    task_filter 可用来跳过任务日志里已完成的行"""
+
+    def __init__(self, source, sheets, hook_col, url_col, name_col, hooks):
+        self.source = source
+        self.sheets = sheets
+        self.hook_col, self.url_col, self.name_col = hook_col, url_col, name_col
+        self.hooks = hooks
+        self.task_filter = None
+        counts = source.count_hooks(hook_col)
+        self.total = sum(n for s in sheets for h, n in counts.get(s, {}).items() if h.strip() in hooks)
+
+    def __len__(self):
+        return self.total
+
+    def fingerprint(self):
+        """不读数据行：文件 (路径 / 大小 / 修改时间) + 筛选条件 -> 任务日志指纹"""
+        st = os.stat(self.source.path)
+        h = hashlib.sha1()
+        for part in (os.path.abspath(self.source.path), st.st_size, st.st_mtime_ns, self.hook_col, self.url_col,
+                     self.name_col, *self.sheets, "|", *sorted(self.hooks)):
+            h.update(str(part).encode('utf-8'))
+            h.update(b'\n')
+        return h.hexdigest()
+
+    def __iter__(self):
+        for sheet in self.sheets:
+            if self.hook_col not in self.source.columns.get(sheet, []): continue
+            self.source.ensure_kinds(sheet)
+            for row_num, row in self.source.iter_rows(sheet, [self.hook_col, self.url_col, self.name_col]):
+                hook = row.get(self.hook_col)
+                if hook is None: continue
+                hook = hook.strip()
+                if hook not in self.hooks: continue
+                task = {"sheet": sheet, "hook": hook, "url": row.get(self.url_col),
+                        "name": row.get(self.name_col) or "未命名", "row_num": row_num}
+                if self.task_filter is None or self.task_filter(task): yield task
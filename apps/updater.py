@@ -1,11 +1,13 @@
 import sys
 import os
-import requests
+import json
+import time
+import hashlib
 import subprocess
 import platform  # 用于判断系统
 import zipfile  # 用于解压Mac包
 from PyQt6.QtWidgets import QMessageBox, QProgressDialog
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QThread, pyqtSignal, QSettings
 
 # ==========================================
 # 👇 请修改你的仓库名 (格式: 用户名/仓库名)
@@ -13,6 +15,10 @@ GITHUB_REPO = "guojiadong1994/LoveToolbox"
 # 👇 每次发布新版本前，记得修改这里
 CURRENT_VERSION = "v1.2"
 
+# 可用环境变量指向本地假服务器做测试 (镜像见 apps/mirrors.py)
+RELEASES_API = os.environ.get("LOVETOOLBOX_RELEASES_API", "https://api.github.com")
+CHUNK_SIZE = 1024 * 1024  # 下载缓冲 1MB
+
 
 # ==========================================
 
@@ -27,57 +33,206 @@ def get_system_asset_name():
         return None
 
 
+def fetch_latest_release(timeout=5):
+    """获取最新 Release 信息；带 ETag 条件请求，未变化时直接用本地缓存"""
+    import requests  # 延迟导入，启动器不为它付出启动时间
+    settings = QSettings("LoveToolbox", "Updater")
+    cached_json = settings.value("release_json", "", type=str)
+    cached_etag = settings.value("release_etag", "", type=str)
+
+    headers = {'Accept': 'application/vnd.github+json'}
+    if cached_json and cached_etag: headers['If-None-Match'] = cached_etag
+    api_url = f"{RELEASES_API}/repos/{GITHUB_REPO}/releases/latest"
+    response = requests.get(api_url, headers=headers, timeout=timeout)
+
+    if response.status_code == 304 and cached_json:
+        return json.loads(cached_json)
+    response.raise_for_status()
+    data = response.json()
+    settings.setValue("release_json", json.dumps(data))
+    settings.setValue("release_etag", response.headers.get("ETag", ""))
+    settings.setValue("checked_at", int(time.time()))
+    return data
+
+
+def same_version(a, b):
+    """v1.2 与 1.2 视为同一版本"""
+    return a.strip().lstrip('vV') == b.strip().lstrip('vV')
+
+
+def find_asset(data, target_asset_name):
+    """在 Release 的 assets 中找到本系统的安装包，以及它的 sha256 (asset digest 或同名 .sha256 文件)"""
+    asset = None
+    for a in data.get('assets', []):
+        if target_asset_name in a['name'] and not a['name'].endswith(('.sha256', '.delta')):
+            asset = a
+            break
+    if asset is None: return None
+    info = {'url': asset['browser_download_url'], 'name': asset['name'], 'size': asset.get('size', 0),
+            'sha256': None, 'sha256_url': None, 'delta_url': None, 'delta_sha256': None}
+    digest = asset.get('digest') or ""
+    if digest.startswith("sha256:"):
+        info['sha256'] = digest.split(":", 1)[1]
+    delta_prefix = asset['name'] + "."
+    for a in data.get('assets', []):
+        name = a['name']
+        if name == asset['name'] + ".sha256" and not info['sha256']:
+            info['sha256_url'] = a['browser_download_url']
+        # 从当前版本到最新版本的增量补丁，命名: <安装包名>.<当前版本标签>.delta (标签带不带 v 都认)
+        if (name.startswith(delta_prefix) and name.endswith(".delta")
+                and same_version(name[len(delta_prefix):-len(".delta")], CURRENT_VERSION)):
+            info['delta_url'] = a['browser_download_url']
+            d = a.get('digest') or ""
+            if d.startswith("sha256:"): info['delta_sha256'] = d.split(":", 1)[1]
+    return info
+
+
+def can_apply_delta():
+    """只有打包后的单文件 exe 能直接以 sys.executable 为基准打补丁；Mac 的 .app 是整包 zip，走完整下载"""
+    return getattr(sys, 'frozen', False) and platform.system() == "Windows"
+
+
+class UpdateCheckWorker(QThread):
+    """后台检查更新，不阻塞界面"""
+    result_signal = pyqtSignal(dict)
+    error_signal = pyqtSignal(str)
+
+    def run(self):
+        try:
+            self.result_signal.emit(fetch_latest_release())
+        except Exception as e:
+            self.error_signal.emit(str(e))
+
+
 def check_update(parent_window):
-    """检查更新主逻辑"""
+    """检查更新主逻辑 (网络请求在后台线程，结果回到界面线程再弹窗)"""
     print(f"[{platform.system()}] 正在检查更新...")
-    try:
-        api_url = f"https://api.github.com/repos/{GITHUB_REPO}/releases/latest"
-        response = requests.get(api_url, timeout=5)
+    worker = UpdateCheckWorker()
+    worker.result_signal.connect(lambda data: on_release_info(parent_window, data))
+    worker.error_signal.connect(lambda e: print(f"检查出错: {e}"))  # 静默失败，不打扰
+    parent_window._update_check_worker = worker  # 保持引用，防止线程被回收
+    worker.start()
 
-        if response.status_code != 200:
-            print("检查失败: 无法连接 GitHub API")
-            return
 
-        data = response.json()
-        latest_version = data['tag_name']
-
-        # 版本对比
-        if latest_version != CURRENT_VERSION:
-            # 发现新版本 -> 弹窗提示
-            reply = QMessageBox.question(
-                parent_window,
-                "发现新版本 ✨",
-                f"当前版本：{CURRENT_VERSION}\n最新版本：{latest_version}\n\n检测到有新功能，是否立即更新？",
-                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
-            )
-
-            if reply == QMessageBox.StandardButton.Yes:
-                target_asset_name = get_system_asset_name()
-                if not target_asset_name:
-                    QMessageBox.warning(parent_window, "错误", "不支持的操作系统。")
-                    return
+def on_release_info(parent_window, data):
+    latest_version = data.get('tag_name')
+    if not latest_version:
+        print("检查失败: Release 信息不完整")
+        return
 
-                # 在 Release 列表中寻找对应的文件
-                download_url = ""
-                for asset in data['assets']:
-                    if target_asset_name in asset['name']:
-                        download_url = asset['browser_download_url']
-                        break
-
-                if download_url:
-                    perform_update(parent_window, download_url, latest_version, target_asset_name)
-                else:
-                    QMessageBox.warning(parent_window, "错误", f"未找到适用于 {platform.system()} 的安装包。")
-        else:
-            # 没有更新 -> 弹窗提示已是最新
-            QMessageBox.information(parent_window, "检查更新", f"当前已是最新版本 ({CURRENT_VERSION})！\n无需更新。")
+    # 版本对比
+    if latest_version != CURRENT_VERSION:
+        # 发现新版本 -> 弹窗提示
+        reply = QMessageBox.question(
+            parent_window,
+            "发现新版本 ✨",
+            f"当前版本：{CURRENT_VERSION}\n最新版本：{latest_version}\n\n检测到有新功能，是否立即更新？",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
 
-    except Exception as e:
-        print(f"检查出错: {e}")
-        # 静默失败，不打扰
+        if reply == QMessageBox.StandardButton.Yes:
+            target_asset_name = get_system_asset_name()
+            if not target_asset_name:
+                QMessageBox.warning(parent_window, "错误", "不支持的操作系统。")
+                return
+
+            # 在 Release 列表中寻找对应的文件
+            asset = find_asset(data, target_asset_name)
+            if asset:
+                perform_update(parent_window, asset, latest_version, target_asset_name)
+            else:
+                QMessageBox.warning(parent_window, "错误", f"未找到适用于 {platform.system()} 的安装包。")
+    else:
+        # 没有更新 -> 弹窗提示已是最新
+        QMessageBox.information(parent_window, "检查更新", f"当前已是最新版本 ({CURRENT_VERSION})！\n无需更新。")
 
 
-def perform_update(parent_window, url, version, filename):
+def sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def download_resumable(url, save_path, expected_sha256=None, progress=None, should_stop=None):
+    """断点续传下载到 save_path (先写 .part)，完成后校验 sha256 再改名。
+    自动在镜像间赛跑选最快的，某个镜像中途失败就换下一个继续续传。
+    progress(done, total) 回调进度；should_stop() 返回 True 时中断 (保留 .part 下次续传)。
+    返回 True 表示完成，False 表示被中断；校验失败抛异常。"""
+    from apps.mirrors import MirrorSelector
+    part_path = save_path + ".part"
+    if not MirrorSelector().download(url, part_path, progress, should_stop, CHUNK_SIZE):
+        return False
+
+    if expected_sha256:
+        actual = sha256_file(part_path)
+        if actual.lower() != expected_sha256.lower():
+            os.remove(part_path)  # 坏文件不能留着续传
+            raise Exception(f"校验失败: 期望 {expected_sha256[:12]}..., 实际 {actual[:12]}...")
+    os.replace(part_path, save_path)
+    return True
+
+
+class UpdateDownloadWorker(QThread):
+    progress_signal = pyqtSignal(int)
+    finished_signal = pyqtSignal(bool, str)  # (是否成功, 错误信息/空)
+
+    def __init__(self, asset, save_path):
+        super().__init__()
+        self.asset = asset
+        self.save_path = save_path
+        self.is_running = True
+
+    def stop(self):
+        self.is_running = False
+
+    def report(self, done, total):
+        if total > 0: self.progress_signal.emit(int(100 * done / total))
+
+    def try_delta(self, expected):
+        """增量更新：下载补丁并应用到当前 exe。返回 True 成功 / False 取消 / None 不可用需完整下载"""
+        from apps.delta import apply_patch
+        delta_path = self.save_path + ".delta"
+        patched_path = self.save_path + ".patched"
+        try:
+            ok = download_resumable(self.asset['delta_url'], delta_path,
+                                    self.asset.get('delta_sha256'), self.report, lambda: not self.is_running)
+            if not ok: return False
+            apply_patch(sys.executable, delta_path, patched_path, expected)
+            os.replace(patched_path, self.save_path)
+            return True
+        except Exception as e:
+            print(f"增量更新失败，改为完整下载: {e}")
+            return None
+        finally:
+            for p in (delta_path, patched_path):
+                if os.path.exists(p) and (self.is_running or p == patched_path): os.remove(p)
+
+    def run(self):
+        try:
+            import requests
+            expected = self.asset.get('sha256')
+            if not expected and self.asset.get('sha256_url'):
+                r = requests.get(self.asset['sha256_url'], timeout=15)
+                r.raise_for_status()
+                expected = r.text.split()[0]
+
+            if self.asset.get('delta_url') and can_apply_delta():
+                ok = self.try_delta(expected)
+                if ok is not None:
+                    self.finished_signal.emit(ok, "" if ok else "已取消")
+                    return
+                self.progress_signal.emit(0)
+
+            # 国内加速：镜像赛跑 + 故障切换
+            ok = download_resumable(self.asset['url'], self.save_path, expected, self.report, lambda: not self.is_running)
+            self.finished_signal.emit(ok, "" if ok else "已取消")
+        except Exception as e:
+            self.finished_signal.emit(False, str(e))
+
+
+def perform_update(parent_window, asset, version, filename):
     """执行下载和替换 (双端适配)"""
 
     # 1. 确定下载路径
@@ -91,41 +246,30 @@ def perform_update(parent_window, url, version, filename):
 
     save_path = os.path.join(base_dir, filename)
 
-    # 2. 国内加速下载
-    fast_url = f"https://mirror.ghproxy.com/{url}"
-
+    # 2. 后台下载 (断点续传 + 校验)
     progress = QProgressDialog(f"正在下载 {version}...", "取消", 0, 100, parent_window)
     progress.setWindowModality(Qt.WindowModality.WindowModal)
     progress.setMinimumDuration(0)
     progress.show()
 
-    try:
-        headers = {'User-Agent': 'Mozilla/5.0'}
-        with requests.get(fast_url, stream=True, headers=headers, timeout=60) as r:
-            r.raise_for_status()
-            total_length = int(r.headers.get('content-length', 0))
-            dl = 0
-            with open(save_path, 'wb') as f:
-                for chunk in r.iter_content(chunk_size=8192):
-                    if progress.wasCanceled():
-                        return
-                    if chunk:
-                        dl += len(chunk)
-                        f.write(chunk)
-                        if total_length > 0:
-                            done = int(100 * dl / total_length)
-                            progress.setValue(done)
-            progress.setValue(100)
+    worker = UpdateDownloadWorker(asset, save_path)
+    worker.progress_signal.connect(progress.setValue)
+    progress.canceled.connect(worker.stop)
 
-    except Exception as e:
-        QMessageBox.warning(parent_window, "失败", f"下载失败：{str(e)}")
-        return
+    def on_done(ok, err):
+        progress.close()
+        if not ok:
+            if err != "已取消": QMessageBox.warning(parent_window, "失败", f"下载失败：{err}")
+            return
+        # 3. 根据系统执行替换逻辑
+        if platform.system() == "Windows":
+            update_on_windows(base_dir, save_path)
+        elif platform.system() == "Darwin":
+            update_on_mac(base_dir, save_path)
 
-    # 3. 根据系统执行替换逻辑
-    if platform.system() == "Windows":
-        update_on_windows(base_dir, save_path)
-    elif platform.system() == "Darwin":
-        update_on_mac(base_dir, save_path)
+    worker.finished_signal.connect(on_done)
+    parent_window._update_download_worker = worker
+    worker.start()
 
 
 def update_on_windows(base_dir, new_exe_path):
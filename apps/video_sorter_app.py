@@ -1,104 +1,191 @@
 import sys
 import os
-import shutil
 import cv2
 import time
+import queue
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future
 
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton, 
                              QLabel, QFileDialog, QProgressBar, QTextEdit, 
-                             QGroupBox, QMessageBox)
+                             QGroupBox, QMessageBox, QSpinBox, QCheckBox, QComboBox)
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
 
+from apps.probe_cache import ProbeCache
+from apps.copy_engine import CopyEngine
+from apps.file_scanner import iter_files, FileFeeder
+from apps.dedupe import ExactDeduper, DUP_ACTIONS
+from apps.folder_watch import WatchWorker
+from apps.placement import Placer, MODE_NAMES, create_mode_combo, confirm_mode
+
+VIDEO_EXTS = {'.mp4'}
+
+
+def probe_video(file_path):
+    """用 OpenCV 读取视频宽高 (模块级函数，线程池/进程池都能用)"""
+    cap = cv2.VideoCapture(file_path)
+    try:
+        if not cap.isOpened():
+            raise Exception("无法读取视频流")
+        # 获取宽高 (float 转 int)
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    finally:
+        cap.release()  # 记得释放资源
+    if width == 0 or height == 0:
+        raise Exception("分辨率读取为0")
+    return width, height
+
 # --- 工作线程：负责后台处理视频 ---
 class SorterWorker(QThread):
     log_signal = pyqtSignal(str)
     progress_signal = pyqtSignal(int)
     finished_signal = pyqtSignal(str)
 
-    def __init__(self, source_dir, target_dir):
+    def __init__(self, source_dir, target_dir, workers=4, use_processes=False, copy_workers=4, placement="copy",
+                 dup_action="off", files=None):
         super().__init__()
         self.source_dir = source_dir
+        self.files = files  # 指定文件列表时不扫描目录 (监控模式按批传入新文件)
         self.target_dir = target_dir
+        self.workers = workers  # 探测并发数 (NAS 上探测主要耗在 I/O 等待)
+        self.use_processes = use_processes
+        self.copy_workers = copy_workers  # 复制交给复制引擎，与探测重叠进行
+        self.placement = placement
+        self.dup_action = dup_action  # 完全相同的文件: off / skip / link
         self.is_running = True
 
     def run(self):
-        self.log_signal.emit(f"📂 正在扫描目录: {self.source_dir}")
-        
-        # 1. 扫描所有MP4文件
-        video_files = []
-        try:
-            for root, dirs, files in os.walk(self.source_dir):
-                for file in files:
-                    if file.lower().endswith('.mp4'):
-                        video_files.append(os.path.join(root, file))
-        except Exception as e:
-            self.log_signal.emit(f"❌ 扫描失败: {str(e)}")
-            self.finished_signal.emit("扫描出错")
-            return
-
-        total_files = len(video_files)
-        if total_files == 0:
-            self.log_signal.emit("⚠️ 未找到任何 MP4 视频文件。")
-            self.finished_signal.emit("无文件")
-            return
-
-        self.log_signal.emit(f"✅ 发现 {total_files} 个视频文件，开始分析分辨率...")
-
-        # 2. 遍历处理
+        self.progress_signal.emit(-1)  # 总数未知，进度条先转圈
+
+        # 1. 后台边扫描边把 MP4 文件放进有界队列，找到第一个就开始处理
+        if self.files is not None:
+            feeder = FileFeeder(iter(self.files))
+        else:
+            self.log_signal.emit(f"📂 正在扫描目录: {self.source_dir}")
+            feeder = FileFeeder(iter_files(self.source_dir, VIDEO_EXTS, skip=self.target_dir,
+                                           on_error=lambda d, e: self.log_signal.emit(f"⚠️ 无法读取目录 {d}: {e}")))
+        feeder.start()
+
+        # 2. 探测走线程池/进程池，按完成顺序取结果；复制交给复制引擎
         success_count = 0
         fail_count = 0
+        done_count = 0
+        in_flight = 0
+        total_files = None  # 扫描结束后才知道
+        max_in_flight = self.workers * 4
+        events = queue.Queue()
+        reserved = set()  # 已分配出去的目标路径，防止并发复制时重名互相覆盖
+        pool_cls = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+        probe_pool = pool_cls(max_workers=self.workers)
+        engine = CopyEngine(workers=self.copy_workers, log=self.log_signal.emit)
+        self.placer = Placer(self.placement, self.log_signal.emit, copier=engine.copy)
+        deduper = ExactDeduper(self.dup_action, self.log_signal.emit) if self.dup_action != "off" else None
+        cache = ProbeCache("video")
+        stats = {}  # 路径 -> (大小, mtime, inode)，探测成功后写入缓存用
 
-        for index, file_path in enumerate(video_files):
-            if not self.is_running:
-                self.log_signal.emit("🛑 任务已停止。")
-                break
-
-            file_name = os.path.basename(file_path)
-            
-            try:
-                # 使用 OpenCV 读取视频信息
-                cap = cv2.VideoCapture(file_path)
-                if not cap.isOpened():
-                    raise Exception("无法读取视频流")
-
-                # 获取宽高 (float 转 int)
-                width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                cap.release() # 记得释放资源
-
-                if width == 0 or height == 0:
-                    raise Exception("分辨率读取为0")
-
-                resolution_str = f"{width}x{height}" # 例如 1920x1080
-
-                # 3. 创建目标文件夹
-                dest_folder = os.path.join(self.target_dir, resolution_str)
-                if not os.path.exists(dest_folder):
-                    os.makedirs(dest_folder)
-
-                # 4. 复制文件
-                dest_path = os.path.join(dest_folder, file_name)
-                
-                # 防止重名覆盖逻辑
-                if os.path.exists(dest_path):
-                    name_part, ext_part = os.path.splitext(file_name)
-                    dest_path = os.path.join(dest_folder, f"{name_part}_copy{ext_part}")
-
-                shutil.copy2(file_path, dest_path)
-                
-                self.log_signal.emit(f"✅ [{resolution_str}] 已复制: {file_name}")
-                success_count += 1
-
-            except Exception as e:
-                self.log_signal.emit(f"❌ 处理失败 {file_name}: {str(e)}")
-                fail_count += 1
-
-            # 更新进度
-            progress = int(((index + 1) / total_files) * 100)
-            self.progress_signal.emit(progress)
-
+        try:
+            while True:
+                if not self.is_running:
+                    self.log_signal.emit("🛑 任务已停止。")
+                    break
+
+                if total_files is None and feeder.exhausted():
+                    total_files = feeder.count
+                    if feeder.error:
+                        self.log_signal.emit(f"❌ 扫描失败: {str(feeder.error)}")
+                    if total_files == 0:
+                        self.log_signal.emit("⚠️ 未找到任何 MP4 视频文件。")
+                        self.finished_signal.emit("扫描出错" if feeder.error else "无文件")
+                        return
+                    self.log_signal.emit(f"✅ 扫描完成，共 {total_files} 个视频文件")
+                    self.progress_signal.emit(int(done_count / total_files * 100))
+                if total_files is not None and done_count >= total_files:
+                    break
+
+                # 补充新扫到的文件 (在途数量有上限)
+                for file_path in feeder.take(max_in_flight - in_flight, timeout=0 if in_flight else 0.1):
+                    in_flight += 1
+                    try:
+                        stats[file_path] = cache.stat(file_path)
+                        hit = cache.get(file_path, stats[file_path])
+                    except OSError:
+                        hit = None
+                    if hit:
+                        # 缓存命中：直接当作已完成的探测结果
+                        fut = Future()
+                        fut.set_result(hit)
+                        events.put(("probe", file_path, fut, None))
+                        continue
+                    fut = probe_pool.submit(probe_video, file_path)
+                    fut.add_done_callback(lambda f, p=file_path: events.put(("probe", p, f, None)))
+
+                try:
+                    kind, file_path, fut, resolution_str = events.get(timeout=0.05 if in_flight else 0.01)
+                except queue.Empty:
+                    continue
+                if fut.cancelled(): continue
+                file_name = os.path.basename(file_path)
+
+                if kind == "probe":
+                    try:
+                        width, height = fut.result()
+                        if file_path in stats: cache.put(file_path, stats.pop(file_path), width, height)
+                        resolution_str = f"{width}x{height}"  # 例如 1920x1080
+                        dest_path, existing = self.reserve_dest(resolution_str, file_name, reserved)
+                        if deduper:
+                            cf = engine.submit(deduper.place, self.placer, file_path, dest_path, existing)
+                        else:
+                            cf = engine.submit(self.placer.place, file_path, dest_path)
+                        cf.add_done_callback(lambda f, p=file_path, r=resolution_str: events.put(("copy", p, f, r)))
+                        continue
+                    except Exception as e:
+                        self.log_signal.emit(f"❌ 处理失败 {file_name}: {str(e)}")
+                        fail_count += 1
+                else:
+                    try:
+                        used = fut.result()
+                        if used == "duplicate":
+                            self.log_signal.emit(f"♻️ [{resolution_str}] 重复文件已跳过: {file_name}")
+                        else:
+                            self.log_signal.emit(f"✅ [{resolution_str}] 已{MODE_NAMES[used]}: {file_name}")
+                        success_count += 1
+                    except Exception as e:
+                        self.log_signal.emit(f"❌ 处理失败 {file_name}: {str(e)}")
+                        fail_count += 1
+
+                # 更新进度 (扫描没结束时保持转圈)
+                in_flight -= 1
+                done_count += 1
+                if total_files: self.progress_signal.emit(int(done_count / total_files * 100))
+        finally:
+            feeder.stop()
+            probe_pool.shutdown(wait=False, cancel_futures=True)
+            engine.close(cancel=True)  # 正在复制的文件等它写完，避免留下半截
+            cache.close()
+
+        self.log_signal.emit(f"📊 {cache.summary()}，{self.placer.summary()}")
+        if deduper: self.log_signal.emit(f"♻️ {deduper.summary()}")
         self.finished_signal.emit(f"处理完成！成功: {success_count}, 失败: {fail_count}")
 
+    def reserve_dest(self, resolution_str, file_name, reserved):
+        """创建分辨率目录并分配目标路径 (只在 run 线程调用)。
+        返回 (目标路径, 目标目录里已有的同名文件或 None)"""
+        dest_folder = os.path.join(self.target_dir, resolution_str)
+        if not os.path.exists(dest_folder):
+            os.makedirs(dest_folder)
+        dest_path = os.path.join(dest_folder, file_name)
+
+        # 防止重名覆盖逻辑：依次尝试 名字_copy、名字_copy2 ... (递归扫描时同名视频可能有很多个)
+        existing = dest_path if os.path.lexists(dest_path) else None
+        name_part, ext_part = os.path.splitext(file_name)
+        n = 0
+        while dest_path in reserved or os.path.lexists(dest_path):
+            n += 1
+            suffix = "_copy" if n == 1 else f"_copy{n}"
+            dest_path = os.path.join(dest_folder, f"{name_part}{suffix}{ext_part}")
+        reserved.add(dest_path)
+        return dest_path, existing
+
     def stop(self):
         self.is_running = False
 
@@ -113,6 +200,7 @@ class VideoSorterApp(QWidget):
         self.source_path = ""
         self.target_path = ""
         self.worker = None
+        self.watcher = None
 
         self.init_ui()
 
@@ -167,8 +255,39 @@ class VideoSorterApp(QWidget):
         self.btn_stop.setEnabled(False)
         self.btn_stop.clicked.connect(self.stop_process)
 
+        self.btn_watch = QPushButton("👀 监控模式")
+        self.btn_watch.setFixedHeight(45)
+        self.btn_watch.setToolTip("持续监控源文件夹，新视频写完后自动分拣；处理过的文件记录在目标文件夹 _meta 里")
+        self.btn_watch.clicked.connect(self.toggle_watch)
+        self.chk_poll = QCheckBox("定时扫描")
+        self.chk_poll.setToolTip("监控模式不用 inotify，改为每隔几秒扫描一次。\n"
+                                 "网络盘 (SMB / NFS) 上别的机器写入的文件收不到通知，需要勾选 (常见网络盘会自动识别)")
+
         btn_layout.addWidget(self.btn_start)
         btn_layout.addWidget(self.btn_stop)
+        btn_layout.addWidget(self.btn_watch)
+        btn_layout.addWidget(self.chk_poll)
+
+        # 并发设置
+        opt_layout = QHBoxLayout()
+        opt_layout.addWidget(QLabel("探测并发数:"))
+        self.spin_workers = QSpinBox()
+        self.spin_workers.setRange(1, 64)
+        self.spin_workers.setValue(8)
+        self.spin_workers.setToolTip("NAS / 网络盘上可以调大，探测时间主要花在等待 I/O")
+        opt_layout.addWidget(self.spin_workers)
+        self.chk_process = QCheckBox("使用多进程")
+        opt_layout.addWidget(self.chk_process)
+        opt_layout.addWidget(QLabel("放置方式:"))
+        self.combo_mode = create_mode_combo()
+        opt_layout.addWidget(self.combo_mode)
+        opt_layout.addWidget(QLabel("重复文件:"))
+        self.combo_dup = QComboBox()
+        for key, name in DUP_ACTIONS:
+            self.combo_dup.addItem(name, key)
+        opt_layout.addWidget(self.combo_dup)
+        opt_layout.addStretch()
+        layout.addLayout(opt_layout)
         layout.addLayout(btn_layout)
 
         # 4. 进度与日志
@@ -198,23 +317,34 @@ class VideoSorterApp(QWidget):
             self.lbl_dst.setText(d)
             self.lbl_dst.setStyleSheet("color: #188038;") # Green
 
-    def start_process(self):
+    def check_paths(self):
         if not self.source_path or not self.target_path:
             QMessageBox.warning(self, "提示", "请先选择【源文件夹】和【目标文件夹】！")
-            return
+            return False
         
         if self.source_path == self.target_path:
             QMessageBox.warning(self, "提示", "源文件夹和目标文件夹不能相同，否则会造成混乱。")
+            return False
+
+        return confirm_mode(self, self.combo_mode.currentData())
+
+    def sorter_options(self):
+        return dict(workers=self.spin_workers.value(), use_processes=self.chk_process.isChecked(),
+                    placement=self.combo_mode.currentData(), dup_action=self.combo_dup.currentData())
+
+    def start_process(self):
+        if not self.check_paths():
             return
 
         self.btn_start.setEnabled(False)
         self.btn_stop.setEnabled(True)
+        self.btn_watch.setEnabled(False)  # 分拣和监控同时跑会抢同一批文件
         self.log_text.clear()
         self.progress_bar.setValue(0)
 
-        self.worker = SorterWorker(self.source_path, self.target_path)
+        self.worker = SorterWorker(self.source_path, self.target_path, **self.sorter_options())
         self.worker.log_signal.connect(self.log)
-        self.worker.progress_signal.connect(self.progress_bar.setValue)
+        self.worker.progress_signal.connect(self.on_progress)
         self.worker.finished_signal.connect(self.on_finished)
         self.worker.start()
 
@@ -224,14 +354,46 @@ class VideoSorterApp(QWidget):
             self.log("正在停止...")
             self.btn_stop.setEnabled(False)
 
+    def toggle_watch(self):
+        if self.watcher and self.watcher.isRunning():
+            self.watcher.stop()
+            self.btn_watch.setEnabled(False)
+            self.btn_watch.setText("正在停止...")
+            return
+        if not self.check_paths():
+            return
+        self.log_text.clear()
+        self.watcher = WatchWorker("video", self.source_path, self.target_path, self.sorter_options(),
+                                   poll=self.chk_poll.isChecked())
+        self.watcher.log_signal.connect(self.log)
+        self.watcher.finished.connect(self.on_watch_finished)
+        self.btn_start.setEnabled(False)
+        self.btn_watch.setText("⏹ 停止监控")
+        self.watcher.start()
+
+    def on_watch_finished(self):
+        self.btn_start.setEnabled(True)
+        self.btn_watch.setEnabled(True)
+        self.btn_watch.setText("👀 监控模式")
+
     def log(self, msg):
         self.log_text.append(msg)
         sb = self.log_text.verticalScrollBar()
         sb.setValue(sb.maximum())
 
+    def on_progress(self, value):
+        # -1 表示还在扫描、总数未知：显示忙碌状态
+        if value < 0:
+            self.progress_bar.setRange(0, 0)
+        else:
+            self.progress_bar.setRange(0, 100)
+            self.progress_bar.setValue(value)
+
     def on_finished(self, msg):
+        self.progress_bar.setRange(0, 100)
         self.btn_start.setEnabled(True)
         self.btn_stop.setEnabled(False)
+        self.btn_watch.setEnabled(True)
         QMessageBox.information(self, "完成", msg)
 
 if __name__ == "__main__":
@@ -0,0 +1,111 @@
+import os
+import random
+
+
+# ==========================================
+# 合成测试素材
+# 图片 (JPEG/PNG/WebP)、小 MP4、多层目录树、多 Sheet 大表格。
+# 固定随机种子，保证每次生成的素材一致，结果可对比。
+# ==========================================
+
+IMAGE_SIZES = [(1080, 1920), (1920, 1080), (1080, 1080), (720, 1280), (640, 360)]
+VIDEO_SIZES = [(1280, 720), (720, 1280), (640, 360)]
+
+
+def make_images(out_dir, count, seed=1):
+    """生成 count 张图片，轮流使用 JPEG/PNG/WebP 和不同分辨率"""
+    from PIL import Image
+    rnd = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    formats = [("JPEG", ".jpg"), ("PNG", ".png"), ("WEBP", ".webp")]
+    paths = []
+    base = {}
+    for i in range(count):
+        w, h = IMAGE_SIZES[i % len(IMAGE_SIZES)]
+        fmt, ext = formats[i % len(formats)]
+        if (w, h) not in base:
+            # 渐变 + 噪点，既能压缩又不会小得离谱
+            grad = Image.linear_gradient("L").resize((w, h))
+            noise = Image.effect_noise((w, h), 40)
+            base[(w, h)] = Image.merge("RGB", (grad, noise, grad.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+        img = base[(w, h)]
+        if rnd.random() < 0.5: img = img.transpose(Image.Transpose.FLIP_TOP_BOTTOM)
+        path = os.path.join(out_dir, f"img_{i:05d}{ext}")
+        if fmt == "PNG":
+            img.save(path, fmt, compress_level=1)
+        else:
+            img.save(path, fmt, quality=85)
+        paths.append(path)
+    return paths
+
+
+def make_videos(out_dir, count, frames=30):
+    """生成 count 个小 MP4 (mp4v 编码)"""
+    import cv2
+    import numpy as np
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for i in range(count):
+        w, h = VIDEO_SIZES[i % len(VIDEO_SIZES)]
+        path = os.path.join(out_dir, f"clip_{i:04d}.mp4")
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 30, (w, h))
+        frame = np.zeros((h, w, 3), dtype=np.uint8)
+        for f in range(frames):
+            frame[:, :, 0] = (f * 8 + i) % 255
+            frame[:, :, 1] = np.linspace(0, 255, w, dtype=np.uint8)
+            writer.write(frame)
+        writer.release()
+        paths.append(path)
+    return paths
+
+
+def make_tree(out_dir, source_files, depth=3, fanout=3, files_per_dir=10):
+    """生成多层目录树：叶子目录名重复出现 (如 1080-1920)，模拟重命名工具的真实输入"""
+    import shutil
+    leaf_names = ["1080-1920", "1920-1080", "1080-1080"]
+    counter = [0]
+    paths = []
+
+    def build(cur, level):
+        if level == depth:
+            for leaf in leaf_names[:fanout]:
+                d = os.path.join(cur, leaf)
+                os.makedirs(d, exist_ok=True)
+                for _ in range(files_per_dir):
+                    src = source_files[counter[0] % len(source_files)]
+                    dst = os.path.join(d, f"f{counter[0]:06d}{os.path.splitext(src)[1]}")
+                    shutil.copyfile(src, dst)
+                    paths.append(dst)
+                    counter[0] += 1
+            return
+        for k in range(fanout):
+            build(os.path.join(cur, f"level{level}_{k}"), level + 1)
+
+    build(out_dir, 0)
+    return paths
+
+
+def make_workbook(path, base_url, file_names, sheets=3, rows_per_sheet=1000, hooks=20):
+    """生成多 Sheet 表格，列: hook / url / name，链接指向本地替身服务器"""
+    import pandas as pd
+    rnd = random.Random(7)
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        for s in range(sheets):
+            rows = []
+            for r in range(rows_per_sheet):
+                name = file_names[(s * rows_per_sheet + r) % len(file_names)]
+                rows.append({"hook": f"H{rnd.randrange(hooks):03d}", "url": f"{base_url}/{name}",
+                             "name": f"素材_{s}_{r}"})
+            pd.DataFrame(rows).to_excel(writer, sheet_name=f"Sheet{s + 1}", index=False)
+    return path
+
+
+def make_tasks(base_url, file_names, repeat=1):
+    """直接生成 DownloadWorker 的任务列表 (跳过表格解析)；repeat>1 时同一文件用不同查询串重复"""
+    tasks = []
+    for k in range(repeat):
+        for i, name in enumerate(file_names):
+            url = f"{base_url}/{name}" + (f"?r={k}" if k else "")
+            tasks.append({"sheet": "Bench", "hook": f"H{i % 10}", "url": url, "name": f"{name}_{k}",
+                          "row_num": k * len(file_names) + i + 2})
+    return tasks
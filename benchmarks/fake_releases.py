@@ -0,0 +1,69 @@
+"""
+本地假 GitHub Releases 服务器 (测试更新流程用)
+
+    python -m benchmarks.fake_releases v9.9 dist/LoveToolbox-Windows.exe --port 8766
+
+然后在另一个终端:
+    set LOVETOOLBOX_RELEASES_API=http://127.0.0.1:8766
+    python main.py
+
+生成 /repos/<仓库>/releases/latest 的 JSON (含 sha256 digest) 和安装包文件，
+用 StandInServer 提供，支持 ETag(304)、Range 续传、限速和随机错误。
+"""
+import os
+import sys
+import json
+import shutil
+import hashlib
+import argparse
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path: sys.path.insert(0, ROOT)
+
+from benchmarks.http_server import StandInServer
+
+
+def build_release(root, base_url, repo, version, asset_files):
+    """在 root 下生成 releases/latest JSON，并把安装包放到 /download/<版本>/ 下"""
+    assets = []
+    dl_dir = os.path.join(root, "download", version)
+    os.makedirs(dl_dir, exist_ok=True)
+    for path in asset_files:
+        name = os.path.basename(path)
+        shutil.copy(path, os.path.join(dl_dir, name))
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''): h.update(block)
+        assets.append({"name": name, "size": os.path.getsize(path), "digest": f"sha256:{h.hexdigest()}",
+                       "browser_download_url": f"{base_url}/download/{version}/{name}"})
+    api_dir = os.path.join(root, "repos", *repo.split("/"), "releases")
+    os.makedirs(api_dir, exist_ok=True)
+    with open(os.path.join(api_dir, "latest"), 'w', encoding='utf-8') as f:
+        json.dump({"tag_name": version, "assets": assets}, f, indent=2)
+    return assets
+
+
+def main(argv=None):
+    from apps.updater import GITHUB_REPO
+    parser = argparse.ArgumentParser(description="本地假 Releases 服务器")
+    parser.add_argument("version", help="假装发布的版本号，如 v9.9")
+    parser.add_argument("assets", nargs="+", help="要发布的文件 (名字需包含 LoveToolbox-Windows.exe 等关键词)")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--bandwidth", type=int, default=0, help="每连接限速 (字节/秒)，方便测试取消和续传")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    root = tempfile.mkdtemp(prefix="lovetoolbox_releases_")
+    server = StandInServer(root, args.port, bandwidth=args.bandwidth, error_rate=args.error_rate)
+    for a in build_release(root, server.base_url, GITHUB_REPO, args.version, args.assets):
+        print(f"  {a['name']}  {a['size']} bytes  {a['digest']}")
+    print(f"LOVETOOLBOX_RELEASES_API={server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    sys.exit(main())
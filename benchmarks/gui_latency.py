@@ -0,0 +1,204 @@
+"""
+界面卡顿基准测试 (事件循环延迟)
+
+    python -m benchmarks.gui_latency --out gui_latency.json
+    python -m benchmarks.gui_latency --tools downloader,renamer --quick
+
+在 offscreen 模式下打开各个工具窗口，用合成素材跑一遍完整任务，
+同时用 QTimer 探针每 10ms 检查一次事件循环：实际间隔超出预期的部分即为卡顿。
+输出每个工具的 p50 / p99 / 最大卡顿 (毫秒)，界面线程一旦退化就能在数字上看出来。
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path: sys.path.insert(0, ROOT)
+
+from PyQt6.QtWidgets import QApplication, QMessageBox, QDialog
+from PyQt6.QtCore import QTimer, QEventLoop, QElapsedTimer
+
+from benchmarks import run_benchmarks
+from benchmarks.http_server import StandInServer
+
+
+class LagProbe:
+    """固定间隔的 QTimer；每次触发时记录比预期晚了多少毫秒"""
+
+    def __init__(self, interval_ms=10):
+        self.interval = interval_ms
+        self.samples = []
+        self.clock = QElapsedTimer()
+        self.timer = QTimer()
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.tick)
+
+    def start(self):
+        self.samples = []
+        self.clock.start()
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+
+    def tick(self):
+        elapsed = self.clock.restart()
+        self.samples.append(max(0, elapsed - self.interval))
+
+    def report(self):
+        data = sorted(self.samples)
+        if not data: return {"samples": 0}
+
+        def pct(p):
+            return data[min(len(data) - 1, int(round(p / 100 * (len(data) - 1))))]
+
+        return {"samples": len(data), "p50_ms": pct(50), "p99_ms": pct(99), "max_ms": data[-1],
+                "stalls_over_100ms": sum(1 for v in data if v > 100)}
+
+
+def silence_dialogs():
+    """任务结束时的弹窗会阻塞事件循环，测试时直接跳过"""
+    for name in ("information", "warning", "critical"):
+        setattr(QMessageBox, name, staticmethod(lambda *a, **k: QMessageBox.StandardButton.Ok))
+    QMessageBox.question = staticmethod(lambda *a, **k: QMessageBox.StandardButton.Yes)
+    QDialog.exec = lambda self: 0
+
+
+def wait_worker(win, timeout_s, attr="worker"):
+    """跑事件循环直到窗口的后台线程结束"""
+    worker = getattr(win, attr, None)
+    if worker is None: return
+    loop = QEventLoop()
+    worker.finished.connect(loop.quit)
+    QTimer.singleShot(int(timeout_s * 1000), loop.quit)
+    if worker.isRunning(): loop.exec()
+    # 把线程结束后排队的信号处理完
+    end = time.time() + 0.5
+    while time.time() < end: QApplication.processEvents()
+
+
+def settle(ms=200):
+    loop = QEventLoop()
+    QTimer.singleShot(ms, loop.quit)
+    loop.exec()
+
+
+# === 各工具的驱动 ===
+def drive_downloader(work, out, args):
+    from apps.downloader_app import DownloaderApp
+    server = StandInServer(os.path.join(work, "serve"), port=8765, latency=args.latency)
+    server.start_background()
+    try:
+        win = DownloaderApp()
+        win.show()
+        settle()
+        win.process_file(os.path.join(work, "workbook.xlsx"))  # 目前在界面线程
+        win.input_path.setText(out)
+        win.spin_thread.setValue(args.threads)
+        win.run_download(only_missing=False)
+        wait_worker(win, args.timeout)
+        win.close()
+    finally:
+        server.shutdown()
+
+
+def drive_video_sorter(work, out, args):
+    from apps.video_sorter_app import VideoSorterApp
+    win = VideoSorterApp()
+    win.show()
+    settle()
+    win.source_path = os.path.join(work, "videos")
+    win.target_path = out
+    win.start_process()
+    wait_worker(win, args.timeout)
+    win.close()
+
+
+def drive_image_sorter(work, out, args):
+    from apps.image_sorter_app import ImageSorterApp
+    win = ImageSorterApp()
+    win.show()
+    settle()
+    win.input_src.setText(os.path.join(work, "images"))
+    win.input_dst.setText(out)
+    win.start_sorting()
+    wait_worker(win, args.timeout)
+    win.close()
+
+
+def drive_renamer(work, out, args):
+    from apps.renamer_app import RenamerApp
+    win = RenamerApp()
+    win.show()
+    settle()
+    win.source_path = os.path.join(work, "tree")
+    win.scan_folders()  # 后台扫描，表格边扫边填
+    wait_worker(win, args.timeout, "scan_worker")
+    win.target_path = out
+    win.start_process()
+    wait_worker(win, args.timeout)
+    win.close()
+
+
+TOOLS = {
+    "downloader": drive_downloader,
+    "video_sorter": drive_video_sorter,
+    "image_sorter": drive_image_sorter,
+    "renamer": drive_renamer,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="界面事件循环延迟测试")
+    parser.add_argument("--out", help="结果 JSON 保存路径 (默认打印到终端)")
+    parser.add_argument("--work", help="素材目录 (与 run_benchmarks 共用，缺失时自动生成)")
+    parser.add_argument("--tools", default=",".join(TOOLS))
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0)
+    parser.add_argument("--interval", type=int, default=10, help="探针间隔 (毫秒)")
+    parser.add_argument("--timeout", type=float, default=600, help="单个工具最长等待 (秒)")
+    args = parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication([])
+    silence_dialogs()
+
+    work = args.work or tempfile.mkdtemp(prefix="lovetoolbox_gui_")
+    if not os.path.exists(os.path.join(work, "workbook.xlsx")):
+        corpus_args = run_benchmarks.parse_args(["--quick"] if args.quick else [])
+        run_benchmarks.build_corpus(work, corpus_args)
+
+    probe = LagProbe(args.interval)
+    results = {}
+    for name in [t.strip() for t in args.tools.split(",") if t.strip()]:
+        print(f"▶ {name} ...", file=sys.stderr)
+        out = run_benchmarks.fresh_dir(work, f"gui_{name}")
+        probe.start()
+        t0 = time.perf_counter()
+        try:
+            TOOLS[name](work, out, args)
+            results[name] = probe.report()
+        except Exception as e:
+            results[name] = {"error": str(e)}
+        finally:
+            probe.stop()
+        results[name]["seconds"] = round(time.perf_counter() - t0, 3)
+        print(f"  {results[name]}", file=sys.stderr)
+
+    text = json.dumps({"interval_ms": args.interval, "results": results}, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+    app.quit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+import os
+import sys
+import time
+import random
+import hashlib
+import argparse
+import threading
+import mimetypes
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, unquote
+
+
+# ==========================================
+# 本地 HTTP 替身服务器 (基准测试用)
+# 提供一个目录下的文件，可配置：
+#   latency     每个请求的额外延迟 (毫秒)
+#   bandwidth   每个连接的限速 (字节/秒，0 = 不限)
+#   ranges      是否支持 Range 请求
+#   error_rate  随机返回 500 的概率
+# 同时支持 HEAD、ETag / If-None-Match (304)。
+# ==========================================
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "LoveToolboxBench/1.0"
+
+    def log_message(self, format, *args):
+        pass  # 基准测试时不刷屏
+
+    def _resolve(self):
+        rel = unquote(urlparse(self.path).path).lstrip('/')
+        path = os.path.normpath(os.path.join(self.server.root, rel))
+        if not path.startswith(os.path.abspath(self.server.root)) or not os.path.isfile(path): return None
+        return path
+
+    def _etag(self, path):
+        st = os.stat(path)
+        return '"' + hashlib.md5(f"{path}:{st.st_size}:{st.st_mtime_ns}".encode()).hexdigest()[:16] + '"'
+
+    def _send_error(self, code):
+        self.send_response(code)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_HEAD(self):
+        self._serve(head_only=True)
+
+    def do_GET(self):
+        self._serve(head_only=False)
+
+    def _serve(self, head_only):
+        cfg = self.server
+        if cfg.latency: time.sleep(cfg.latency / 1000.0)
+        if cfg.error_rate and random.random() < cfg.error_rate: return self._send_error(500)
+        path = self._resolve()
+        if path is None: return self._send_error(404)
+
+        size = os.path.getsize(path)
+        etag = self._etag(path)
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        start, end = 0, size - 1
+        status = 200
+        rng = self.headers.get("Range")
+        if rng and cfg.ranges and rng.startswith("bytes="):
+            a, _, b = rng[6:].partition('-')
+            try:
+                if a:
+                    start = int(a)
+                    end = min(int(b), size - 1) if b else size - 1
+                else:
+                    start = max(0, size - int(b))
+                status = 206
+            except ValueError:
+                pass
+            if start > end: return self._send_error(416)
+
+        length = end - start + 1
+        self.send_response(status)
+        self.send_header("Content-Type", mimetypes.guess_type(path)[0] or "application/octet-stream")
+        self.send_header("Content-Length", str(length))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", self.date_time_string(int(os.path.getmtime(path))))
+        if cfg.ranges: self.send_header("Accept-Ranges", "bytes")
+        if status == 206: self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        if head_only: return
+
+        chunk = 64 * 1024
+        with open(path, 'rb') as f:
+            f.seek(start)
+            remaining = length
+            t0 = time.time()
+            sent = 0
+            while remaining > 0:
+                data = f.read(min(chunk, remaining))
+                if not data: break
+                try:
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    return
+                remaining -= len(data)
+                sent += len(data)
+                if cfg.bandwidth:
+                    ahead = sent / cfg.bandwidth - (time.time() - t0)
+                    if ahead > 0: time.sleep(ahead)
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, root, port=0, latency=0, bandwidth=0, ranges=True, error_rate=0.0):
+        super().__init__(("127.0.0.1", port), StandInHandler)
+        self.root = os.path.abspath(root)
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.ranges = ranges
+        self.error_rate = error_rate
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start_background(self):
+        t = threading.Thread(target=self.serve_forever, daemon=True)
+        t.start()
+        return t
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="本地 HTTP 替身服务器")
+    parser.add_argument("root", help="要提供的目录")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0, help="每个请求额外延迟 (毫秒)")
+    parser.add_argument("--bandwidth", type=int, default=0, help="每连接限速 (字节/秒)")
+    parser.add_argument("--no-range", action="store_true", help="不支持 Range 请求")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="随机 500 的概率 (0~1)")
+    args = parser.parse_args(argv)
+
+    server = StandInServer(args.root, args.port, args.latency, args.bandwidth, not args.no_range, args.error_rate)
+    print(f"serving {server.root} at {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    sys.exit(main())
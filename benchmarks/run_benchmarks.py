@@ -0,0 +1,312 @@
+"""
+工具箱性能基准测试
+
+    python -m benchmarks.run_benchmarks --out baseline.json
+    python -m benchmarks.run_benchmarks --quick --latency 20 --bandwidth 5000000
+
+先生成一套合成素材和本地 HTTP 替身服务器，再逐个用例计时。
+每个用例在独立子进程中运行 (无界面, QT_QPA_PLATFORM=offscreen)，
+峰值内存互不干扰。结果输出 files/s、MB/s、峰值 RSS 的 JSON。
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path: sys.path.insert(0, ROOT)
+
+from benchmarks import corpus
+from benchmarks.http_server import StandInServer
+
+CASES = {}
+
+
+def case(name):
+    def deco(fn):
+        CASES[name] = fn
+        return fn
+
+    return deco
+
+
+def ensure_app():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+
+def peak_rss_mb():
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024  # macOS 单位是字节
+    except ImportError:
+        try:
+            import psutil
+            info = psutil.Process().memory_info()
+            return getattr(info, "peak_wset", info.rss) / 1024 / 1024
+        except ImportError:
+            return None
+
+
+def dir_stats(path):
+    files, size = 0, 0
+    for root, dirs, names in os.walk(path):
+        for n in names:
+            files += 1
+            size += os.path.getsize(os.path.join(root, n))
+    return files, size
+
+
+def fresh_dir(work, name):
+    d = os.path.join(work, "out", name)
+    shutil.rmtree(d, ignore_errors=True)
+    os.makedirs(d)
+    return d
+
+
+# === 用例 ===
+def _download(work, args, procs):
+    ensure_app()
+    from apps.downloader_app import DownloadWorker, ShardedDownloadWorker
+    server = StandInServer(os.path.join(work, "serve"), latency=args.latency, bandwidth=args.bandwidth,
+                           ranges=not args.no_range, error_rate=args.error_rate)
+    server.start_background()
+    names = sorted(os.listdir(os.path.join(work, "serve")))
+    tasks = corpus.make_tasks(server.base_url, names, repeat=args.repeat)
+    out = fresh_dir(work, f"download_{procs}")
+    if procs > 1:
+        worker = ShardedDownloadWorker(tasks, out, args.threads, procs)
+    else:
+        worker = DownloadWorker(tasks, out, args.threads)
+    reports = []
+    worker.finished_signal.connect(reports.append)
+    t0 = time.perf_counter()
+    worker.run()
+    seconds = time.perf_counter() - t0
+    server.shutdown()
+    _, size = dir_stats(out)
+    failed = len(reports[0]['failed']) if reports else None
+    return {"files": len(tasks), "bytes": size, "seconds": seconds, "failed": failed}
+
+
+@case("download")
+def bench_download(work, args):
+    return _download(work, args, 1)
+
+
+@case("download_sharded")
+def bench_download_sharded(work, args):
+    return _download(work, args, args.procs)
+
+
+@case("video_sorter")
+def bench_video_sorter(work, args):
+    ensure_app()
+    from apps.video_sorter_app import SorterWorker
+    out = fresh_dir(work, "video_sorter")
+    worker = SorterWorker(os.path.join(work, "videos"), out)
+    t0 = time.perf_counter()
+    worker.run()
+    seconds = time.perf_counter() - t0
+    files, size = dir_stats(out)
+    return {"files": files, "bytes": size, "seconds": seconds}
+
+
+@case("image_sorter")
+def bench_image_sorter(work, args):
+    ensure_app()
+    from apps.image_sorter_app import SorterWorker
+    out = fresh_dir(work, "image_sorter")
+    worker = SorterWorker(os.path.join(work, "images"), out)
+    t0 = time.perf_counter()
+    worker.run()
+    seconds = time.perf_counter() - t0
+    files, size = dir_stats(out)
+    return {"files": files, "bytes": size, "seconds": seconds}
+
+
+def _image_paths(work, args):
+    folder = os.path.join(work, "images")
+    return [os.path.join(folder, n) for n in sorted(os.listdir(folder))] * args.repeat
+
+
+@case("image_probe")
+def bench_image_probe(work, args):
+    """只测分辨率探测：文件头解析 + 线程池 (与 image_probe_pil 对照)"""
+    from concurrent.futures import ThreadPoolExecutor
+    from apps.image_header import read_image_size
+    paths = _image_paths(work, args)
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        sizes = list(executor.map(read_image_size, paths))
+    seconds = time.perf_counter() - t0
+    return {"files": len(paths), "bytes": sum(os.path.getsize(p) for p in paths), "seconds": seconds,
+            "unrecognized": sum(1 for s in sizes if s is None)}
+
+
+@case("image_probe_pil")
+def bench_image_probe_pil(work, args):
+    """对照组：PIL 逐张打开"""
+    from PIL import Image
+    paths = _image_paths(work, args)
+    t0 = time.perf_counter()
+    for p in paths:
+        with Image.open(p) as img:
+            img.size
+    seconds = time.perf_counter() - t0
+    return {"files": len(paths), "bytes": sum(os.path.getsize(p) for p in paths), "seconds": seconds}
+
+
+@case("renamer")
+def bench_renamer(work, args):
+    ensure_app()
+    from apps.renamer_app import RenamerWorker
+    out = fresh_dir(work, "renamer")
+    prefix_map = {"1080-1920": "A", "1920-1080": "B"}  # 第三种留作"未勾选原样复制"
+    worker = RenamerWorker(os.path.join(work, "tree"), out, prefix_map)
+    t0 = time.perf_counter()
+    worker.run()
+    seconds = time.perf_counter() - t0
+    files, size = dir_stats(out)
+    return {"files": files, "bytes": size, "seconds": seconds}
+
+
+@case("process_file")
+def bench_process_file(work, args):
+    ensure_app()
+    from apps.downloader_app import DownloaderApp
+    path = os.path.join(work, "workbook.xlsx")
+    win = DownloaderApp()
+    t0 = time.perf_counter()
+    win.process_file(path)
+    seconds = time.perf_counter() - t0
+    rows = args.sheets * args.rows
+    return {"files": rows, "bytes": os.path.getsize(path), "seconds": seconds, "unit": "rows"}
+
+
+@case("process_file_stream")
+def bench_process_file_stream(work, args):
+    """流式读表：加载 (列名 + Hook 计数) 之后再把任务全部生成一遍"""
+    ensure_app()
+    from apps.downloader_app import DownloaderApp
+    from apps.table_stream import TableTasks
+    path = os.path.join(work, "workbook.xlsx")
+    win = DownloaderApp()
+    t0 = time.perf_counter()
+    win.process_file(path, stream=True)
+    src = win.stream
+    hook_col = win.combo_hook.currentText()
+    hooks = {h.strip() for counts in src.count_hooks(hook_col).values() for h in counts}
+    tasks = TableTasks(src, src.sheets, hook_col, win.combo_url.currentText(), win.combo_name.currentText(), hooks)
+    rows = sum(1 for _ in tasks)
+    seconds = time.perf_counter() - t0
+    return {"files": rows, "bytes": os.path.getsize(path), "seconds": seconds, "unit": "rows"}
+
+
+# === 调度 ===
+def build_corpus(work, args):
+    print(f"⏳ 生成素材到 {work} ...", file=sys.stderr)
+    images = corpus.make_images(os.path.join(work, "images"), args.images)
+    videos = corpus.make_videos(os.path.join(work, "videos"), args.videos)
+    serve = os.path.join(work, "serve")
+    os.makedirs(serve, exist_ok=True)
+    for p in images + videos: shutil.copy(p, serve)
+    corpus.make_tree(os.path.join(work, "tree"), images, depth=args.depth, files_per_dir=args.files_per_dir)
+    names = sorted(os.listdir(serve))
+    corpus.make_workbook(os.path.join(work, "workbook.xlsx"), "http://127.0.0.1:8765", names,
+                         sheets=args.sheets, rows_per_sheet=args.rows)
+
+
+def run_case(name, work, args):
+    """在子进程中跑单个用例，返回结果字典"""
+    cmd = [sys.executable, "-m", "benchmarks.run_benchmarks", "--case", name, "--work", work] + args.passthrough
+    proc = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def finalize(result):
+    secs = result.get("seconds") or 0
+    if secs > 0:
+        result["files_per_s"] = round(result["files"] / secs, 2)
+        result["mb_per_s"] = round(result["bytes"] / secs / 1024 / 1024, 2)
+    result["seconds"] = round(secs, 4)
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="LoveToolbox 性能基准测试")
+    parser.add_argument("--out", help="结果 JSON 保存路径 (默认打印到终端)")
+    parser.add_argument("--work", help="素材目录 (默认临时目录)")
+    parser.add_argument("--cases", default=",".join(CASES), help="逗号分隔的用例名")
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    parser.add_argument("--quick", action="store_true", help="小规模快速跑一遍")
+    parser.add_argument("--images", type=int, default=600)
+    parser.add_argument("--videos", type=int, default=40)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--files-per-dir", type=int, default=10)
+    parser.add_argument("--sheets", type=int, default=3)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--procs", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--repeat", type=int, default=1, help="下载用例中每个文件重复的次数")
+    parser.add_argument("--latency", type=float, default=0)
+    parser.add_argument("--bandwidth", type=int, default=0)
+    parser.add_argument("--no-range", action="store_true")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.images, args.videos, args.depth, args.rows = 60, 6, 2, 2000
+    # 子进程需要同样的参数
+    keep = ["threads", "procs", "repeat", "latency", "bandwidth", "error_rate", "sheets", "rows"]
+    args.passthrough = []
+    for k in keep:
+        args.passthrough += [f"--{k.replace('_', '-')}", str(getattr(args, k))]
+    if args.no_range: args.passthrough.append("--no-range")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.case:
+        print(json.dumps(finalize(CASES[args.case](args.work, args))))
+        return 0
+
+    work = args.work or tempfile.mkdtemp(prefix="lovetoolbox_bench_")
+    if not os.path.exists(os.path.join(work, "workbook.xlsx")): build_corpus(work, args)
+
+    results = {}
+    for name in [c.strip() for c in args.cases.split(",") if c.strip()]:
+        print(f"▶ {name} ...", file=sys.stderr)
+        results[name] = run_case(name, work, args)
+        print(f"  {results[name]}", file=sys.stderr)
+
+    report = {
+        "machine": {"platform": platform.platform(), "python": platform.python_version(),
+                    "cpu_count": os.cpu_count()},
+        "params": {k: getattr(args, k) for k in ("images", "videos", "depth", "files_per_dir", "sheets", "rows",
+                                                   "threads", "procs", "repeat", "latency", "bandwidth",
+                                                   "error_rate")},
+        "results": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text)
+        print(f"✅ 结果已保存: {args.out}", file=sys.stderr)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
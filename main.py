@@ -1,19 +1,71 @@
+import time
+
+_T0 = time.perf_counter()  # 启动计时起点 (--profile-startup)
+
 import sys
+import importlib
+import threading
+import multiprocessing
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QGridLayout,
                              QPushButton, QLabel, QVBoxLayout, QHBoxLayout)
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtGui import QFont
 
+# 导入更新模块
+from apps.updater import check_update, CURRENT_VERSION
+
 # ========================================================
-# 1. 导入核心工具
+# 1. 核心工具 (点击图标时才导入，cv2 / pandas / PIL 不拖慢启动)
 # ========================================================
-from apps.video_sorter_app import VideoSorterApp  # 视频分类
-from apps.renamer_app import RenamerApp  # 分组重命名
-from apps.image_sorter_app import ImageSorterApp  # 图片分拣
-from apps.downloader_app import DownloaderApp  # ⬇️ 新增：全能素材归档下载器
+TOOL_MODULES = {
+    "video_sorter": ("apps.video_sorter_app", "VideoSorterApp"),  # 视频分类
+    "renamer": ("apps.renamer_app", "RenamerApp"),  # 分组重命名
+    "image_sorter": ("apps.image_sorter_app", "ImageSorterApp"),  # 图片分拣
+    "downloader": ("apps.downloader_app", "DownloaderApp"),  # ⬇️ 全能素材归档下载器
+}
 
-# 导入更新模块
-from apps.updater import check_update, CURRENT_VERSION
+# 重量级依赖，--profile-startup 时单独计时
+HEAVY_DEPENDENCIES = ["cv2", "PIL.Image", "pandas", "requests"]
+
+
+def load_tool(key):
+    module_name, class_name = TOOL_MODULES[key]
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def prewarm_tools():
+    """首屏绘制后在后台线程预先导入各工具，之后点击图标几乎无等待"""
+
+    def worker():
+        for module_name, _ in TOOL_MODULES.values():
+            try:
+                importlib.import_module(module_name)
+            except Exception as e:
+                print(f"预加载 {module_name} 失败: {e}")
+
+    threading.Thread(target=worker, daemon=True).start()
+
+
+def profile_startup(app):
+    """打印启动器首屏耗时和各模块导入耗时，然后退出"""
+    rows = [("启动器首屏", (time.perf_counter() - _T0) * 1000)]
+    for name in HEAVY_DEPENDENCIES + [m for m, _ in TOOL_MODULES.values()]:
+        t = time.perf_counter()
+        try:
+            importlib.import_module(name)
+            rows.append((name, (time.perf_counter() - t) * 1000))
+        except Exception as e:
+            rows.append((f"{name} (失败: {e})", (time.perf_counter() - t) * 1000))
+    rows.append(("总计", (time.perf_counter() - _T0) * 1000))
+
+    print("=" * 48)
+    print(f"{'模块':<36}{'耗时(ms)':>10}")
+    print("-" * 48)
+    for name, ms in rows:
+        print(f"{name:<36}{ms:>10.1f}")
+    print("=" * 48)
+    print("注：工具模块的耗时不含已在上面单独计入的依赖。")
+    app.quit()
 
 
 class LauncherWindow(QMainWindow):
@@ -118,26 +170,32 @@ class LauncherWindow(QMainWindow):
     # 3. 启动函数
     # ========================================================
     def open_sorter_app(self):
-        self.sorter_window = VideoSorterApp()
+        self.sorter_window = load_tool("video_sorter")()
         self.sorter_window.show()
 
     def open_renamer_app(self):
-        self.renamer_window = RenamerApp()
+        self.renamer_window = load_tool("renamer")()
         self.renamer_window.show()
 
     def open_image_sorter_app(self):
-        self.image_sorter_window = ImageSorterApp()
+        self.image_sorter_window = load_tool("image_sorter")()
         self.image_sorter_window.show()
 
     def open_downloader_app(self):
         # 启动刚才写好的新下载器
-        self.downloader_window = DownloaderApp()
+        self.downloader_window = load_tool("downloader")()
         self.downloader_window.show()
 
 
 if __name__ == "__main__":
+    # 打包后的下载器多进程模式需要
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     app.setStyle("Fusion")
     window = LauncherWindow()
     window.show()
+    if "--profile-startup" in sys.argv:
+        QTimer.singleShot(0, lambda: profile_startup(app))
+    elif "--no-prewarm" not in sys.argv:
+        QTimer.singleShot(300, prewarm_tools)
     sys.exit(app.exec())
\ No newline at end of file
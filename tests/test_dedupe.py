@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from apps.dedupe import ExactDeduper
+
+
+class _Placer:
+    """按指定方式放置；fail_once 为 True 时第一次放置抛错"""
+
+    def __init__(self, mode, fail_once=False):
+        self.mode = mode
+        self.fail_once = fail_once
+
+    def place(self, src, dst):
+        if self.fail_once:
+            self.fail_once = False
+            raise OSError("模拟放置失败")
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        if self.mode == "move":
+            shutil.move(src, dst)
+        else:
+            shutil.copy2(src, dst)
+        return self.mode
+
+
+class ExactDeduperTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.src = os.path.join(self.tmp, "src")
+        self.dst = os.path.join(self.tmp, "dst")
+        os.makedirs(self.src)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def make(self, name, data):
+        path = os.path.join(self.src, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_move_skip(self):
+        a = self.make("a.mp4", b"x" * 1000)
+        b = self.make("b.mp4", b"x" * 1000)
+        c = self.make("c.mp4", b"y" * 1000)
+        deduper = ExactDeduper("skip")
+        placer = _Placer("move")
+        self.assertEqual(deduper.place(placer, a, os.path.join(self.dst, "a.mp4")), "move")
+        self.assertFalse(os.path.exists(a))
+        # 第一份已被移走，后面同样大小的文件要拿目标位置那份来比
+        self.assertEqual(deduper.place(placer, b, os.path.join(self.dst, "b.mp4")), "duplicate")
+        self.assertEqual(deduper.place(placer, c, os.path.join(self.dst, "c.mp4")), "move")
+        self.assertEqual(sorted(os.listdir(self.dst)), ["a.mp4", "c.mp4"])
+        self.assertEqual(deduper.dup_files, 1)
+
+    def test_failed_original_is_replaced(self):
+        a = self.make("a.jpg", b"z" * 500)
+        b = self.make("b.jpg", b"z" * 500)
+        deduper = ExactDeduper("skip")
+        placer = _Placer("copy", fail_once=True)
+        with self.assertRaises(OSError):
+            deduper.place(placer, a, os.path.join(self.dst, "a.jpg"))
+        # 第一份没放成功，相同的下一份成为新的第一份
+        self.assertEqual(deduper.place(placer, b, os.path.join(self.dst, "b.jpg")), "copy")
+        self.assertTrue(os.path.exists(os.path.join(self.dst, "b.jpg")))
+        self.assertEqual(deduper.dup_files, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()